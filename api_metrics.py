@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+资产管理服务的运行指标
+统计每个接口的请求数、响应时间分布（直方图和 p50/p95/p99）、数据库查询和序列化耗时、
+响应缓存命中率，以Prometheus文本格式输出；可选地把每个请求写为一行JSON访问日志
+只依赖标准库
+"""
+
+import bisect
+import json
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# 响应时间直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# 计算分位数时每个接口保留的最近请求数
+QUANTILE_WINDOW = 2048
+
+# 输出的分位数
+QUANTILES = (0.5, 0.95, 0.99)
+
+# 当前线程正在处理的请求的各阶段耗时
+_current = threading.local()
+
+
+def _labels(**labels):
+    """
+    格式化Prometheus标签
+    """
+    items = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        items.append(f'{name}="{value}"')
+    return '{' + ','.join(items) + '}'
+
+
+def _quantile(sorted_values, q):
+    """
+    最近秩法计算分位数
+    """
+    index = max(0, min(len(sorted_values) - 1, int(q * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class LatencyStats:
+    """
+    一个接口的响应时间统计：累计直方图和最近请求的分位数
+    """
+    
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=QUANTILE_WINDOW)
+    
+    def observe(self, seconds):
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        if index < len(self.bucket_counts):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+    
+    def quantiles(self):
+        values = sorted(self.recent)
+        return {q: _quantile(values, q) for q in QUANTILES} if values else {}
+
+
+class APIMetrics:
+    """
+    服务运行指标（线程安全）
+    
+    请求处理流程中：
+        start_request()      开始计时，清空当前线程的阶段耗时
+        with phase('db'):    统计数据库查询耗时（同一请求中多次累加）
+        with phase('serialize'): 统计序列化耗时
+        finish_request(...)  记录请求数、响应时间和阶段耗时，返回本次请求的统计
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.requests = defaultdict(int)
+        self.latency = defaultdict(LatencyStats)
+        self.phase_seconds = defaultdict(float)
+        self.cache_results = defaultdict(int)
+    
+    def start_request(self):
+        _current.phases = defaultdict(float)
+        _current.started = time.perf_counter()
+    
+    @contextmanager
+    def phase(self, name):
+        """
+        统计当前请求中一个阶段的耗时
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            phases = getattr(_current, 'phases', None)
+            if phases is not None:
+                phases[name] += time.perf_counter() - started
+    
+    def finish_request(self, route, method, status):
+        """
+        记录一次请求
+        
+        Returns:
+            (响应时间秒数, 各阶段耗时的字典)，没有调用 start_request 时返回 None
+        """
+        started = getattr(_current, 'started', None)
+        if started is None:
+            return None
+        duration = time.perf_counter() - started
+        phases = dict(_current.phases)
+        _current.started = None
+        _current.phases = None
+        with self._lock:
+            self.requests[(route, method, status)] += 1
+            self.latency[route].observe(duration)
+            for name, seconds in phases.items():
+                self.phase_seconds[(route, name)] += seconds
+        return duration, phases
+    
+    def cache_result(self, cache, hit):
+        """
+        记录一次响应缓存查询的结果
+        """
+        with self._lock:
+            self.cache_results[(cache, 'hit' if hit else 'miss')] += 1
+    
+    def render(self):
+        """
+        以Prometheus文本格式输出全部指标
+        
+        Returns:
+            指标文本 (bytes)
+        """
+        with self._lock:
+            requests = sorted(self.requests.items())
+            latency = {route: (list(stats.bucket_counts), stats.count, stats.total, stats.quantiles())
+                       for route, stats in sorted(self.latency.items())}
+            phase_seconds = sorted(self.phase_seconds.items())
+            cache_results = dict(self.cache_results)
+        
+        lines = [
+            '# HELP asset_api_uptime_seconds 服务运行时间',
+            '# TYPE asset_api_uptime_seconds gauge',
+            f'asset_api_uptime_seconds {time.time() - self.started_at:.3f}',
+            '# HELP asset_api_requests_total 按接口、方法和状态码统计的请求数',
+            '# TYPE asset_api_requests_total counter',
+        ]
+        for (route, method, status), count in requests:
+            lines.append(f'asset_api_requests_total{_labels(route=route, method=method, status=status)} {count}')
+        
+        lines += [
+            '# HELP asset_api_request_duration_seconds 请求处理时间',
+            '# TYPE asset_api_request_duration_seconds histogram',
+        ]
+        for route, (bucket_counts, count, total, _) in latency.items():
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'asset_api_request_duration_seconds_bucket{_labels(route=route, le=bound)} {cumulative}')
+            lines.append(f'asset_api_request_duration_seconds_bucket{_labels(route=route, le="+Inf")} {count}')
+            lines.append(f'asset_api_request_duration_seconds_sum{_labels(route=route)} {total:.6f}')
+            lines.append(f'asset_api_request_duration_seconds_count{_labels(route=route)} {count}')
+        
+        lines += [
+            f'# HELP asset_api_request_latency_seconds 最近{QUANTILE_WINDOW}个请求的处理时间分位数',
+            '# TYPE asset_api_request_latency_seconds gauge',
+        ]
+        for route, (_, _, _, quantiles) in latency.items():
+            for q, value in quantiles.items():
+                lines.append(f'asset_api_request_latency_seconds{_labels(route=route, quantile=q)} {value:.6f}')
+        
+        lines += [
+            '# HELP asset_api_phase_seconds_total 按接口统计的数据库查询（db）和序列化（serialize）耗时',
+            '# TYPE asset_api_phase_seconds_total counter',
+        ]
+        for (route, name), seconds in phase_seconds:
+            lines.append(f'asset_api_phase_seconds_total{_labels(route=route, phase=name)} {seconds:.6f}')
+        
+        lines += [
+            '# HELP asset_api_cache_requests_total 响应缓存的命中（hit）和未命中（miss）次数',
+            '# TYPE asset_api_cache_requests_total counter',
+        ]
+        for (cache, result), count in sorted(cache_results.items()):
+            lines.append(f'asset_api_cache_requests_total{_labels(cache=cache, result=result)} {count}')
+        lines += [
+            '# HELP asset_api_cache_hit_ratio 响应缓存命中率',
+            '# TYPE asset_api_cache_hit_ratio gauge',
+        ]
+        for cache in sorted({cache for cache, _ in cache_results}):
+            hits = cache_results.get((cache, 'hit'), 0)
+            total = hits + cache_results.get((cache, 'miss'), 0)
+            lines.append(f'asset_api_cache_hit_ratio{_labels(cache=cache)} {hits / total:.4f}')
+        
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class AccessLog:
+    """
+    JSON格式的访问日志，每个请求一行
+    """
+    
+    def __init__(self, path):
+        """
+        Args:
+            path: 日志文件路径，为 '-' 时输出到标准错误
+        """
+        self._lock = threading.Lock()
+        self._file = sys.stderr if path == '-' else open(path, 'a', encoding='utf-8')
+    
+    def write(self, **fields):
+        line = json.dumps(dict(time=datetime.now().isoformat(timespec='milliseconds'), **fields),
+                          ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+    
+    def close(self):
+        if self._file is not sys.stderr:
+            self._file.close()
@@ -9,58 +9,670 @@
 import os
 import sys
 import json
+import gzip
 import uuid
+import base64
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
-import pandas as pd
 import sqlite3
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from metabase.import_data import import_assets_to_sqlite
-from asset_converter import get_exchange_rate
+# 只导入标准库实现的数据库模块，汇率模块在需要时才加载
+from metabase.database import connect_database
+from metabase.asset_store import (CURRENT_ASSETS_TABLE, ensure_asset_tables, save_asset, delete_asset,
+                                  get_asset, get_assets, query_assets, save_assets, delete_assets)
+from metabase.bill_queries import query_bills, bill_summary
+from api_metrics import APIMetrics, AccessLog
 
 # 数据库路径
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metabase', 'data', 'billing.db')
 
+# 默认端口和工作线程数
+DEFAULT_PORT = 3001
+DEFAULT_WORKERS = 8
+
+# 保持连接的空闲超时（秒），超时后释放工作线程
+KEEP_ALIVE_TIMEOUT = 5
+
+# 小于该字节数的响应不压缩
+GZIP_MIN_SIZE = 1024
+
+# 分页查询每页最多返回的资产数
+MAX_PAGE_SIZE = 1000
+
+# 账单列表默认每页返回的账单数
+DEFAULT_BILL_PAGE_SIZE = 100
+
+# 缓存的账单汇总查询数
+BILL_SUMMARY_CACHE_SIZE = 128
+
+# 批量添加、修改和删除一次最多处理的资产数
+MAX_BATCH_SIZE = 5000
+
+# 批量接口路径（不是资产id）及其支持的方法
+BATCH_PATH = '/api/assets/batch'
+BATCH_METHODS = 'POST, PATCH, DELETE'
+
+# 添加资产时必须提供的字段
+REQUIRED_ASSET_FIELDS = ['accountType', 'currency', 'amount', 'description']
+
+# 每个工作线程的数据库连接
+_thread_local = threading.local()
+
+# 服务运行指标，由 /api/metrics 输出
+METRICS = APIMetrics()
+
+
+def get_connection():
+    """
+    获取当前线程的数据库连接
+    
+    每个工作线程第一次访问时打开连接（WAL模式）并创建资产表，之后一直复用
+    """
+    conn = getattr(_thread_local, 'conn', None)
+    if conn is None:
+        conn = connect_database(DB_PATH)
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-16000")
+        conn.execute("PRAGMA mmap_size=67108864")
+        conn.row_factory = sqlite3.Row
+        ensure_asset_tables(conn)
+        _thread_local.conn = conn
+        _thread_local.data_version = None
+    return conn
+
+
+def check_external_changes(conn):
+    """
+    检查数据库是否被其他连接修改（导入脚本、Metabase、其他工作线程），有修改时清空响应缓存
+    
+    PRAGMA data_version 只在其他连接提交修改后变化，每个连接的值需要单独记录。
+    响应缓存由所有工作线程共享，新打开的连接无法知道缓存生成之后数据库是否被修改过，
+    因此连接第一次检查时也清空缓存。
+    """
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if data_version != _thread_local.data_version:
+        ASSET_LIST_CACHE.invalidate()
+        BILL_SUMMARY_CACHE.invalidate()
+        _thread_local.data_version = data_version
+
+
+class CachedResponse:
+    """
+    预先序列化的响应：响应体、gzip压缩后的响应体和ETag
+    """
+    
+    def __init__(self, body):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+
+
+class ResponseCache:
+    """
+    单个响应的缓存，数据修改后调用 invalidate 清空
+    
+    每次清空时递增版本号，清空前开始构建的响应不会被缓存，避免缓存旧数据
+    """
+    
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._version = 0
+        self._response = None
+    
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._response = None
+    
+    def get(self, build):
+        """
+        获取缓存的响应，没有时调用 build() 生成响应体并缓存
+        
+        Returns:
+            CachedResponse
+        """
+        with self._lock:
+            response, version = self._response, self._version
+        METRICS.cache_result(self.name, response is not None)
+        if response is not None:
+            return response
+        response = CachedResponse(build())
+        with self._lock:
+            if self._version == version:
+                self._response = response
+        return response
+
+
+class LRUResponseCache:
+    """
+    按查询条件缓存多个响应，超过 maxsize 时丢弃最久未使用的响应，数据修改后调用 invalidate 清空
+    """
+    
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._version = 0
+        self._responses = OrderedDict()
+    
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._responses.clear()
+    
+    def get(self, key, build):
+        """
+        获取查询条件 key 对应的缓存响应，没有时调用 build() 生成响应体并缓存
+        
+        Returns:
+            CachedResponse
+        """
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+            version = self._version
+        METRICS.cache_result(self.name, response is not None)
+        if response is not None:
+            return response
+        response = CachedResponse(build())
+        with self._lock:
+            if self._version == version:
+                self._responses[key] = response
+                self._responses.move_to_end(key)
+                while len(self._responses) > self.maxsize:
+                    self._responses.popitem(last=False)
+        return response
+
+
+# 全部当前资产的响应缓存
+ASSET_LIST_CACHE = ResponseCache('asset_list')
+
+# 账单汇总的响应缓存（按查询条件）
+BILL_SUMMARY_CACHE = LRUResponseCache('bill_summary', BILL_SUMMARY_CACHE_SIZE)
+
+
+def _strip_weak_prefix(etag):
+    """
+    去掉弱ETag的 W/ 前缀（str.removeprefix 需要Python 3.9）
+    """
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def get_exchange_rate(currency):
+    """
+    获取币种对人民币的汇率，首次调用时才加载汇率模块
+    
+    Returns:
+        汇率，没有汇率记录的币种返回None
+    """
+    from fx_provider import get_exchange_rate as provider_exchange_rate
+    return provider_exchange_rate(currency)
+
+
+def get_exchange_rates(currencies, known_only=False):
+    """
+    批量获取币种对人民币的汇率，首次调用时才加载汇率模块
+    
+    Args:
+        currencies: 币种代码的集合
+        known_only: 为True时只返回有汇率记录的币种
+    
+    Returns:
+        币种（大写）到汇率的字典
+    """
+    from fx_provider import get_exchange_rates as provider_exchange_rates
+    return provider_exchange_rates(currencies, known_only)
+
+
+def unpriced_currency_error(currency):
+    """
+    没有汇率记录的币种的错误信息
+    """
+    return f'无法获取币种汇率: {str(currency).strip().upper()}'
+
+
+def _text(value):
+    return value or ''
+
+
+def _number(value):
+    return float(value or 0)
+
+
+# 资产对象的字段：字段名 -> (当前资产表的列, 转换函数)
+ASSET_FIELDS = {
+    'id': ('id', lambda value: value),
+    'accountType': ('账户分类', _text),
+    'currency': ('币种', _text),
+    'amount': ('金额', _number),
+    'description': ('描述', _text),
+    'timestamp': ('时间', _text),
+    'cnyAmount': ('对应人民币金额', _number),
+    'assetOrLiability': ('资产_负债', lambda value: value or '资产'),
+}
+
+# 可以用于筛选的查询参数 -> 当前资产表的列
+ASSET_FILTERS = {
+    'accountType': '账户分类',
+    'currency': '币种',
+    'assetOrLiability': '资产_负债',
+}
+
+
+def asset_to_dict(row, fields=None):
+    """
+    将一行当前资产（或资产字典）转换为资产对象
+    
+    Args:
+        row: 资产行（sqlite3.Row）或以列名为键的资产字典
+        fields: 返回的字段列表，为None时返回全部字段
+    """
+    return {field: ASSET_FIELDS[field][1](row[ASSET_FIELDS[field][0]]) for field in (fields or ASSET_FIELDS)}
+
+
+def asset_to_json(row, fields=None):
+    """
+    将一行当前资产转换为资产对象的JSON（bytes）
+    """
+    return json.dumps(asset_to_dict(row, fields), ensure_ascii=False).encode('utf-8')
+
+
+def validate_asset_data(data, required_fields=REQUIRED_ASSET_FIELDS):
+    """
+    检查请求中的资产数据
+    
+    Returns:
+        错误信息，数据正确时返回None
+    """
+    if not isinstance(data, dict):
+        return '资产数据格式不正确'
+    for field in required_fields:
+        if field not in data or not data[field]:
+            return f'缺少必要字段: {field}'
+    if 'amount' in data:
+        try:
+            float(data['amount'])
+        except (TypeError, ValueError):
+            return '无效的金额'
+    return None
+
+
+def build_asset(asset_id, data, rate, timestamp):
+    """
+    根据请求中的资产数据创建要保存的资产字典
+    
+    Args:
+        asset_id: 资产id
+        data: 资产对象（accountType、currency、amount、description）
+        rate: 币种对人民币的汇率
+        timestamp: 修改时间
+    """
+    return {
+        'id': asset_id,
+        '账户分类': data['accountType'],
+        '币种': data['currency'],
+        '金额': float(data['amount']),
+        '描述': data['description'],
+        '时间': timestamp,
+        '对应人民币金额': round(float(data['amount']) * rate, 2),
+        '资产_负债': '负债' if data['accountType'] == '信用卡' else '资产'
+    }
+
+
+def encode_cursor(values):
+    """
+    将一页最后一行的排序键（如资产的 (时间, id)）编码为分页游标
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    解码分页游标
+    
+    Returns:
+        排序键 (两个值的元组)
+    
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        first, second = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('无效的cursor参数')
+    return first, second
+
+
+def _query_values(params, name):
+    """
+    查询参数的全部取值，多个取值可以用逗号分隔或重复参数
+    """
+    return [value.strip() for item in params.get(name, []) for value in item.split(',') if value.strip()]
+
+
+def _parse_limit(params, default=None):
+    """
+    解析 limit 参数，最多为 MAX_PAGE_SIZE
+    
+    Raises:
+        ValueError: 参数不正确
+    """
+    if 'limit' not in params:
+        return default
+    try:
+        limit = int(params['limit'][-1])
+    except ValueError:
+        raise ValueError('无效的limit参数')
+    if limit <= 0:
+        raise ValueError('无效的limit参数')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def _parse_month(value):
+    """
+    将 YYYY-MM 或 YYYYMM 格式的月份转换为 yyyymm 整数
+    
+    Raises:
+        ValueError: 月份格式不正确
+    """
+    if value is None:
+        return None
+    digits = value.replace('-', '')
+    if len(digits) != 6 or not digits.isdigit() or not 1 <= int(digits[4:]) <= 12:
+        raise ValueError(f'无效的月份: {value}')
+    return int(digits)
+
+
+def parse_asset_query(query):
+    """
+    解析资产列表的查询参数
+    
+    支持的参数：
+        limit: 每页资产数（最多 MAX_PAGE_SIZE），cursor: 上一页返回的 X-Next-Cursor
+        accountType / currency / assetOrLiability: 筛选条件，多个取值用逗号分隔
+        since / until: 时间范围，fields: 返回的字段，用逗号分隔
+    
+    Returns:
+        (query_assets 的参数字典, 返回的字段列表)
+    
+    Raises:
+        ValueError: 参数不正确
+    """
+    params = parse_qs(query)
+    
+    def values(name):
+        return _query_values(params, name)
+    
+    fields = values('fields') or list(ASSET_FIELDS)
+    unknown = [field for field in fields if field not in ASSET_FIELDS]
+    if unknown:
+        raise ValueError(f"未知的字段: {', '.join(unknown)}")
+    
+    limit = _parse_limit(params)
+    
+    # 分页需要每行的 (时间, id)，即使没有在fields中请求
+    columns = [ASSET_FIELDS[field][0] for field in fields]
+    columns += [column for column in ('时间', 'id') if column not in columns]
+    kwargs = {
+        'columns': columns,
+        'filters': {column: values(name) for name, column in ASSET_FILTERS.items() if values(name)},
+        'since': params.get('since', [None])[-1],
+        'until': params.get('until', [None])[-1],
+        'after': decode_cursor(params['cursor'][-1]) if 'cursor' in params else None,
+        'limit': limit,
+    }
+    return kwargs, fields
+
+
+def bill_to_json(row):
+    """
+    将一行账单转换为账单对象的JSON（bytes）；账单主键可能是64位整数，转换为字符串避免前端丢失精度
+    """
+    return json.dumps({
+        'id': str(row['账单主键']),
+        'date': row['日期'],
+        'category': row['类别'] or '',
+        'amount': float(row['金额'] or 0),
+        'account': row['源账户'] or '',
+        'targetAccount': row['目标账户'] or '',
+        'description': row['描述'] or '',
+        'counterparty': row['代理'] or '',
+        'currency': row['货币'] or 'CNY',
+    }, ensure_ascii=False).encode('utf-8')
+
+
+def parse_bill_query(query):
+    """
+    解析账单列表的查询参数
+    
+    支持的参数：
+        since / until: 日期范围，category / account: 类别、源账户（多个取值用逗号分隔），
+        counterparty: 交易对方包含的文字，limit: 每页账单数（默认 DEFAULT_BILL_PAGE_SIZE），
+        cursor: 上一页返回的 X-Next-Cursor
+    
+    Returns:
+        query_bills 的参数字典
+    
+    Raises:
+        ValueError: 参数不正确
+    """
+    params = parse_qs(query)
+    return {
+        'since': params.get('since', [None])[-1],
+        'until': params.get('until', [None])[-1],
+        'categories': _query_values(params, 'category'),
+        'accounts': _query_values(params, 'account'),
+        'counterparty': params.get('counterparty', [None])[-1],
+        'after': decode_cursor(params['cursor'][-1]) if 'cursor' in params else None,
+        'limit': _parse_limit(params, DEFAULT_BILL_PAGE_SIZE),
+    }
+
+
+def parse_summary_query(query):
+    """
+    解析账单汇总的查询参数
+    
+    支持的参数：
+        from / to: 月份范围（YYYY-MM），by: category（默认）或 account，
+        category / account: 只返回指定的类别或源账户
+    
+    Returns:
+        bill_summary 的参数字典（可作为缓存的键）
+    
+    Raises:
+        ValueError: 参数不正确
+    """
+    params = parse_qs(query)
+    by = params.get('by', ['category'])[-1]
+    if by not in ('category', 'account'):
+        raise ValueError('无效的by参数')
+    return {
+        'since_month': _parse_month(params.get('from', [None])[-1]),
+        'until_month': _parse_month(params.get('to', [None])[-1]),
+        'categories': tuple(_query_values(params, by)),
+        'by': by,
+    }
+
+
+def route_label(path):
+    """
+    将请求路径归并为接口名称（资产id替换为 {id}），作为指标的标签
+    """
+    path = urlparse(path).path
+    if path in ('/api/assets', BATCH_PATH, '/api/bills', '/api/bills/summary', '/api/metrics'):
+        return path
+    if path.startswith('/api/assets/'):
+        return '/api/assets/{id}'
+    return 'other'
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+    """
+    使用固定数量工作线程处理连接的HTTP服务器
+    
+    每个连接由一个工作线程处理到连接关闭或空闲超时，超过工作线程数的连接排队等待
+    """
+    daemon_threads = True
+    
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS, access_log=None):
+        super().__init__(server_address, handler_class)
+        self.access_log = access_log
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='asset-api')
+    
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request_worker, request, client_address)
+    
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+    
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+        if self.access_log is not None:
+            self.access_log.close()
+
+
 class AssetAPIHandler(BaseHTTPRequestHandler):
-    def _set_headers(self, status_code=200, content_type='application/json'):
+    # 使用HTTP/1.1保持连接，所有响应都必须带有Content-Length
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEP_ALIVE_TIMEOUT
+    
+    def parse_request(self):
+        """读取请求行之后开始计时（不计入保持连接时等待下一个请求的时间）"""
+        METRICS.start_request()
+        self._status_code = None
+        self._response_size = 0
+        return super().parse_request()
+    
+    def handle_one_request(self):
+        """处理一个请求，并记录指标和访问日志"""
+        self.command = None
+        super().handle_one_request()
+        if self.command is None or self._status_code is None:
+            return
+        route = route_label(self.path)
+        result = METRICS.finish_request(route, self.command, self._status_code)
+        if result is not None and self.server.access_log is not None:
+            duration, phases = result
+            self.server.access_log.write(
+                client=self.client_address[0], method=self.command, path=self.path, route=route,
+                status=self._status_code, bytes=self._response_size,
+                duration_ms=round(duration * 1000, 3),
+                db_ms=round(phases.get('db', 0) * 1000, 3),
+                serialize_ms=round(phases.get('serialize', 0) * 1000, 3)
+            )
+    
+    def send_response(self, code, message=None):
+        self._status_code = code
+        super().send_response(code, message)
+    
+    def log_request(self, code='-', size='-'):
+        """启用JSON访问日志时不再输出默认的请求日志"""
+        if self.server.access_log is None:
+            super().log_request(code, size)
+    
+    def _set_headers(self, status_code=200, content_type='application/json', content_length=0, headers=None):
         """设置响应头"""
         self.send_response(status_code)
-        self.send_header('Content-type', content_type)
+        if status_code != 304:
+            self.send_header('Content-type', content_type)
+            self.send_header('Content-Length', str(content_length))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, PATCH, DELETE, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
+        self.send_header('Access-Control-Expose-Headers', 'ETag, X-Next-Cursor')
         self.end_headers()
-
+    
+    def _send_body(self, body, status_code=200, content_type='application/json', headers=None):
+        """发送响应体"""
+        self._set_headers(status_code, content_type, len(body), headers)
+        self.wfile.write(body)
+        self._response_size = len(body)
+    
+    def _send_cached_response(self, response, headers=None):
+        """
+        发送缓存的响应：请求的ETag与当前一致时返回304，客户端支持时发送gzip压缩后的响应体
+        """
+        headers = dict(headers or {}, ETag=response.etag)
+        headers.update({'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'})
+        if_none_match = self.headers.get('If-None-Match', '')
+        etags = [_strip_weak_prefix(tag.strip()) for tag in if_none_match.split(',')]
+        if response.etag in etags or '*' in etags:
+            self._set_headers(304, headers=headers)
+            return
+        
+        if response.gzip_body is not None and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            headers['Content-Encoding'] = 'gzip'
+            self._send_body(response.gzip_body, headers=headers)
+        else:
+            self._send_body(response.body, headers=headers)
+    
     def _send_json_response(self, data, status_code=200):
         """发送JSON响应"""
-        self._set_headers(status_code)
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
-
+        self._send_body(json.dumps(data, ensure_ascii=False).encode('utf-8'), status_code)
+    
+    def _send_not_found(self):
+        """发送404响应"""
+        self._send_body(b'Not Found', 404, 'text/plain')
+    
+    def _send_method_not_allowed(self, allow):
+        """发送405响应"""
+        self._send_body(b'Method Not Allowed', 405, 'text/plain', {'Allow': allow})
+    
     def _read_request_body(self):
         """读取请求体"""
-        content_length = int(self.headers['Content-Length'])
+        content_length = int(self.headers.get('Content-Length') or 0)
         post_data = self.rfile.read(content_length)
         return json.loads(post_data.decode('utf-8'))
-
+    
     def do_OPTIONS(self):
         """处理OPTIONS请求（CORS预检）"""
         self._set_headers()
-
+    
     def do_GET(self):
         """处理GET请求"""
         parsed_path = urlparse(self.path)
         
         # 获取所有资产
         if parsed_path.path == '/api/assets':
-            self._get_assets()
+            self._get_assets(parsed_path.query)
+        # 批量接口不是资产id
+        elif parsed_path.path == BATCH_PATH:
+            self._send_method_not_allowed(BATCH_METHODS)
+        # 获取单个资产
+        elif parsed_path.path.startswith('/api/assets/'):
+            asset_id = parsed_path.path.split('/')[-1]
+            self._get_asset(asset_id)
+        # 服务运行指标
+        elif parsed_path.path == '/api/metrics':
+            self._send_body(METRICS.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+        # 查询账单
+        elif parsed_path.path == '/api/bills':
+            self._get_bills(parsed_path.query)
+        # 账单月度汇总
+        elif parsed_path.path == '/api/bills/summary':
+            self._get_bill_summary(parsed_path.query)
         else:
-            self._set_headers(404)
-            self.wfile.write(b'Not Found')
-
+            self._send_not_found()
+    
     def do_POST(self):
         """处理POST请求"""
         parsed_path = urlparse(self.path)
@@ -68,87 +680,188 @@ class AssetAPIHandler(BaseHTTPRequestHandler):
         # 添加新资产
         if parsed_path.path == '/api/assets':
             self._add_asset()
+        # 批量添加资产
+        elif parsed_path.path == BATCH_PATH:
+            self._add_assets_batch()
         else:
-            self._set_headers(404)
-            self.wfile.write(b'Not Found')
-
+            self._send_not_found()
+    
+    def do_PATCH(self):
+        """处理PATCH请求"""
+        parsed_path = urlparse(self.path)
+        
+        # 批量修改资产
+        if parsed_path.path == BATCH_PATH:
+            self._update_assets_batch()
+        else:
+            self._send_not_found()
+    
     def do_PUT(self):
         """处理PUT请求"""
         parsed_path = urlparse(self.path)
         
+        # 批量接口不是资产id
+        if parsed_path.path == BATCH_PATH:
+            self._send_method_not_allowed(BATCH_METHODS)
         # 更新资产
-        if parsed_path.path.startswith('/api/assets/'):
+        elif parsed_path.path.startswith('/api/assets/'):
             asset_id = parsed_path.path.split('/')[-1]
             self._update_asset(asset_id)
         else:
-            self._set_headers(404)
-            self.wfile.write(b'Not Found')
-
+            self._send_not_found()
+    
     def do_DELETE(self):
         """处理DELETE请求"""
         parsed_path = urlparse(self.path)
         
+        # 批量删除资产
+        if parsed_path.path == BATCH_PATH:
+            self._delete_assets_batch()
         # 删除资产
-        if parsed_path.path.startswith('/api/assets/'):
+        elif parsed_path.path.startswith('/api/assets/'):
             asset_id = parsed_path.path.split('/')[-1]
             self._delete_asset(asset_id)
         else:
-            self._set_headers(404)
-            self.wfile.write(b'Not Found')
-
-    def _get_assets(self):
-        """获取所有资产"""
+            self._send_not_found()
+    
+    def _get_assets(self, query=''):
+        """获取资产列表，没有查询参数时返回全部资产"""
         try:
+            try:
+                kwargs, fields = parse_asset_query(query)
+            except ValueError as e:
+                self._send_json_response({'error': str(e)}, 400)
+                return
+            
             # 检查数据库文件是否存在
             if not os.path.exists(DB_PATH):
                 self._send_json_response([])
                 return
             
-            # 连接到SQLite数据库
-            conn = sqlite3.connect(DB_PATH)
+            # 数据库被其他连接修改后清空缓存，否则直接返回预先序列化的响应
+            with METRICS.phase('db'):
+                conn = get_connection()
+                check_external_changes(conn)
+            if not query:
+                self._send_cached_response(ASSET_LIST_CACHE.get(lambda: self._serialize_assets(conn)))
+                return
             
-            # 检查assets_records表是否存在
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name='assets_records'
-            """)
-            table_exists = cursor.fetchone() is not None
+            # 带查询参数时筛选和分页在SQL中完成，多取一行判断是否还有下一页
+            limit = kwargs['limit']
+            if limit is not None:
+                kwargs['limit'] = limit + 1
+            with METRICS.phase('db'):
+                rows = query_assets(conn, **kwargs).fetchall()
+            headers = {}
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                headers['X-Next-Cursor'] = encode_cursor((rows[-1]['时间'], rows[-1]['id']))
+            with METRICS.phase('serialize'):
+                response = CachedResponse(b'[' + b', '.join(asset_to_json(row, fields) for row in rows) + b']')
+            self._send_cached_response(response, headers)
+        except Exception as e:
+            print(f"获取资产数据时出错: {e}")
+            self._send_json_response({'error': '获取资产数据失败'}, 500)
+    
+    def _serialize_assets(self, conn):
+        """
+        序列化全部当前资产（历史快照保存在 asset_snapshots 中）；逐行序列化，不经过DataFrame
+        """
+        cursor = conn.execute(
+            f"SELECT id, 账户分类, 币种, 金额, 描述, 时间, 对应人民币金额, 资产_负债 FROM {CURRENT_ASSETS_TABLE}"
+        )
+        with METRICS.phase('db'):
+            rows = cursor.fetchall()
+        with METRICS.phase('serialize'):
+            return b'[' + b', '.join(asset_to_json(row) for row in rows) + b']'
+    
+    def _get_asset(self, asset_id):
+        """按id获取单个资产"""
+        try:
+            with METRICS.phase('db'):
+                row = get_asset(get_connection(), asset_id) if os.path.exists(DB_PATH) else None
+            if row is None:
+                self._send_json_response({'error': '资产不存在'}, 404)
+                return
+            self._send_body(asset_to_json(row))
+        except Exception as e:
+            print(f"获取资产数据时出错: {e}")
+            self._send_json_response({'error': '获取资产数据失败'}, 500)
+    
+    def _get_bills(self, query=''):
+        """按条件分页查询账单"""
+        try:
+            try:
+                kwargs = parse_bill_query(query)
+            except ValueError as e:
+                self._send_json_response({'error': str(e)}, 400)
+                return
             
-            if not table_exists:
-                # 表不存在，返回空数组
-                conn.close()
+            if not os.path.exists(DB_PATH):
                 self._send_json_response([])
                 return
             
-            # 读取资产数据
-            df = pd.read_sql_query("SELECT * FROM assets_records", conn)
-            conn.close()
+            # 多取一行判断是否还有下一页
+            limit = kwargs['limit']
+            kwargs['limit'] = limit + 1
+            with METRICS.phase('db'):
+                rows = query_bills(get_connection(), **kwargs)
+            headers = {}
+            if len(rows) > limit:
+                rows = rows[:limit]
+                headers['X-Next-Cursor'] = encode_cursor((rows[-1]['日期'], rows[-1]['rowid']))
+            with METRICS.phase('serialize'):
+                response = CachedResponse(b'[' + b', '.join(bill_to_json(row) for row in rows) + b']')
+            self._send_cached_response(response, headers)
+        except Exception as e:
+            print(f"查询账单时出错: {e}")
+            self._send_json_response({'error': '查询账单失败'}, 500)
+    
+    def _get_bill_summary(self, query=''):
+        """从汇总表获取按月的收支汇总，结果按查询条件缓存"""
+        try:
+            try:
+                kwargs = parse_summary_query(query)
+            except ValueError as e:
+                self._send_json_response({'error': str(e)}, 400)
+                return
             
-            # 转换为资产对象数组
-            assets = []
-            for _, row in df.iterrows():
-                # 生成唯一ID（如果没有的话）
-                asset_id = str(row.get('id', '')) if row.get('id', '') else str(uuid.uuid4())
-                
-                asset = {
-                    'id': asset_id,
-                    'accountType': row.get('账户分类', ''),
-                    'currency': row.get('币种', ''),
-                    'amount': float(row.get('金额', 0)),
-                    'description': row.get('描述', ''),
-                    'timestamp': row.get('时间', ''),
-                    'cnyAmount': float(row.get('对应人民币金额', 0)),
-                    'assetOrLiability': row.get('资产_负债', '资产')
-                }
-                assets.append(asset)
+            if not os.path.exists(DB_PATH):
+                self._send_json_response([])
+                return
             
-            self._send_json_response(assets)
+            # 数据库被其他连接修改（如导入账单）后清空缓存
+            with METRICS.phase('db'):
+                conn = get_connection()
+                check_external_changes(conn)
+            key = tuple(sorted(kwargs.items()))
+            self._send_cached_response(BILL_SUMMARY_CACHE.get(key, lambda: self._serialize_summary(conn, kwargs)))
         except Exception as e:
-            print(f"获取资产数据时出错: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': '获取资产数据失败'}).encode('utf-8'))
-
+            print(f"查询账单汇总时出错: {e}")
+            self._send_json_response({'error': '查询账单汇总失败'}, 500)
+    
+    def _serialize_summary(self, conn, kwargs):
+        """
+        序列化账单汇总
+        """
+        with METRICS.phase('db'):
+            rows = bill_summary(conn, **kwargs)
+        with METRICS.phase('serialize'):
+            return self._summary_json(rows, kwargs['by'])
+    
+    def _summary_json(self, rows, by):
+        return json.dumps([
+            {
+                'month': f"{month // 100}-{month % 100:02d}",
+                by: name,
+                'income': round(float(income or 0), 2),
+                'expense': round(float(expense or 0), 2),
+                'net': round(float(net or 0), 2),
+                'count': count,
+            }
+            for month, name, income, expense, net, count in rows
+        ], ensure_ascii=False).encode('utf-8')
+    
     def _add_asset(self):
         """添加新资产"""
         try:
@@ -156,51 +869,29 @@ class AssetAPIHandler(BaseHTTPRequestHandler):
             data = self._read_request_body()
             
             # 验证必要字段
-            required_fields = ['accountType', 'currency', 'amount', 'description']
-            for field in required_fields:
-                if field not in data or not data[field]:
-                    self._set_headers(400)
-                    self.wfile.write(json.dumps({'error': f'缺少必要字段: {field}'}).encode('utf-8'))
-                    return
-            
-            # 创建新资产对象
-            asset = {
-                'id': str(uuid.uuid4()),
-                '账户分类': data['accountType'],
-                '币种': data['currency'],
-                '金额': float(data['amount']),
-                '描述': data['description'],
-                '时间': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                '对应人民币金额': round(float(data['amount']) * get_exchange_rate(data['currency']), 2),
-                '资产_负债': '负债' if data['accountType'] == '信用卡' else '资产'
-            }
+            error = validate_asset_data(data)
+            if error:
+                self._send_json_response({'error': error}, 400)
+                return
             
-            # 连接到SQLite数据库
-            conn = sqlite3.connect(DB_PATH)
+            # 没有汇率的币种不按1:1换算
+            rate = get_exchange_rate(data['currency'])
+            if rate is None:
+                self._send_json_response({'error': unpriced_currency_error(data['currency'])}, 400)
+                return
             
-            # 将资产数据添加到数据库
-            df = pd.DataFrame([asset])
-            df.to_sql('assets_records', conn, if_exists='append', index=False)
-            conn.close()
+            # 创建新资产对象并添加到数据库
+            asset = build_asset(str(uuid.uuid4()), data, rate, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            with METRICS.phase('db'):
+                save_asset(get_connection(), asset)
+            ASSET_LIST_CACHE.invalidate()
             
             # 返回创建的资产
-            response_asset = {
-                'id': asset['id'],
-                'accountType': asset['账户分类'],
-                'currency': asset['币种'],
-                'amount': asset['金额'],
-                'description': asset['描述'],
-                'timestamp': asset['时间'],
-                'cnyAmount': asset['对应人民币金额'],
-                'assetOrLiability': asset['资产_负债']
-            }
-            
-            self._send_json_response(response_asset, 201)
+            self._send_json_response(asset_to_dict(asset), 201)
         except Exception as e:
             print(f"添加资产时出错: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': '添加资产失败'}).encode('utf-8'))
-
+            self._send_json_response({'error': '添加资产失败'}, 500)
+    
     def _update_asset(self, asset_id):
         """更新资产"""
         try:
@@ -208,131 +899,188 @@ class AssetAPIHandler(BaseHTTPRequestHandler):
             data = self._read_request_body()
             
             # 验证必要字段
-            required_fields = ['accountType', 'currency', 'amount', 'description']
-            for field in required_fields:
-                if field not in data or not data[field]:
-                    self._set_headers(400)
-                    self.wfile.write(json.dumps({'error': f'缺少必要字段: {field}'}).encode('utf-8'))
-                    return
-            
-            # 连接到SQLite数据库
-            conn = sqlite3.connect(DB_PATH)
-            
-            # 检查assets_records表是否存在
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name='assets_records'
-            """)
-            table_exists = cursor.fetchone() is not None
-            
-            if not table_exists:
-                conn.close()
-                self._set_headers(404)
-                self.wfile.write(json.dumps({'error': '资产表不存在'}).encode('utf-8'))
+            error = validate_asset_data(data)
+            if error:
+                self._send_json_response({'error': error}, 400)
                 return
             
-            # 读取现有资产数据
-            df = pd.read_sql_query("SELECT * FROM assets_records", conn)
-            
-            # 查找要更新的资产
-            asset_found = False
-            for i, row in df.iterrows():
-                if str(row.get('id', '')) == asset_id or str(uuid.uuid4()) == asset_id:
-                    # 更新资产信息
-                    df.at[i, '账户分类'] = data['accountType']
-                    df.at[i, '币种'] = data['currency']
-                    df.at[i, '金额'] = float(data['amount'])
-                    df.at[i, '描述'] = data['description']
-                    df.at[i, '时间'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    df.at[i, '对应人民币金额'] = round(float(data['amount']) * get_exchange_rate(data['currency']), 2)
-                    df.at[i, '资产_负债'] = '负债' if data['accountType'] == '信用卡' else '资产'
-                    asset_found = True
-                    break
-            
-            if not asset_found:
-                # 如果没有找到匹配的资产，添加新资产
-                new_asset = {
-                    'id': asset_id,
-                    '账户分类': data['accountType'],
-                    '币种': data['currency'],
-                    '金额': float(data['amount']),
-                    '描述': data['description'],
-                    '时间': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    '对应人民币金额': round(float(data['amount']) * get_exchange_rate(data['currency']), 2),
-                    '资产_负债': '负债' if data['accountType'] == '信用卡' else '资产'
-                }
-                df = pd.concat([df, pd.DataFrame([new_asset])], ignore_index=True)
+            # 没有汇率的币种不按1:1换算
+            rate = get_exchange_rate(data['currency'])
+            if rate is None:
+                self._send_json_response({'error': unpriced_currency_error(data['currency'])}, 400)
+                return
             
-            # 更新数据库
-            df.to_sql('assets_records', conn, if_exists='replace', index=False)
-            conn.close()
+            # 更新资产信息，如果没有找到匹配的资产，添加新资产
+            asset = build_asset(asset_id, data, rate, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            with METRICS.phase('db'):
+                save_asset(get_connection(), asset)
+            ASSET_LIST_CACHE.invalidate()
             
             # 返回更新的资产
-            response_asset = {
-                'id': asset_id,
-                'accountType': data['accountType'],
-                'currency': data['currency'],
-                'amount': float(data['amount']),
-                'description': data['description'],
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'cnyAmount': round(float(data['amount']) * get_exchange_rate(data['currency']), 2),
-                'assetOrLiability': '负债' if data['accountType'] == '信用卡' else '资产'
-            }
-            
-            self._send_json_response(response_asset)
+            self._send_json_response(asset_to_dict(asset))
         except Exception as e:
             print(f"更新资产时出错: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': '更新资产失败'}).encode('utf-8'))
-
-    def _delete_asset(self, asset_id):
-        """删除资产"""
+            self._send_json_response({'error': '更新资产失败'}, 500)
+    
+    def _read_batch(self):
+        """
+        读取批量请求的数组（资产或资产id），格式不正确时发送400响应
+        
+        Returns:
+            请求的数组，格式不正确时返回None
+        """
+        items = self._read_request_body()
+        if not isinstance(items, list):
+            self._send_json_response({'error': '请求体必须是数组'}, 400)
+            return None
+        if len(items) > MAX_BATCH_SIZE:
+            self._send_json_response({'error': f'一次最多处理{MAX_BATCH_SIZE}条资产'}, 400)
+            return None
+        return items
+    
+    def _save_batch(self, items, results):
+        """
+        批量保存资产：每种币种只获取一次汇率，全部资产在一个事务中保存
+        
+        没有汇率的币种不按1:1换算，对应的资产不保存并返回400
+        
+        Args:
+            items: (结果序号, 资产id, 资产数据, 成功时的状态码) 的列表
+            results: 每条资产的处理结果，保存后填入成功的结果
+        """
+        rates = get_exchange_rates({str(data['currency']) for _, _, data, _ in items}, known_only=True)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        saved = []
+        for index, asset_id, data, status in items:
+            currency = str(data['currency']).strip().upper()
+            if currency not in rates:
+                results[index] = {'index': index, 'status': 400, 'error': unpriced_currency_error(currency)}
+            else:
+                saved.append((index, status, build_asset(asset_id, data, rates[currency], timestamp)))
+        if saved:
+            with METRICS.phase('db'):
+                save_assets(get_connection(), [asset for _, _, asset in saved])
+            ASSET_LIST_CACHE.invalidate()
+        for index, status, asset in saved:
+            results[index] = {'index': index, 'status': status, 'asset': asset_to_dict(asset)}
+        self._send_json_response({'saved': len(saved), 'results': results})
+    
+    def _add_assets_batch(self):
+        """批量添加资产，返回每条资产的处理结果"""
         try:
-            # 连接到SQLite数据库
-            conn = sqlite3.connect(DB_PATH)
-            
-            # 检查assets_records表是否存在
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name='assets_records'
-            """)
-            table_exists = cursor.fetchone() is not None
-            
-            if not table_exists:
-                conn.close()
-                self._send_json_response({'message': '资产删除成功'})
+            items = self._read_batch()
+            if items is None:
                 return
             
-            # 读取现有资产数据
-            df = pd.read_sql_query("SELECT * FROM assets_records", conn)
+            results = [None] * len(items)
+            valid = []
+            for index, data in enumerate(items):
+                error = validate_asset_data(data)
+                if error:
+                    results[index] = {'index': index, 'status': 400, 'error': error}
+                else:
+                    valid.append((index, str(uuid.uuid4()), data, 201))
+            self._save_batch(valid, results)
+        except Exception as e:
+            print(f"批量添加资产时出错: {e}")
+            self._send_json_response({'error': '批量添加资产失败'}, 500)
+    
+    def _update_assets_batch(self):
+        """批量修改资产：每条资产只需提供id和要修改的字段，返回每条资产的处理结果"""
+        try:
+            items = self._read_batch()
+            if items is None:
+                return
             
-            # 过滤掉要删除的资产
-            if 'id' in df.columns:
-                df = df[df['id'] != asset_id]
-            else:
-                # 如果没有ID列，返回成功但不删除任何数据
-                conn.close()
-                self._send_json_response({'message': '资产删除成功'})
+            conn = get_connection()
+            with METRICS.phase('db'):
+                existing = get_assets(conn, [data['id'] for data in items
+                                             if isinstance(data, dict) and isinstance(data.get('id'), str)])
+            results = [None] * len(items)
+            valid = []
+            for index, data in enumerate(items):
+                if not isinstance(data, dict) or not isinstance(data.get('id'), str):
+                    results[index] = {'index': index, 'status': 400, 'error': '缺少必要字段: id'}
+                    continue
+                error = validate_asset_data(data, [field for field in REQUIRED_ASSET_FIELDS if field in data])
+                if error:
+                    results[index] = {'index': index, 'status': 400, 'error': error}
+                elif data['id'] not in existing:
+                    results[index] = {'index': index, 'status': 404, 'error': '资产不存在'}
+                else:
+                    merged = asset_to_dict(existing[data['id']], REQUIRED_ASSET_FIELDS)
+                    merged.update({field: data[field] for field in REQUIRED_ASSET_FIELDS if field in data})
+                    valid.append((index, data['id'], merged, 200))
+            self._save_batch(valid, results)
+        except Exception as e:
+            print(f"批量修改资产时出错: {e}")
+            self._send_json_response({'error': '批量修改资产失败'}, 500)
+    
+    def _delete_assets_batch(self):
+        """批量删除资产：请求体为资产id数组，全部删除在一个事务中完成，返回每个id的处理结果"""
+        try:
+            items = self._read_batch()
+            if items is None:
                 return
             
-            # 更新数据库
-            df.to_sql('assets_records', conn, if_exists='replace', index=False)
-            conn.close()
+            asset_ids = [asset_id for asset_id in items if isinstance(asset_id, str)]
+            deleted = set()
+            # 数据库不存在时没有需要删除的资产
+            if asset_ids and os.path.exists(DB_PATH):
+                with METRICS.phase('db'):
+                    deleted = delete_assets(get_connection(), asset_ids)
+                if deleted:
+                    ASSET_LIST_CACHE.invalidate()
+            
+            results = []
+            for index, asset_id in enumerate(items):
+                if not isinstance(asset_id, str):
+                    results.append({'index': index, 'status': 400, 'error': '资产id必须是字符串'})
+                elif asset_id in deleted:
+                    results.append({'index': index, 'status': 200, 'id': asset_id})
+                else:
+                    results.append({'index': index, 'status': 404, 'id': asset_id, 'error': '资产不存在'})
+            self._send_json_response({'deleted': len(deleted), 'results': results})
+        except Exception as e:
+            print(f"批量删除资产时出错: {e}")
+            self._send_json_response({'error': '批量删除资产失败'}, 500)
+    
+    def _delete_asset(self, asset_id):
+        """删除资产"""
+        try:
+            # 数据库不存在时没有需要删除的资产
+            if os.path.exists(DB_PATH):
+                with METRICS.phase('db'):
+                    delete_asset(get_connection(), asset_id)
+                ASSET_LIST_CACHE.invalidate()
             
             self._send_json_response({'message': '资产删除成功'})
         except Exception as e:
             print(f"删除资产时出错: {e}")
-            self._set_headers(500)
-            self.wfile.write(json.dumps({'error': '删除资产失败'}).encode('utf-8'))
+            self._send_json_response({'error': '删除资产失败'}, 500)
 
-def run_server(port=3001):
-    """启动服务器"""
-    server_address = ('', port)
-    httpd = HTTPServer(server_address, AssetAPIHandler)
-    print(f'资产管理API服务器运行在端口 {port}')
-    httpd.serve_forever()
+def run_server(port=DEFAULT_PORT, workers=DEFAULT_WORKERS, host='', access_log=None):
+    """
+    启动服务器
+    
+    Args:
+        access_log: JSON访问日志的文件路径（'-' 为标准错误），为None时使用默认的请求日志
+    """
+    server_address = (host, port)
+    httpd = ThreadPoolHTTPServer(server_address, AssetAPIHandler, workers=workers,
+                                 access_log=AccessLog(access_log) if access_log else None)
+    print(f'资产管理API服务器运行在端口 {port}（工作线程: {workers}）')
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
 
 if __name__ == '__main__':
-    run_server()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='资产管理API服务')
+    parser.add_argument('--host', default='', help='监听地址（默认为所有地址）')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'监听端口（默认为{DEFAULT_PORT}）')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'工作线程数（默认为{DEFAULT_WORKERS}）')
+    parser.add_argument('--access-log', help="以JSON格式逐行记录请求的文件路径（'-' 为标准错误）")
+    args = parser.parse_args()
+    run_server(args.port, args.workers, args.host, args.access_log)
@@ -8,154 +8,210 @@
 
 import os
 import sys
-import pandas as pd
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import socket
-import requests
+
+import numpy as np
+import pandas as pd
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    from forex_python.converter import CurrencyRates
-    FOREX_PYTHON_AVAILABLE = True
-except ImportError:
-    FOREX_PYTHON_AVAILABLE = False
-    print("警告: forex-python包未安装，将使用预设汇率")
-
 from bill_converter.config import Config
+import fx_provider
 
 
 def get_exchange_rate(currency):
     """
-    获取汇率（优先使用外部API获取实时汇率，失败时使用预设汇率）
+    获取汇率（使用共享的汇率提供器：有效期内的汇率直接使用缓存，
+    无法获取实时汇率时使用汇率表中保存的汇率或预设汇率）
     
     Args:
         currency: 货币代码
-        
+    
     Returns:
-        对应货币到人民币的汇率
+        对应货币到人民币的汇率，没有汇率记录的币种返回None
     """
-    # 如果forex-python可用，尝试获取实时汇率
-    if FOREX_PYTHON_AVAILABLE:
-        try:
-            # 设置网络超时
-            socket.setdefaulttimeout(10)
-            
-            c = CurrencyRates()
-            # 获取货币对人民币的汇率
-            if currency == 'CNY':
-                return 1.0
-            
-            # 对于其他货币，获取对美元的汇率，再通过美元对人民币的汇率计算
-            rate_to_usd = c.get_rate(currency, 'USD', timeout=10)
-            usd_to_cny = c.get_rate('USD', 'CNY', timeout=10)
-            return round(rate_to_usd * usd_to_cny, 4)
-        except requests.exceptions.Timeout:
-            print(f"获取实时汇率超时，使用预设汇率")
-        except requests.exceptions.ConnectionError:
-            print(f"网络连接错误，无法获取实时汇率，使用预设汇率")
-        except Exception as e:
-            print(f"获取实时汇率失败: {e}，使用预设汇率")
+    return fx_provider.get_exchange_rate(currency)
+
+
+def determine_asset_or_liability(account_type):
+    """
+    根据账户分类判断资产/负债（信用卡为负债，其他为资产）
+    
+    Args:
+        account_type: 账户分类 (pandas Series)
+    
+    Returns:
+        资产/负债 (numpy 数组)
+    """
+    return np.where(account_type == '信用卡', '负债', '资产')
+
+
+def convert_asset_frame(df, rates, timestamp):
+    """
+    转换一个资产文件的数据
     
-    # 预设汇率（作为备选方案）
-    exchange_rates = {
-        'CNY': 1.0,
-        'USD': 7.2,
-        'EUR': 7.8,
-        'JPY': 0.05,
-        'HKD': 0.92,
-    }
+    Args:
+        df: 原始资产数据 (pandas DataFrame)
+        rates: 币种（大写）到人民币汇率的字典
+        timestamp: 快照时间
     
-    return exchange_rates.get(currency, 1.0)
+    Returns:
+        转换后的资产数据，rates 中没有的币种对应人民币金额留空
+    """
+    df = df.copy()
+    
+    # 添加时间戳列
+    df['时间'] = timestamp
+    
+    # 处理新增列：对应人民币金额（按币种查表得到汇率后整列相乘，没有汇率的币种不按1:1换算）
+    currencies = df['币种'].astype(str).str.strip().str.upper()
+    df['对应人民币金额'] = (df['金额'] * currencies.map(rates)).round(2)
+    
+    # 处理新增列：资产/负债
+    df['资产/负债'] = determine_asset_or_liability(df['账户分类'])
+    return df
 
 
-def convert_assets():
+def _read_asset_file(asset_file_path, log=print):
+    """
+    读取并检查一个原始资产文件
+    
+    Args:
+        asset_file_path: 资产文件路径
+        log: 输出提示信息的函数
+    
+    Returns:
+        资产数据，缺少必要的列时返回None
+    """
+    log(f"正在读取资产文件: {asset_file_path}")
+    df = pd.read_csv(asset_file_path)
+    
+    # 检查必要的列是否存在
+    required_columns = ['账户分类', '币种', '金额', '描述']
+    for col in required_columns:
+        if col not in df.columns:
+            log(f"错误: {asset_file_path} 缺少必要的列 '{col}'")
+            return None
+    return df
+
+
+def convert_assets(raw_assets_dir=None, output_dir=None, workers=1):
     """
     转换资产信息
+    
+    原始资产目录中的每个CSV文件分别转换为一个带时间戳的快照文件
+    （{时间戳}_{原文件名}_asset.csv），同一次转换的文件使用相同的时间戳。
+    所有文件中出现的币种只获取一次汇率。
+    
+    Args:
+        raw_assets_dir: 原始资产目录，默认为配置中的目录
+        output_dir: 输出目录，默认为 out/assets
+        workers: 并行读写文件的线程数
+    
+    Returns:
+        bool: 全部文件转换成功时返回True
+    """
+    success, _ = convert_asset_frames(raw_assets_dir, output_dir, workers)
+    return success
+
+
+def convert_asset_frames(raw_assets_dir=None, output_dir=None, workers=1, log=print):
+    """
+    转换资产信息，并返回转换后的数据，供同一进程中的导入步骤直接使用（不需要重新读取CSV）
+    
+    raw_assets_dir、output_dir、workers 与 convert_assets 相同；log 为输出提示信息的函数，
+    与其他任务并行转换时可传入带前缀的函数区分输出来源
+    
+    Returns:
+        (全部文件转换成功时为True, 快照文件名到转换后资产数据的字典)
     """
     # 原始资产目录
-    raw_assets_dir = "raw_assets"
+    raw_assets_dir = raw_assets_dir or Config.DEFAULT_ASSETS_DIR
     
     # 检查原始资产目录是否存在
     if not os.path.exists(raw_assets_dir):
-        print(f"错误: 原始资产目录不存在: {raw_assets_dir}")
-        return False
+        log(f"错误: 原始资产目录不存在: {raw_assets_dir}")
+        return False, {}
     
     # 查找资产CSV文件
-    asset_files = [f for f in os.listdir(raw_assets_dir) if f.endswith('.csv')]
+    asset_files = sorted(f for f in os.listdir(raw_assets_dir) if f.endswith('.csv'))
     
     if not asset_files:
-        print(f"错误: 在 {raw_assets_dir} 目录中未找到CSV文件")
-        return False
+        log(f"错误: 在 {raw_assets_dir} 目录中未找到CSV文件")
+        return False, {}
+    
+    # 确保输出目录存在
+    output_dir = output_dir or os.path.join(Config.DEFAULT_OUTPUT_DIR, 'assets')
+    os.makedirs(output_dir, exist_ok=True)
+    
+    now = datetime.now()
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+    file_prefix = now.strftime("%Y%m%d_%H%M%S")
+    
+    def read(asset_file):
+        try:
+            return _read_asset_file(os.path.join(raw_assets_dir, asset_file), log)
+        except Exception as e:
+            log(f"读取资产文件 {asset_file} 时出错: {e}")
+            return None
     
-    # 使用第一个CSV文件
-    asset_file = asset_files[0]
-    asset_file_path = os.path.join(raw_assets_dir, asset_file)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        frames = list(executor.map(read, asset_files))
     
     try:
-        # 读取资产信息
-        print(f"正在读取资产文件: {asset_file_path}")
-        df = pd.read_csv(asset_file_path)
-        
-        # 检查必要的列是否存在
-        required_columns = ['账户分类', '币种', '金额', '描述']
-        for col in required_columns:
-            if col not in df.columns:
-                print(f"错误: 缺少必要的列 '{col}'")
-                return False
-        
-        # 添加时间戳列
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        df['时间'] = timestamp
-        
-        # 处理新增列：对应人民币金额
-        def convert_to_cny(row):
-            currency = row['币种']
-            amount = row['金额']
-            exchange_rate = get_exchange_rate(currency)
-            return round(amount * exchange_rate, 2)
-        
-        print("正在处理汇率转换...")
-        df['对应人民币金额'] = df.apply(convert_to_cny, axis=1)
-        print("汇率转换完成")
-        
-        # 处理新增列：资产/负债
-        def determine_asset_or_liability(account_type):
-            if account_type == '信用卡':
-                return '负债'
-            else:
-                return '资产'
-        
-        df['资产/负债'] = df['账户分类'].apply(determine_asset_or_liability)
-        
-        # 确保输出目录存在
-        output_dir = os.path.join(Config.DEFAULT_OUTPUT_DIR, 'assets')
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # 生成带时间戳的文件名
-        timestamp_filename = datetime.now().strftime("%Y%m%d_%H%M%S") + "_asset.csv"
-        output_path = os.path.join(output_dir, timestamp_filename)
-        
-        # 保存转换后的资产信息
-        df.to_csv(output_path, index=False, encoding='utf-8-sig')
-        print(f"资产信息已转换并保存到: {output_path}")
-        
-        return True
-        
+        # 所有文件中的币种一次性获取汇率
+        currencies = set()
+        for df in frames:
+            if df is not None:
+                currencies.update(df['币种'].dropna().astype(str).str.strip().str.upper())
+        log(f"正在获取汇率: {', '.join(sorted(currencies))}")
+        rates = fx_provider.get_exchange_rates(currencies, known_only=True)
     except Exception as e:
-        print(f"转换资产信息时出错: {e}")
-        return False
+        log(f"获取汇率时出错: {e}")
+        return False, {}
+    
+    def convert(asset_file, df):
+        if df is None:
+            return None
+        try:
+            converted = convert_asset_frame(df, rates, timestamp)
+            unpriced = sorted(set(df['币种'].dropna().astype(str).str.strip().str.upper()) - set(rates))
+            if unpriced:
+                log(f"警告: {asset_file} 中的币种 {', '.join(unpriced)} 没有汇率，对应人民币金额留空")
+            stem = os.path.splitext(asset_file)[0]
+            output_name = f"{file_prefix}_{stem}_asset.csv"
+            
+            # 保存转换后的资产信息
+            converted.to_csv(os.path.join(output_dir, output_name), index=False, encoding='utf-8-sig')
+            log(f"资产信息已转换并保存到: {os.path.join(output_dir, output_name)}")
+            return output_name, converted
+        except Exception as e:
+            log(f"转换资产文件 {asset_file} 时出错: {e}")
+            return None
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(convert, asset_files, frames))
+    
+    converted = dict(result for result in results if result is not None)
+    log(f"资产信息转换完成: {len(converted)}/{len(results)} 个文件")
+    return len(converted) == len(results), converted
 
 
 def main():
     """
     主函数
     """
+    parser = argparse.ArgumentParser(description='资产信息转换工具')
+    parser.add_argument('--workers', type=int, default=1, help='并行转换的线程数（默认为1）')
+    args = parser.parse_args()
+    
     print("资产信息转换工具")
     print("=" * 30)
     
-    success = convert_assets()
+    success = convert_assets(workers=args.workers)
     
     if success:
         print("\n资产信息转换成功!")
@@ -165,4 +221,4 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
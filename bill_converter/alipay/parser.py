@@ -6,10 +6,17 @@
 用于解析支付宝账单文件
 """
 
+import os
+import sys
 import pandas as pd
 import re
 import chardet
 
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.profiler import get_profiler
+
 
 class AlipayBillParser:
     """
@@ -76,7 +83,9 @@ class AlipayBillParser:
             if data_rows:
                 df = pd.DataFrame(data_rows, columns=headers)
                 # 应用过滤逻辑
-                df = self._apply_filters(df)
+                with get_profiler().stage('filter', file=file_path, rows_in=len(df)) as stage:
+                    df = self._apply_filters(df)
+                    stage.rows_out = len(df)
                 return df
             else:
                 print("未解析到有效数据")
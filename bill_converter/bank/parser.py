@@ -6,10 +6,17 @@
 用于解析银行信用卡账单文件
 """
 
+import os
+import sys
 import pandas as pd
 import PyPDF2
 import re
 
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.profiler import get_profiler
+
 
 class BankBillParser:
     """
@@ -113,7 +120,9 @@ class BankBillParser:
                 df['交易日期'] = df['交易日期'] + ' 00:00:00'
                 
                 # 应用过滤逻辑（去除还款记录和投资记录）
-                df = self._apply_filters(df)
+                with get_profiler().stage('filter', file=file_path, rows_in=len(df)) as stage:
+                    df = self._apply_filters(df)
+                    stage.rows_out = len(df)
                 
                 # 按日期排序
                 if '交易日期' in df.columns:
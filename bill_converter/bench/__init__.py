@@ -0,0 +1,8 @@
+"""
+基准测试模块包
+"""
+
+from .generators import BillDataGenerator
+from .runner import run_benchmark
+
+__all__ = ['BillDataGenerator', 'run_benchmark']
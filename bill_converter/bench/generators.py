@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+基准测试数据生成器
+按固定随机种子生成支付宝CSV、微信xlsx和招商银行PDF格式的合成账单
+"""
+
+import random
+import zlib
+from datetime import datetime, timedelta
+
+# 商户名称的组成部分，按序号组合生成任意数量的不同商户
+MERCHANT_PREFIXES = ['肯德基', '麦当劳', '星巴克', '鲜丰水果', '全家便利店', '滴滴出行', '中国石化',
+                     '美团外卖', '盒马鲜生', '永辉超市', '屈臣氏', '优衣库', '国家电网', '中国移动']
+MERCHANT_SUFFIXES = ['店', '分店', '旗舰店', '门店', '服务中心']
+PRODUCT_NAMES = ['午餐', '咖啡', '水果', '日用品', '打车', '加油', '外卖订单', '生鲜', '话费充值',
+                 '电费', '服装', '零食', '早餐', '晚餐', '地铁出行']
+TRANSFER_PARTIES = ['张三', '李四', '王五', '赵六', '孙七', '周八']
+
+# 银行PDF使用标准Type1字体，只能写入拉丁字符，交易类型和交易对方使用英文
+BANK_TRANSACTION_TYPES = ['Consumption', 'Online Payment', 'Transfer', 'Quick Pay', 'Refund']
+
+# 支付宝CSV的列
+ALIPAY_HEADERS = ['交易号', '商户订单号', '交易创建时间', '付款时间', '最近修改时间', '交易来源地',
+                  '类型', '交易对方', '商品名称', '金额（元）', '收/支', '交易状态']
+
+# 微信xlsx的列
+WECHAT_HEADERS = ['交易时间', '交易类型', '交易对方', '商品', '收/支', '金额(元)',
+                  '支付方式', '当前状态', '交易单号', '商户单号', '备注']
+
+# 微信账单明细标题行上方的分隔行
+WECHAT_SEPARATOR = '----------------------微信支付账单明细列表--------------------'
+
+
+class BillDataGenerator:
+    """
+    合成账单数据生成器类
+    
+    相同的参数总是生成相同的数据：
+        - merchants 控制交易对方的基数
+        - transfer_ratio 为同一来源内成对出现（同日、同金额、一收一支）的转账记录比例
+        - duplicate_ratio 为银行账单中与支付宝账单同日同金额的重复记录比例
+    """
+    
+    def __init__(self, rows, merchants=200, transfer_ratio=0.05, duplicate_ratio=0.1,
+                 seed=42, start_date='2015-01-01', days=3650):
+        """
+        初始化生成器
+        
+        Args:
+            rows: 每个来源生成的记录数
+            merchants: 不同商户的数量
+            transfer_ratio: 转账对记录的比例
+            duplicate_ratio: 跨来源重复记录的比例
+            seed: 随机种子
+            start_date: 第一笔交易的日期
+            days: 交易日期分布的天数
+        """
+        self.rows = rows
+        self.merchants = max(1, merchants)
+        self.transfer_ratio = transfer_ratio
+        self.duplicate_ratio = duplicate_ratio
+        self.seed = seed
+        self.start_date = datetime.strptime(start_date, '%Y-%m-%d')
+        self.days = days
+    
+    def _merchant_name(self, index):
+        prefix = MERCHANT_PREFIXES[index % len(MERCHANT_PREFIXES)]
+        suffix = MERCHANT_SUFFIXES[(index // len(MERCHANT_PREFIXES)) % len(MERCHANT_SUFFIXES)]
+        return f"{prefix}{index:05d}{suffix}"
+    
+    def base_records(self, source_seed):
+        """
+        生成一个来源的基础交易记录
+        
+        Args:
+            source_seed: 来源的随机种子偏移，使不同来源的数据不同但可复现
+        
+        Returns:
+            交易记录字典列表，按时间排序
+        """
+        rng = random.Random(self.seed * 1000 + source_seed)
+        transfer_rows = int(self.rows * self.transfer_ratio) // 2 * 2
+        records = []
+        
+        # 普通消费/收入记录
+        for _ in range(self.rows - transfer_rows):
+            is_income = rng.random() < 0.08
+            records.append({
+                'time': self.start_date + timedelta(seconds=rng.randrange(self.days * 86400)),
+                'counterparty': self._merchant_name(rng.randrange(self.merchants)),
+                'product': rng.choice(PRODUCT_NAMES),
+                'amount': round(rng.lognormvariate(3.5, 1.0), 2),
+                'direction': '收入' if is_income else '支出'
+            })
+        
+        # 成对的转账记录：同一交易对方、同一天、金额相同、一收一支
+        for _ in range(transfer_rows // 2):
+            time = self.start_date + timedelta(seconds=rng.randrange(self.days * 86400))
+            counterparty = rng.choice(TRANSFER_PARTIES)
+            amount = round(rng.uniform(10, 5000), 2)
+            for direction, offset in (('支出', 0), ('收入', 60)):
+                records.append({
+                    'time': time + timedelta(seconds=offset),
+                    'counterparty': counterparty,
+                    'product': '转账',
+                    'amount': amount,
+                    'direction': direction
+                })
+        
+        records.sort(key=lambda record: record['time'])
+        return records
+    
+    def alipay_records(self):
+        return self.base_records(1)
+    
+    def wechat_records(self):
+        return self.base_records(2)
+    
+    def bank_records(self):
+        """
+        生成银行记录，其中duplicate_ratio比例的记录与支付宝记录同日同金额（支付宝用银行卡支付）
+        """
+        records = self.base_records(3)
+        rng = random.Random(self.seed * 1000 + 4)
+        alipay_records = self.alipay_records()
+        duplicate_rows = min(int(self.rows * self.duplicate_ratio), len(alipay_records), len(records))
+        for index, source in enumerate(rng.sample(alipay_records, duplicate_rows)):
+            records[index] = dict(source, counterparty='ALIPAY', product='Quick Pay')
+        for record in records:
+            if record['product'] != 'Quick Pay':
+                record['counterparty'] = f"MERCHANT{zlib.crc32(record['counterparty'].encode('utf-8')) % self.merchants:05d}"
+                record['product'] = BANK_TRANSACTION_TYPES[record['time'].day % len(BANK_TRANSACTION_TYPES)]
+        records.sort(key=lambda record: record['time'])
+        return records
+
+
+def write_alipay_csv(file_path, records):
+    """
+    按支付宝导出格式写入CSV账单（GBK编码，带说明行）
+    """
+    with open(file_path, 'w', encoding='gbk', newline='') as f:
+        f.write('支付宝交易记录明细查询\n')
+        f.write('账号:[benchmark@example.com]\n')
+        f.write('---------------------------------交易记录明细列表------------------------------------\n')
+        f.write(','.join(ALIPAY_HEADERS) + '\n')
+        for index, record in enumerate(records):
+            time = record['time'].strftime('%Y-%m-%d %H:%M:%S')
+            f.write(','.join([
+                f"2023{index:016d}", f"T{index:012d}", time, time, time, '其他（包括阿里巴巴和外部商家）',
+                '即时到账交易', record['counterparty'], record['product'],
+                f"{record['amount']:.2f}", record['direction'], '交易成功'
+            ]) + '\n')
+        f.write('------------------------------------------------------------------------------------\n')
+
+
+def write_wechat_xlsx(file_path, records):
+    """
+    按微信支付导出格式写入xlsx账单（带说明行和分隔行）
+    """
+    from openpyxl import Workbook
+    
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('微信支付账单明细')
+    sheet.append(['微信支付账单明细'])
+    sheet.append(['微信昵称：[benchmark]'])
+    for line in ['起始时间：[2015-01-01 00:00:00] 终止时间：[2024-12-31 23:59:59]',
+                 '导出类型：[全部]', '导出时间：[2025-01-01 00:00:00]', '',
+                 f'共{len(records)}笔记录', '', '', '', '', '', '', '', '']:
+        sheet.append([line] if line else [None])
+    sheet.append([WECHAT_SEPARATOR])
+    sheet.append(WECHAT_HEADERS)
+    for index, record in enumerate(records):
+        sheet.append([
+            record['time'].strftime('%Y-%m-%d %H:%M:%S'),
+            '转账' if record['product'] == '转账' else '商户消费',
+            record['counterparty'], record['product'], record['direction'],
+            f"¥{record['amount']:.2f}", '零钱', '支付成功',
+            f"4200{index:016d}", f"M{index:012d}", '/'
+        ])
+    workbook.save(file_path)
+
+
+def write_cmb_pdf(file_path, records, lines_per_page=60):
+    """
+    按招商银行流水格式写入PDF账单
+    每行为：日期 货币 金额 余额 交易类型 交易对方，与BankBillParser使用的正则一致
+    """
+    balance = 100000.0
+    lines = []
+    for record in records:
+        amount = record['amount'] if record['direction'] == '收入' else -record['amount']
+        balance += amount
+        lines.append(f"{record['time'].strftime('%Y-%m-%d')} CNY {amount:,.2f} {balance:,.2f} "
+                     f"{record['product']} {record['counterparty']}")
+    _write_text_pdf(file_path, lines, lines_per_page)
+
+
+def _write_text_pdf(file_path, lines, lines_per_page):
+    """
+    写入只包含文本行的最小PDF文件（Helvetica字体）
+    """
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = {
+        1: b'<< /Type /Catalog /Pages 2 0 R >>',
+        2: ('<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            ' '.join(f'{4 + 2 * i} 0 R' for i in range(len(pages))), len(pages))).encode('ascii'),
+        3: b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>'
+    }
+    for i, page_lines in enumerate(pages):
+        content = ['BT /F1 8 Tf 10 TL 36 806 Td']
+        for line in page_lines:
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            content.append(f'({escaped}) Tj T*')
+        content.append('ET')
+        stream = '\n'.join(content).encode('latin-1', errors='replace')
+        objects[4 + 2 * i] = (
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>'
+        ).encode('ascii')
+        objects[5 + 2 * i] = b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream'
+    
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(output)
+        output += f'{number} 0 obj\n'.encode('ascii') + objects[number] + b'\nendobj\n'
+    xref_offset = len(output)
+    size = max(objects) + 1
+    output += f'xref\n0 {size}\n0000000000 65535 f \n'.encode('ascii')
+    for number in range(1, size):
+        output += f'{offsets[number]:010d} 00000 n \n'.encode('ascii')
+    output += f'trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n'.encode('ascii')
+    
+    with open(file_path, 'wb') as f:
+        f.write(bytes(output))
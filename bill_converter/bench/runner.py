@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+账单流程基准测试
+使用合成账单数据分别测量解析、转换和去重阶段的吞吐量，结果保存为JSON，
+并可与基线结果比较以发现性能回退
+"""
+
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alipay.parser import AlipayBillParser
+from wechat.parser import WechatBillParser
+from bank.parser import BankBillParser
+from utils.converter import BillConverter
+from utils.deduplicator import BillDeduplicator
+from config import Config
+from bench.generators import BillDataGenerator, write_alipay_csv, write_wechat_xlsx, write_cmb_pdf
+
+# 各来源的生成方法、文件扩展名和解析方法
+SOURCES = {
+    'alipay': ('alipay_records', write_alipay_csv, 'csv',
+               lambda path: AlipayBillParser().parse_file(path)),
+    'wechat': ('wechat_records', write_wechat_xlsx, 'xlsx',
+               lambda path: WechatBillParser().parse_file(path)),
+    'bank': ('bank_records', write_cmb_pdf, 'pdf',
+             lambda path: BankBillParser().parse_file(path, 'cmb')),
+}
+
+STAGES = ['parse', 'convert', 'dedup']
+
+
+def parse_size(size):
+    """
+    解析数据规模，支持 1k、100k、1m 这样的写法
+    
+    Returns:
+        记录数
+    """
+    size = str(size).strip().lower()
+    multipliers = {'k': 1000, 'm': 1000000}
+    if size and size[-1] in multipliers:
+        return int(float(size[:-1]) * multipliers[size[-1]])
+    return int(size)
+
+
+@contextlib.contextmanager
+def _quiet(enabled):
+    """
+    屏蔽被测代码的print输出，避免终端输出影响计时
+    """
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _measure(func):
+    """
+    执行函数并记录耗时和CPU时间
+    
+    Returns:
+        (函数返回值, 耗时, CPU时间)
+    """
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    result = func()
+    return result, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def _result(size, source, stage, rows_in, rows_out, wall_time, cpu_time):
+    return {
+        'size': size,
+        'source': source,
+        'stage': stage,
+        'rows_in': rows_in,
+        'rows_out': rows_out,
+        'wall_time': round(wall_time, 6),
+        'cpu_time': round(cpu_time, 6),
+        'rows_per_sec': round(rows_in / wall_time, 2) if wall_time > 0 else None
+    }
+
+
+def generate_bill_file(generator, source, data_dir):
+    """
+    生成一个来源的合成账单文件，参数相同的文件已存在时直接复用
+    
+    Returns:
+        账单文件路径
+    """
+    records_method, writer, extension, _ = SOURCES[source]
+    name = (f"{source}_{generator.rows}_s{generator.seed}_m{generator.merchants}"
+            f"_t{generator.transfer_ratio}_d{generator.duplicate_ratio}.{extension}")
+    file_path = os.path.join(data_dir, name)
+    if not os.path.exists(file_path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"正在生成 {source} 数据 ({generator.rows} 行): {file_path}")
+        temp_path = file_path + '.tmp.' + extension
+        writer(temp_path, getattr(generator, records_method)())
+        os.replace(temp_path, file_path)
+    return file_path
+
+
+def run_benchmark(sizes, sources=None, stages=None, merchants=200, transfer_ratio=0.05,
+                  duplicate_ratio=0.1, seed=42, data_dir=None, quiet=True):
+    """
+    运行基准测试
+    
+    Args:
+        sizes: 数据规模列表（每个来源的记录数）
+        sources: 测试的来源列表，默认为全部来源
+        stages: 测试的阶段列表，默认为全部阶段
+        merchants: 商户基数
+        transfer_ratio: 转账对记录比例
+        duplicate_ratio: 跨来源重复记录比例
+        seed: 随机种子
+        data_dir: 合成数据缓存目录
+        quiet: 是否屏蔽被测代码的输出
+    
+    Returns:
+        基准测试报告字典
+    """
+    sources = sources or list(SOURCES)
+    stages = stages or STAGES
+    data_dir = data_dir or os.path.join(Config.DEFAULT_BENCH_DIR, 'data')
+    results = []
+    
+    converter = BillConverter()
+    converter.warm_up()
+    
+    for size in sizes:
+        generator = BillDataGenerator(size, merchants=merchants, transfer_ratio=transfer_ratio,
+                                      duplicate_ratio=duplicate_ratio, seed=seed)
+        converted = []
+        for source in sources:
+            file_path = generate_bill_file(generator, source, data_dir)
+            parse = SOURCES[source][3]
+            
+            with _quiet(quiet):
+                source_data, wall_time, cpu_time = _measure(lambda: parse(file_path))
+            rows_out = 0 if source_data is None else len(source_data)
+            if 'parse' in stages:
+                results.append(_result(size, source, 'parse', size, rows_out, wall_time, cpu_time))
+            if source_data is None:
+                print(f"解析失败: {file_path}")
+                continue
+            
+            if 'convert' in stages or 'dedup' in stages:
+                with _quiet(quiet):
+                    moneypro_data, wall_time, cpu_time = _measure(
+                        lambda: converter.convert_to_moneypro(source_data, source))
+                if 'convert' in stages:
+                    results.append(_result(size, source, 'convert', len(source_data),
+                                           0 if moneypro_data is None else len(moneypro_data),
+                                           wall_time, cpu_time))
+                if moneypro_data is not None:
+                    converted.append(moneypro_data)
+        
+        if 'dedup' in stages and converted:
+            rows_in = sum(len(data) for data in converted)
+            with _quiet(quiet):
+                merged_data, wall_time, cpu_time = _measure(
+                    lambda: BillDeduplicator().deduplicate_bills(converted))
+            results.append(_result(size, '+'.join(sources), 'dedup', rows_in,
+                                   0 if merged_data is None else len(merged_data), wall_time, cpu_time))
+        
+        for result in results:
+            if result['size'] == size:
+                print(f"{result['size']:>9} {result['source']:<20} {result['stage']:<8} "
+                      f"{result['wall_time']:>10.3f}s {result['rows_per_sec'] or 0:>14,.0f} 行/秒")
+    
+    return {
+        'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'parser_version': Config.PARSER_VERSION
+        },
+        'parameters': {
+            'sizes': sizes, 'sources': sources, 'stages': stages, 'merchants': merchants,
+            'transfer_ratio': transfer_ratio, 'duplicate_ratio': duplicate_ratio, 'seed': seed
+        },
+        'results': results
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """
+    与基线结果比较吞吐量
+    
+    Args:
+        report: 本次基准测试报告
+        baseline: 基线报告
+        tolerance: 允许的吞吐量下降比例，如0.2表示下降超过20%视为回退
+    
+    Returns:
+        回退项列表
+    """
+    baseline_results = {
+        (item['size'], item['source'], item['stage']): item for item in baseline.get('results', [])
+    }
+    regressions = []
+    for item in report['results']:
+        previous = baseline_results.get((item['size'], item['source'], item['stage']))
+        if not previous or not previous.get('rows_per_sec') or not item.get('rows_per_sec'):
+            continue
+        ratio = item['rows_per_sec'] / previous['rows_per_sec']
+        if ratio < 1 - tolerance:
+            regressions.append(dict(item, baseline_rows_per_sec=previous['rows_per_sec'],
+                                    ratio=round(ratio, 4)))
+    return regressions
+
+
+def add_bench_arguments(parser):
+    """
+    为命令行解析器添加基准测试参数
+    """
+    parser.add_argument('--sizes', default='1k',
+                        help='数据规模，逗号分隔，如 1k,100k,1m（每个来源的记录数）')
+    parser.add_argument('--sources', default=','.join(SOURCES),
+                        help='测试的账单来源，逗号分隔')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help='测试的阶段，逗号分隔')
+    parser.add_argument('--merchants', type=int, default=200, help='商户基数')
+    parser.add_argument('--transfer-ratio', type=float, default=0.05, help='转账对记录比例')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.1, help='跨来源重复记录比例')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--data-dir', help='合成数据缓存目录（默认为out/bench/data）')
+    parser.add_argument('--output', help='结果JSON文件路径（默认保存到out/bench目录）')
+    parser.add_argument('--baseline', help='基线结果JSON文件，吞吐量下降超过容差时返回非零退出码')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='相对基线允许的吞吐量下降比例')
+    parser.add_argument('--verbose', action='store_true', help='显示被测代码的输出')
+
+
+def run_from_args(args):
+    """
+    根据命令行参数运行基准测试
+    
+    Returns:
+        退出码，发现性能回退时为1
+    """
+    report = run_benchmark(
+        sizes=[parse_size(size) for size in args.sizes.split(',') if size.strip()],
+        sources=[source.strip() for source in args.sources.split(',') if source.strip()],
+        stages=[stage.strip() for stage in args.stages.split(',') if stage.strip()],
+        merchants=args.merchants,
+        transfer_ratio=args.transfer_ratio,
+        duplicate_ratio=args.duplicate_ratio,
+        seed=args.seed,
+        data_dir=args.data_dir,
+        quiet=not args.verbose
+    )
+    
+    output_path = args.output
+    if output_path is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = os.path.join(Config.DEFAULT_BENCH_DIR, f"bench_{timestamp}.json")
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"基准测试结果已保存到: {output_path}")
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("发现性能回退:")
+            for item in regressions:
+                print(f"  {item['size']} {item['source']} {item['stage']}: "
+                      f"{item['rows_per_sec']:,.0f} 行/秒，基线 {item['baseline_rows_per_sec']:,.0f} 行/秒")
+            return 1
+        print("未发现性能回退")
+    return 0
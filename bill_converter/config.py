@@ -30,4 +30,47 @@ class Config:
     DEFAULT_BILLS_DIR = 'raw_bills'
     
     # 默认资产输入目录
-    DEFAULT_ASSETS_DIR = 'raw_assets'
\ No newline at end of file
+    DEFAULT_ASSETS_DIR = 'raw_assets'
+    
+    # 默认历史汇率目录（CSV文件，包含 日期、货币、汇率 三列）
+    DEFAULT_FX_DIR = 'raw_fx'
+    
+    # 默认账单阶段缓存目录
+    DEFAULT_CACHE_DIR = 'out/.cache'
+    
+    # 默认性能报告目录
+    DEFAULT_PROFILE_DIR = 'out/profile'
+    
+    # 默认基准测试结果目录
+    DEFAULT_BENCH_DIR = 'out/bench'
+    
+    # 解析器版本：修改解析、过滤或转换逻辑后需递增，使已有缓存失效
+    PARSER_VERSION = '2'
+    
+    # 流式合并：每个落盘分块的行数
+    STREAM_CHUNK_ROWS = 50000
+    
+    # 流式合并：去重窗口的最小行数
+    STREAM_WINDOW_ROWS = 200000
+    
+    # 账单数据库主键算法：md5（32位十六进制TEXT，兼容历史数据）或 hash64（64位INTEGER，索引更小更快）
+    # 修改后下次导入时会自动迁移已有数据的主键
+    BILL_KEY_ALGORITHM = 'md5'
+    
+    # 监视模式：轮询间隔（秒）
+    WATCH_POLL_INTERVAL = 2.0
+    
+    # 监视模式：目录保持不变多久后才开始处理（秒）
+    WATCH_DEBOUNCE_SECONDS = 3.0
+    
+    # 汇率表（SQLite）路径
+    FX_RATES_DB = 'out/fx/fx_rates.db'
+    
+    # 汇率有效期（秒），过期后在后台刷新
+    FX_RATE_TTL = 6 * 3600
+    
+    # 同步获取汇率的最长等待时间（秒）
+    FX_FETCH_TIMEOUT = 5.0
+    
+    # 获取汇率失败后，多久内不再尝试联网（秒）
+    FX_RETRY_INTERVAL = 300
@@ -10,6 +10,11 @@ import sys
 import os
 import argparse
 import glob
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -20,7 +25,13 @@ from bank.parser import BankBillParser
 from moneypro.exporter import MoneyProExporter
 from utils.converter import BillConverter
 from utils.deduplicator import BillDeduplicator
+from utils.streaming_merger import StreamingBillMerger
+from utils.stage_cache import BillStageCache
+from utils.watcher import BillDirectoryWatcher
+from utils.profiler import (PipelineProfiler, get_profiler, set_profiler, row_count,
+                            start_profiling, finish_profiling)
 from config import Config
+from bench.runner import add_bench_arguments, run_from_args as run_bench
 
 def main():
     print("欢迎使用账单转换器！")
@@ -34,18 +45,57 @@ def main():
     parser.add_argument('--output', help='输出文件路径')
     parser.add_argument('--bank-type', default='unknown', help='银行类型（仅对银行账单有效）')
     parser.add_argument('--auto', action='store_true', help='自动处理原始账单目录下的所有文件')
+    parser.add_argument('--stream-merge', action='store_true',
+                        help='自动模式下使用外存归并合并账单，以固定内存处理大量历史数据')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='自动模式下并行处理账单文件的进程数（0表示使用全部CPU核心）')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='自动模式下不使用阶段缓存，重新解析所有账单文件')
+    parser.add_argument('--watch', action='store_true',
+                        help='监视原始账单目录，自动增量处理新增或修改的账单并导入数据库')
+    parser.add_argument('--watch-interval', type=float, default=None,
+                        help='监视模式的轮询间隔（秒）')
+    parser.add_argument('--debounce', type=float, default=None,
+                        help='监视模式下目录保持不变多久后开始处理（秒）')
+    parser.add_argument('--no-import', action='store_true',
+                        help='监视模式下不导入SQLite数据库')
+    parser.add_argument('--profile', action='store_true',
+                        help='记录各阶段、各文件的耗时、CPU时间、行数和内存峰值')
+    parser.add_argument('--profile-output', help='性能报告JSON文件路径（默认保存到out/profile目录）')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='启用性能分析时，同时为每个阶段保存cProfile结果')
+    
+    # 子命令
+    subparsers = parser.add_subparsers(dest='command')
+    bench_parser = subparsers.add_parser('bench', help='使用合成账单数据运行基准测试')
+    add_bench_arguments(bench_parser)
     
     args = parser.parse_args()
     
-    if args.auto:
+    if args.command == 'bench':
+        sys.exit(run_bench(args))
+    
+    profiler = None
+    if args.profile:
+        profiler = start_profiling(cprofile=args.cprofile)
+    
+    if args.watch:
+        # 监视模式
+        watch_bills(jobs=args.jobs, use_cache=not args.no_cache, import_db=not args.no_import,
+                    poll_interval=args.watch_interval, debounce_seconds=args.debounce)
+    elif args.auto:
         # 自动处理模式
-        auto_process_bills()
+        auto_process_bills(stream_merge=args.stream_merge, jobs=args.jobs,
+                           use_cache=not args.no_cache)
     elif args.source and args.input and args.output:
         # 执行转换
         convert_bill(args.source, args.input, args.output, args.bank_type)
     else:
         # 交互式模式
         interactive_mode()
+    
+    if profiler is not None:
+        finish_profiling(profiler, args.profile_output)
 
 
 def convert_bill(source_type, input_path, output_path, bank_type='unknown'):
@@ -102,93 +152,474 @@ def convert_bill(source_type, input_path, output_path, bank_type='unknown'):
         print("导出失败")
 
 
-def auto_process_bills():
-    """
-    自动处理原始账单目录下的所有文件
+def find_bill_files(raw_bills_dir):
     """
-    raw_bills_dir = Config.DEFAULT_BILLS_DIR
-    output_dir = Config.DEFAULT_OUTPUT_DIR
-    
-    # 确保输出目录存在
-    os.makedirs(output_dir, exist_ok=True)
-    
-    print(f"自动处理 {raw_bills_dir} 目录下的所有账单文件")
+    查找原始账单目录下的所有账单文件
     
-    # 查找所有账单文件
+    Args:
+        raw_bills_dir: 原始账单目录
+        
+    Returns:
+        (文件路径, 账单类型) 列表，按类型和文件名排序，保证处理顺序确定
+    """
     bill_files = []
     
     # 支付宝账单
-    alipay_files = glob.glob(os.path.join(raw_bills_dir, "alipay_record_*.csv"))
+    alipay_files = sorted(glob.glob(os.path.join(raw_bills_dir, "alipay_record_*.csv")))
     bill_files.extend([(f, 'alipay') for f in alipay_files])
     
     # 微信账单
-    wechat_files = glob.glob(os.path.join(raw_bills_dir, "微信支付账单流水文件*.xlsx"))
+    wechat_files = sorted(glob.glob(os.path.join(raw_bills_dir, "微信支付账单流水文件*.xlsx")))
     bill_files.extend([(f, 'wechat') for f in wechat_files])
     
     # 银行账单
-    bank_files = glob.glob(os.path.join(raw_bills_dir, "招商银行*.pdf"))
+    bank_files = sorted(glob.glob(os.path.join(raw_bills_dir, "招商银行*.pdf")))
     bill_files.extend([(f, 'bank') for f in bank_files])
     
-    if not bill_files:
-        print("未找到任何账单文件")
-        return
+    return bill_files
+
+
+# 进程内共享的转换器，分类关键词只加载一次
+_converter = None
+
+
+def _get_converter():
+    """
+    获取进程内共享的账单转换器
+    """
+    global _converter
+    if _converter is None:
+        _converter = BillConverter()
+    return _converter
+
+
+def process_bill_file(file_path, source_type, output_dir):
+    """
+    解析、转换并导出单个账单文件
+    各文件之间相互独立，可在子进程中执行
+    
+    Args:
+        file_path: 账单文件路径
+        source_type: 账单类型 ('alipay', 'wechat', 'bank')
+        output_dir: 输出目录
+        
+    Returns:
+        转换后的MoneyPro格式数据，失败时返回None
+    """
+    print(f"正在解析账单: {file_path}")
     
-    # 解析所有账单
     parsers = {
-        'alipay': AlipayBillParser(),
-        'wechat': WechatBillParser(),
-        'bank': BankBillParser()
+        'alipay': AlipayBillParser,
+        'wechat': WechatBillParser,
+        'bank': BankBillParser
     }
-    
-    bill_data_list = []
-    for file_path, source_type in bill_files:
-        print(f"正在解析账单: {file_path}")
-        
-        parser = parsers[source_type]
+    parser = parsers[source_type]()
+    profiler = get_profiler()
+    with profiler.stage('parse', file=file_path) as stage:
         if source_type == 'bank':
             # 默认银行类型为cmb（招商银行）
             source_data = parser.parse_file(file_path, 'cmb')
         else:
             source_data = parser.parse_file(file_path)
+        stage.rows_out = row_count(source_data)
+    
+    if source_data is None:
+        print(f"解析失败: {file_path}")
+        return None
+    
+    # 转换为MoneyPro格式
+    with profiler.stage('convert', file=file_path, rows_in=len(source_data)) as stage:
+        moneypro_data = _get_converter().convert_to_moneypro(source_data, source_type)
+        stage.rows_out = row_count(moneypro_data)
+    if moneypro_data is None:
+        print(f"转换失败: {file_path}")
+        return None
+    
+    # 同时导出单个文件
+    filename = os.path.basename(file_path)
+    name, ext = os.path.splitext(filename)
+    output_path = os.path.join(output_dir, f"{name}_moneypro.csv")
+    exporter = MoneyProExporter()
+    with profiler.stage('export', file=output_path, rows_in=len(moneypro_data)):
+        exporter.export_to_csv(moneypro_data, output_path)
+    print(f"成功解析并转换: {file_path} -> {output_path}")
+    
+    return moneypro_data
+
+
+def _profiled_process_bill_file(file_path, source_type, output_dir, cprofile_dir=None):
+    """
+    在子进程中处理单个账单文件并记录性能数据
+    
+    Returns:
+        (转换后的MoneyPro格式数据, 阶段记录字典列表)
+    """
+    profiler = PipelineProfiler(cprofile_dir=cprofile_dir)
+    set_profiler(profiler)
+    try:
+        moneypro_data = process_bill_file(file_path, source_type, output_dir)
+    finally:
+        set_profiler(None)
+    return moneypro_data, [record.to_dict() for record in profiler.records]
+
+
+def _warm_up_worker():
+    """
+    常驻进程池工作进程的初始化：预先加载分类器和jieba词典；
+    Ctrl+C 由主进程处理并关闭进程池，工作进程忽略
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _get_converter().warm_up()
+
+
+def _iter_processed_files(bill_files, output_dir, jobs=1, executor=None):
+    """
+    依次返回每个账单文件的处理结果
+    jobs大于1时使用进程池并行处理，结果仍按bill_files的顺序返回
+    
+    Args:
+        bill_files: (文件路径, 账单类型) 列表
+        output_dir: 输出目录
+        jobs: 并行进程数
+        executor: 常驻的进程池，为None时按需创建并在处理完后关闭
         
-        if source_data is not None:
-            # 转换为MoneyPro格式
-            converter = BillConverter()
-            moneypro_data = converter.convert_to_moneypro(source_data, source_type)
+    Yields:
+        转换后的MoneyPro格式数据或None
+    """
+    if jobs <= 1 or len(bill_files) <= 1:
+        for file_path, source_type in bill_files:
+            yield process_bill_file(file_path, source_type, output_dir)
+        return
+    
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(bill_files))) as executor:
+            yield from _iter_processed_files(bill_files, output_dir, jobs, executor)
+        return
+    
+    file_paths = [file_path for file_path, _ in bill_files]
+    source_types = [source_type for _, source_type in bill_files]
+    print(f"使用 {min(jobs, len(bill_files))} 个进程并行处理 {len(bill_files)} 个账单文件")
+    profiler = get_profiler()
+    # executor.map按提交顺序返回结果，保证去重输入的顺序确定
+    if not profiler.enabled:
+        yield from executor.map(process_bill_file, file_paths, source_types,
+                                [output_dir] * len(bill_files))
+        return
+    
+    # 启用性能分析时，子进程返回各自的阶段记录，由主进程汇总
+    results = executor.map(_profiled_process_bill_file, file_paths, source_types,
+                           [output_dir] * len(bill_files),
+                           [profiler.cprofile_dir] * len(bill_files))
+    for moneypro_data, records in results:
+        profiler.extend(records)
+        yield moneypro_data
+
+
+def _iter_cached_files(bill_files, output_dir, jobs=1, cache=None, executor=None):
+    """
+    按bill_files的顺序返回每个账单文件的处理结果，内容未变化的文件直接读取缓存
+    全部结果返回后才保存缓存清单，调用方需要完整遍历
+    
+    Args:
+        bill_files: (文件路径, 账单类型) 列表
+        output_dir: 输出目录
+        jobs: 并行进程数
+        cache: 阶段缓存 (BillStageCache)，为None时不使用缓存
+        executor: 常驻的进程池，为None时按需创建
+        
+    Yields:
+        转换后的MoneyPro格式数据或None
+    """
+    if cache is None:
+        yield from _iter_processed_files(bill_files, output_dir, jobs, executor)
+        return
+    
+    cache.prune()
+    cached_indices = {
+        index for index, (file_path, source_type) in enumerate(bill_files)
+        if cache.contains(file_path, source_type)
+    }
+    missed_files = [item for index, item in enumerate(bill_files) if index not in cached_indices]
+    print(f"缓存命中 {len(cached_indices)} 个文件，需处理 {len(missed_files)} 个文件")
+    
+    missed_results = _iter_processed_files(missed_files, output_dir, jobs, executor)
+    for index, (file_path, source_type) in enumerate(bill_files):
+        if index in cached_indices:
+            with get_profiler().stage('cache_load', file=file_path) as stage:
+                moneypro_data = cache.load(file_path, source_type)
+                stage.rows_out = row_count(moneypro_data)
             if moneypro_data is not None:
-                bill_data_list.append(moneypro_data)
-                # 同时导出单个文件
-                filename = os.path.basename(file_path)
-                name, ext = os.path.splitext(filename)
+                print(f"使用缓存: {file_path}")
+                # 单个文件的导出结果缺失时重新导出
+                name, ext = os.path.splitext(os.path.basename(file_path))
                 output_path = os.path.join(output_dir, f"{name}_moneypro.csv")
-                exporter = MoneyProExporter()
-                exporter.export_to_csv(moneypro_data, output_path)
-                print(f"成功解析并转换: {file_path} -> {output_path}")
-            else:
-                print(f"转换失败: {file_path}")
+                if not os.path.exists(output_path):
+                    MoneyProExporter().export_to_csv(moneypro_data, output_path)
+                yield moneypro_data
+                continue
+            # 缓存读取失败时回退为重新处理
+            moneypro_data = process_bill_file(file_path, source_type, output_dir)
         else:
-            print(f"解析失败: {file_path}")
+            moneypro_data = next(missed_results)
+        cache.store(file_path, source_type, moneypro_data)
+        yield moneypro_data
     
-    if not bill_data_list:
+    cache.save()
+
+
+def auto_process_bills(stream_merge=False, jobs=1, use_cache=True, background_export=False):
+    """
+    自动处理原始账单目录下的所有文件
+    
+    Args:
+        stream_merge: 是否使用外存归并合并账单（各来源排序落盘后按日期窗口去重）
+        jobs: 解析、转换和导出单个文件阶段的并行进程数，0表示使用全部CPU核心
+        use_cache: 是否使用阶段缓存，内容未变化的账单文件直接读取上次的转换结果
+        background_export: 是否在后台线程中导出最终账单CSV，调用方需在退出前调用
+                           wait_for_background_exports()
+    
+    Returns:
+        合并去重后的账单数据（日期列为datetime类型），可直接导入数据库；
+        流式合并模式下数据不在内存中，以及处理失败时返回None
+    """
+    raw_bills_dir = Config.DEFAULT_BILLS_DIR
+    output_dir = Config.DEFAULT_OUTPUT_DIR
+    
+    # 确保输出目录存在
+    os.makedirs(output_dir, exist_ok=True)
+    
+    print(f"自动处理 {raw_bills_dir} 目录下的所有账单文件")
+    
+    # 查找所有账单文件
+    bill_files = find_bill_files(raw_bills_dir)
+    
+    if not bill_files:
+        print("未找到任何账单文件")
+        return
+    
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    
+    bill_data_list = []
+    # 流式合并模式下，转换结果立即落盘，不在内存中保留
+    merger = StreamingBillMerger() if stream_merge else None
+    converted_count = 0
+    cache = BillStageCache() if use_cache else None
+    for moneypro_data in _iter_cached_files(bill_files, output_dir, jobs, cache):
+        if moneypro_data is None:
+            continue
+        if merger is not None:
+            with get_profiler().stage('spill', rows_in=len(moneypro_data)):
+                merger.add_source(moneypro_data)
+        else:
+            bill_data_list.append(moneypro_data)
+        converted_count += 1
+    
+    if not converted_count:
         print("没有成功解析的账单")
+        if merger is not None:
+            merger.close()
         return
     
+    if merger is not None:
+        # 流式合并：k路归并后按日期窗口去重并增量写出
+        print("正在流式合并并去重账单...")
+        output_path = os.path.join(output_dir, "final_merged_bills.csv")
+        with merger, get_profiler().stage('stream_merge', file=output_path) as stage:
+            stage.rows_out = merger.merge_to_csv(output_path)
+            if stage.rows_out is not None:
+                print(f"成功导出合并后的账单到: {output_path}")
+            else:
+                print("导出失败")
+        return
+    
+    return merge_and_export_bills(bill_data_list, output_dir, background_export)
+
+
+def merge_and_export_bills(bill_data_list, output_dir, background_export=False):
+    """
+    合并、去重并导出最终账单
+    
+    Args:
+        bill_data_list: 转换后的账单数据列表
+        output_dir: 输出目录
+        background_export: 是否在后台线程中导出CSV
+        
+    Returns:
+        去重后的账单数据（日期列为datetime类型），失败时返回None
+    """
     # 合并并去重
     print("正在合并并去重账单...")
-    deduplicator = BillDeduplicator()
-    merged_data = deduplicator.deduplicate_bills(bill_data_list)
+    profiler = get_profiler()
+    with profiler.stage('dedup', rows_in=sum(len(data) for data in bill_data_list)) as stage:
+        deduplicator = BillDeduplicator()
+        merged_data = deduplicator.deduplicate_bills(bill_data_list)
+        stage.rows_out = row_count(merged_data)
     
-    if merged_data is not None:
-        # 导出结果
-        output_path = os.path.join(output_dir, "final_merged_bills.csv")
-        
-        exporter = MoneyProExporter()
-        if exporter.export_to_csv(merged_data, output_path):
-            print(f"成功导出合并后的账单到: {output_path}")
-        else:
-            print("导出失败")
-    else:
+    if merged_data is None:
         print("合并失败")
+        return None
+    
+    # 导出结果
+    output_path = os.path.join(output_dir, "final_merged_bills.csv")
+    if background_export:
+        # 后台线程导出的是去重结果本身，下面的类型转换在副本上进行，互不影响
+        _export_in_background(merged_data, output_path)
+    else:
+        with profiler.stage('export', file=output_path, rows_in=len(merged_data)):
+            _export_final_bills(merged_data, output_path)
+    
+    return to_typed_bills(merged_data)
+
+
+def to_typed_bills(merged_data):
+    """
+    将合并后的账单转换为带类型的数据：日期列解析为datetime，只解析一次
+    
+    Args:
+        merged_data: 合并去重后的账单数据
+    
+    Returns:
+        新的账单数据副本
+    """
+    typed_data = merged_data.copy()
+    if '日期' in typed_data.columns:
+        typed_data['日期'] = pd.to_datetime(typed_data['日期'], errors='coerce')
+    return typed_data
+
+
+def _export_final_bills(merged_data, output_path):
+    """
+    导出最终账单CSV（供MoneyPro导入）
+    """
+    if MoneyProExporter().export_to_csv(merged_data, output_path):
+        print(f"成功导出合并后的账单到: {output_path}")
+    else:
+        print("导出失败")
+
+
+# 尚未完成的后台导出线程
+_export_threads = []
+
+
+def _export_in_background(merged_data, output_path):
+    """
+    在后台线程中导出最终账单CSV
+    """
+    # 同一文件同时只允许一个写入者，先等待之前的导出完成
+    wait_for_background_exports()
+    thread = threading.Thread(target=_export_final_bills, args=(merged_data, output_path),
+                              name='final-bills-export')
+    thread.start()
+    _export_threads.append(thread)
+
+
+def wait_for_background_exports():
+    """
+    等待所有后台CSV导出完成
+    """
+    while _export_threads:
+        _export_threads.pop(0).join()
+
+
+def watch_bills(jobs=1, use_cache=True, import_db=True, poll_interval=None, debounce_seconds=None):
+    """
+    监视原始账单目录，新增或修改的账单文件在目录稳定后自动增量处理
+    
+    进程常驻，分类器和jieba词典只加载一次（jobs大于1时进程池在整个监视期间保持，
+    每个工作进程启动时加载一次）；每轮只重新解析变化的文件，
+    其余文件的转换结果保留在内存中，随后重新合并导出并更新数据库。
+    
+    删除的账单文件只从合并结果中去掉，数据库按账单主键增量更新，不会删除其中已导入的账单。
+    
+    Args:
+        jobs: 解析变化文件时的并行进程数
+        use_cache: 是否使用阶段缓存
+        import_db: 每轮处理后是否导入SQLite数据库
+        poll_interval: 轮询间隔（秒）
+        debounce_seconds: 目录保持不变多久后才开始处理（秒）
+    """
+    raw_bills_dir = Config.DEFAULT_BILLS_DIR
+    output_dir = Config.DEFAULT_OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    
+    # 预热分类器和jieba词典
+    print("正在加载分类器...")
+    _get_converter().warm_up()
+    
+    cache = BillStageCache() if use_cache else None
+    watcher = BillDirectoryWatcher(
+        lambda: [file_path for file_path, _ in find_bill_files(raw_bills_dir)],
+        poll_interval=poll_interval,
+        debounce_seconds=debounce_seconds
+    )
+    bill_frames = {}
+    # 解析变化文件的常驻进程池
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=_warm_up_worker) if jobs > 1 else None
+    
+    def refresh(changed_paths, removed_paths):
+        """重新处理变化的文件，然后合并导出并导入数据库"""
+        for file_path in removed_paths:
+            bill_frames.pop(file_path, None)
+            print(f"账单文件已删除: {file_path}")
+        
+        bill_files = find_bill_files(raw_bills_dir)
+        changed_files = [item for item in bill_files if item[0] in changed_paths]
+        # 完整遍历结果，处理完后才会保存缓存清单
+        results = list(_iter_cached_files(changed_files, output_dir, jobs, cache, executor))
+        for (file_path, _), moneypro_data in zip(changed_files, results):
+            if moneypro_data is None:
+                bill_frames.pop(file_path, None)
+            else:
+                bill_frames[file_path] = moneypro_data
+        
+        # 按文件顺序合并，保证去重结果确定
+        bill_data_list = [bill_frames[file_path] for file_path, _ in bill_files if file_path in bill_frames]
+        if not bill_data_list:
+            print("没有成功解析的账单")
+            return
+        
+        merged_data = merge_and_export_bills(bill_data_list, output_dir, background_export=import_db)
+        if merged_data is not None and import_db:
+            _import_bills_to_database(merged_data)
+        wait_for_background_exports()
+    
+    try:
+        # 首轮处理目录下的全部文件
+        state = watcher.snapshot()
+        refresh(set(state), [])
+        watcher.mark_seen(state)
+        
+        print(f"正在监视 {raw_bills_dir} 目录，按 Ctrl+C 退出")
+        while True:
+            changed_paths, removed_paths = watcher.wait_for_changes()
+            print(f"检测到 {len(changed_paths)} 个文件变化，{len(removed_paths)} 个文件删除")
+            refresh(set(changed_paths), removed_paths)
+    except KeyboardInterrupt:
+        print("\n已停止监视")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _import_bills_to_database(merged_data):
+    """
+    将最终账单导入Metabase使用的SQLite数据库
+    
+    Args:
+        merged_data: 合并去重后的账单数据
+    """
+    # 延迟导入，只有监视模式需要访问数据库
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if project_root not in sys.path:
+        sys.path.append(project_root)
+    from metabase.import_data import import_bills_dataframe
+    
+    if not import_bills_dataframe(merged_data):
+        print("账单数据导入失败")
 
 
 def interactive_mode():
@@ -46,6 +46,34 @@ class MoneyProExporter:
             print(f"导出文件时出错: {e}")
             return False
     
+    def export_chunks_to_csv(self, chunks, output_path):
+        """
+        将分块数据逐块追加导出为MoneyPro支持的CSV格式
+        
+        Args:
+            chunks: 数据块迭代器，每个元素为pandas DataFrame，列需一致
+            output_path: 输出文件路径
+            
+        Returns:
+            导出是否成功
+        """
+        try:
+            # 确保输出目录存在
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            
+            written = False
+            for chunk in chunks:
+                if not written:
+                    # 第一块写入BOM和标题行
+                    chunk.to_csv(output_path, index=False, encoding='utf-8-sig')
+                    written = True
+                else:
+                    chunk.to_csv(output_path, mode='a', header=False, index=False, encoding='utf-8')
+            return written
+        except Exception as e:
+            print(f"导出文件时出错: {e}")
+            return False
+    
     def export_to_ofx(self, data, output_path):
         """
         导出数据为MoneyPro兼容的OFX格式
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+资产管理服务运行指标测试
+"""
+
+import sys
+import os
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api_metrics import APIMetrics, LatencyStats
+
+
+class TestAPIMetrics(unittest.TestCase):
+
+    def test_quantiles_and_buckets(self):
+        """测试直方图分桶和最近请求的分位数"""
+        stats = LatencyStats()
+        for i in range(1, 101):
+            stats.observe(i / 1000)
+        self.assertEqual(stats.count, 100)
+        self.assertEqual(stats.bucket_counts[0], 1)
+        quantiles = stats.quantiles()
+        self.assertAlmostEqual(quantiles[0.5], 0.05)
+        self.assertAlmostEqual(quantiles[0.95], 0.095)
+        self.assertAlmostEqual(quantiles[0.99], 0.099)
+    
+    def test_render_prometheus_text(self):
+        """测试请求数、阶段耗时和缓存命中率的输出"""
+        metrics = APIMetrics()
+        metrics.start_request()
+        with metrics.phase('db'):
+            pass
+        with metrics.phase('serialize'):
+            pass
+        duration, phases = metrics.finish_request('/api/assets', 'GET', 200)
+        self.assertEqual(sorted(phases), ['db', 'serialize'])
+        self.assertIsNone(metrics.finish_request('/api/assets', 'GET', 200))
+        metrics.cache_result('asset_list', True)
+        metrics.cache_result('asset_list', False)
+        
+        text = metrics.render().decode('utf-8')
+        self.assertIn('asset_api_requests_total{route="/api/assets",method="GET",status="200"} 1', text)
+        self.assertIn('asset_api_request_duration_seconds_count{route="/api/assets"} 1', text)
+        self.assertIn('asset_api_phase_seconds_total{route="/api/assets",phase="db"}', text)
+        self.assertIn('asset_api_cache_hit_ratio{cache="asset_list"} 0.5000', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
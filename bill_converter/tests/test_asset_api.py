@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+资产管理服务测试
+"""
+
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+import unittest
+from http.client import HTTPConnection
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import asset_api
+import fx_provider
+from fx_provider import FXRateProvider, StaticRateSource
+from metabase.asset_store import save_asset, delete_asset, get_asset
+
+
+def make_asset(asset_id):
+    """构造一条手动资产"""
+    return {'id': asset_id, '账户分类': '现金', '币种': 'CNY', '金额': 1.0, '描述': asset_id,
+            '时间': '2024-01-01 10:00:00', '对应人民币金额': 1.0, '资产_负债': '资产'}
+
+
+def cached_asset_count():
+    """在当前线程中按服务的处理方式读取资产列表（检查外部修改后读取共享缓存）"""
+    conn = asset_api.get_connection()
+    asset_api.check_external_changes(conn)
+    response = asset_api.ASSET_LIST_CACHE.get(lambda: asset_api.AssetAPIHandler._serialize_assets(None, conn))
+    return len(json.loads(response.body))
+
+
+def run_in_new_thread(func):
+    """在新的工作线程（使用新的数据库连接）中执行并返回结果"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+class TestAssetListCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.previous_db_path = asset_api.DB_PATH
+        asset_api.DB_PATH = os.path.join(self.temp_dir.name, 'billing.db')
+        asset_api.ASSET_LIST_CACHE.invalidate()
+    
+    def tearDown(self):
+        asset_api.DB_PATH = self.previous_db_path
+        asset_api.ASSET_LIST_CACHE.invalidate()
+        self.temp_dir.cleanup()
+    
+    def external_write(self, func):
+        """模拟导入脚本等其他进程修改数据库"""
+        conn = sqlite3.connect(asset_api.DB_PATH)
+        func(conn)
+        conn.close()
+    
+    def test_new_worker_sees_external_write(self):
+        """测试外部修改后，新工作线程不会返回其他线程缓存的旧资产列表"""
+        run_in_new_thread(lambda: save_asset(asset_api.get_connection(), make_asset('a1')))
+        self.assertEqual(run_in_new_thread(cached_asset_count), 1)
+        
+        self.external_write(lambda conn: save_asset(conn, make_asset('a2')))
+        self.assertEqual(run_in_new_thread(cached_asset_count), 2)
+    
+    def test_same_worker_sees_external_write(self):
+        """测试同一工作线程在外部修改后重新生成资产列表"""
+        def scenario():
+            save_asset(asset_api.get_connection(), make_asset('a1'))
+            before = cached_asset_count()
+            self.external_write(lambda conn: delete_asset(conn, 'a1'))
+            return before, cached_asset_count()
+        
+        self.assertEqual(run_in_new_thread(scenario), (1, 0))
+
+
+class TestAssetBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.previous_db_path = asset_api.DB_PATH
+        asset_api.DB_PATH = os.path.join(self.temp_dir.name, 'billing.db')
+        asset_api.ASSET_LIST_CACHE.invalidate()
+        self.previous_provider = fx_provider._default_provider
+        fx_provider._default_provider = FXRateProvider(':memory:', source=StaticRateSource({'USD': 7.0}))
+        
+        self.server = asset_api.ThreadPoolHTTPServer(('127.0.0.1', 0), asset_api.AssetAPIHandler, workers=2)
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.start()
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+        fx_provider._default_provider = self.previous_provider
+        asset_api.DB_PATH = self.previous_db_path
+        asset_api.ASSET_LIST_CACHE.invalidate()
+        self.temp_dir.cleanup()
+    
+    def request(self, method, path, body=None):
+        """发送请求，返回 (状态码, 响应体)"""
+        conn = HTTPConnection('127.0.0.1', self.server.server_address[1])
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        conn.request(method, path, body=payload, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        data = response.read()
+        conn.close()
+        if response.getheader('Content-Type') == 'application/json':
+            data = json.loads(data)
+        return response.status, data
+    
+    def test_unknown_currency_rejected(self):
+        """测试批量和单条保存时没有汇率的币种返回400，不按1:1保存"""
+        status, data = self.request('POST', '/api/assets/batch', [
+            {'accountType': '股票', 'currency': 'usd', 'amount': 10, 'description': '美股'},
+            {'accountType': '现金', 'currency': 'XYZ', 'amount': 10, 'description': '未知币种'},
+        ])
+        self.assertEqual(status, 200)
+        self.assertEqual(data['saved'], 1)
+        self.assertEqual([result['status'] for result in data['results']], [201, 400])
+        self.assertEqual(data['results'][0]['asset']['cnyAmount'], 70.0)
+        
+        for method, path in (('POST', '/api/assets'), ('PUT', '/api/assets/a1')):
+            status, data = self.request(method, path, {'accountType': '现金', 'currency': 'GBP', 'amount': 10,
+                                                       'description': '英镑'})
+            self.assertEqual(status, 400)
+            self.assertIn('GBP', data['error'])
+        self.assertEqual(len(self.request('GET', '/api/assets')[1]), 1)
+    
+    def test_batch_delete_and_reserved_path(self):
+        """测试批量删除的逐项结果，批量接口路径不会被当作资产id"""
+        _, data = self.request('POST', '/api/assets/batch', [
+            {'accountType': '现金', 'currency': 'CNY', 'amount': 1, 'description': '钱包'},
+        ])
+        asset_id = data['results'][0]['asset']['id']
+        
+        status, _ = self.request('PUT', '/api/assets/batch',
+                                 {'accountType': '现金', 'currency': 'CNY', 'amount': 1, 'description': '钱包'})
+        self.assertEqual(status, 405)
+        self.assertEqual(self.request('GET', '/api/assets/batch')[0], 405)
+        self.assertIsNone(get_asset(asset_api.get_connection(), 'batch'))
+        
+        status, data = self.request('DELETE', '/api/assets/batch', [asset_id, 'missing', 5])
+        self.assertEqual(status, 200)
+        self.assertEqual(data['deleted'], 1)
+        self.assertEqual([result['status'] for result in data['results']], [200, 404, 400])
+        self.assertEqual(self.request('GET', '/api/assets')[1], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+资产转换测试
+"""
+
+import sys
+import os
+import io
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import fx_provider
+from asset_converter import convert_asset_frame, convert_asset_frames, convert_assets
+from fx_provider import FXRateProvider, StaticRateSource
+
+
+class TestAssetConverter(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.raw_dir = os.path.join(self.temp_dir, 'raw_assets')
+        self.output_dir = os.path.join(self.temp_dir, 'assets')
+        os.makedirs(self.raw_dir)
+        self.source = StaticRateSource({'USD': 7.0, 'HKD': 0.9})
+        self.previous_provider = fx_provider._default_provider
+        fx_provider._default_provider = FXRateProvider(':memory:', source=self.source)
+    
+    def tearDown(self):
+        fx_provider._default_provider = self.previous_provider
+        shutil.rmtree(self.temp_dir)
+    
+    def test_convert_frame(self):
+        """测试按币种换算人民币金额并判断资产/负债"""
+        df = pd.DataFrame({'账户分类': ['银行卡', '信用卡', '其他资产'], '币种': ['CNY', 'usd ', 'XYZ'],
+                           '金额': [100.0, 10.0, 5.0], '描述': ['a', 'b', 'c']})
+        result = convert_asset_frame(df, {'CNY': 1.0, 'USD': 7.0}, '2024-01-01 00:00:00')
+        self.assertEqual(result['对应人民币金额'].tolist()[:2], [100.0, 70.0])
+        self.assertTrue(pd.isna(result['对应人民币金额'].iloc[2]))
+        self.assertEqual(result['资产/负债'].tolist(), ['资产', '负债', '资产'])
+        self.assertEqual(result['时间'].unique().tolist(), ['2024-01-01 00:00:00'])
+    
+    def test_convert_all_files(self):
+        """测试每个资产文件分别输出快照，汇率只获取一次"""
+        pd.DataFrame({'账户分类': ['银行卡'], '币种': ['USD'], '金额': [10], '描述': ['a']}).to_csv(
+            os.path.join(self.raw_dir, 'us.csv'), index=False)
+        pd.DataFrame({'账户分类': ['银行卡'], '币种': ['HKD'], '金额': [10], '描述': ['b']}).to_csv(
+            os.path.join(self.raw_dir, 'hk.csv'), index=False)
+        
+        self.assertTrue(convert_assets(self.raw_dir, self.output_dir, workers=2))
+        output_files = sorted(os.listdir(self.output_dir))
+        self.assertEqual(len(output_files), 2)
+        self.assertTrue(output_files[0].endswith('_hk_asset.csv'))
+        self.assertEqual(output_files[0][:15], output_files[1][:15])
+        self.assertEqual(self.source.calls, 1)
+    
+    def test_convert_frames_in_memory(self):
+        """测试转换结果按快照文件名返回，与写出的CSV一致"""
+        pd.DataFrame({'账户分类': ['信用卡'], '币种': ['USD'], '金额': [10], '描述': ['a']}).to_csv(
+            os.path.join(self.raw_dir, 'us.csv'), index=False)
+        
+        success, frames = convert_asset_frames(self.raw_dir, self.output_dir)
+        self.assertTrue(success)
+        self.assertEqual(sorted(frames), sorted(os.listdir(self.output_dir)))
+        converted = next(iter(frames.values()))
+        self.assertEqual(converted['对应人民币金额'].tolist(), [70.0])
+        self.assertEqual(converted['资产/负债'].tolist(), ['负债'])
+    
+    def test_unpriced_currency_is_left_empty(self):
+        """测试没有汇率的币种不按1:1换算，对应人民币金额留空并提示币种"""
+        pd.DataFrame({'账户分类': ['银行卡', '银行卡'], '币种': ['USD', 'GBP'], '金额': [10, 10],
+                      '描述': ['a', 'b']}).to_csv(os.path.join(self.raw_dir, 'mixed.csv'), index=False)
+        
+        output = io.StringIO()
+        with redirect_stdout(output):
+            success, frames = convert_asset_frames(self.raw_dir, self.output_dir)
+        self.assertTrue(success)
+        converted = next(iter(frames.values()))
+        self.assertEqual(converted['对应人民币金额'].iloc[0], 70.0)
+        self.assertTrue(pd.isna(converted['对应人民币金额'].iloc[1]))
+        self.assertIn('GBP', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
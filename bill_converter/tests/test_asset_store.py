@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+资产快照存储测试
+"""
+
+import sys
+import os
+import sqlite3
+import unittest
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from metabase.asset_store import (CURRENT_ASSETS_TABLE, SNAPSHOTS_TABLE, asset_source_name,
+                                  store_asset_snapshot, save_asset, delete_asset, get_asset,
+                                  ensure_asset_tables, query_assets, save_assets, get_assets,
+                                  delete_assets)
+
+
+def make_assets(snapshot_time, rows):
+    """构造资产转换后的数据"""
+    df = pd.DataFrame(rows, columns=['账户分类', '币种', '金额', '描述', '对应人民币金额', '资产_负债'])
+    df['时间'] = snapshot_time
+    return df
+
+
+class TestAssetStore(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.rows = [
+            ('银行卡', 'CNY', 1000.0, '工资卡', 1000.0, '资产'),
+            ('信用卡', 'CNY', 200.0, '信用卡', 200.0, '负债'),
+        ]
+    
+    def tearDown(self):
+        self.conn.close()
+    
+    def count(self, table_name):
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    
+    def test_source_name(self):
+        """测试来源名称去掉时间戳前缀"""
+        self.assertEqual(asset_source_name('20240101_120000_asset.csv'), 'asset')
+        self.assertEqual(asset_source_name('assets/20240101_120000_hk_asset.csv'), 'hk_asset')
+    
+    def test_identical_snapshot_skipped(self):
+        """测试内容相同的快照被跳过，顺序和时间戳不影响判断"""
+        first = store_asset_snapshot(self.conn, make_assets('2024-01-01 10:00:00', self.rows), 'asset')
+        second = store_asset_snapshot(self.conn, make_assets('2024-01-02 10:00:00', self.rows[::-1]), 'asset')
+        self.assertIsNotNone(first)
+        self.assertIsNone(second)
+        self.assertEqual(self.count(SNAPSHOTS_TABLE), 1)
+        self.assertEqual(self.count(CURRENT_ASSETS_TABLE), 2)
+    
+    def test_new_snapshot_replaces_current(self):
+        """测试内容变化时保存新快照，当前资产只保留最新快照和手动资产"""
+        store_asset_snapshot(self.conn, make_assets('2024-01-01 10:00:00', self.rows), 'asset')
+        save_asset(self.conn, {'id': 'manual-1', '账户分类': '现金', '币种': 'CNY', '金额': 50.0,
+                               '描述': '钱包', '时间': '2024-01-01 11:00:00', '对应人民币金额': 50.0,
+                               '资产_负债': '资产'})
+        store_asset_snapshot(self.conn, make_assets('2024-02-01 10:00:00', self.rows[:1]), 'asset')
+        
+        self.assertEqual(self.count(SNAPSHOTS_TABLE), 2)
+        descriptions = [row[0] for row in self.conn.execute(
+            f"SELECT 描述 FROM {CURRENT_ASSETS_TABLE} ORDER BY 描述")]
+        self.assertEqual(descriptions, ['工资卡', '钱包'])
+        
+        self.assertEqual(delete_asset(self.conn, 'manual-1'), 1)
+        self.assertEqual(self.count(CURRENT_ASSETS_TABLE), 1)
+    
+    def test_legacy_table_migrated(self):
+        """测试旧版本 assets_records 表中重复追加的快照被合并，并保留为兼容视图"""
+        legacy = pd.concat([
+            make_assets('2024-01-01 10:00:00', self.rows),
+            make_assets('2024-01-02 10:00:00', self.rows),
+            make_assets('2024-01-03 10:00:00', self.rows[:1]),
+        ]).fillna('')
+        legacy.to_sql('assets_records', self.conn, index=False)
+        
+        ensure_asset_tables(self.conn)
+        self.assertEqual(self.count(SNAPSHOTS_TABLE), 2)
+        self.assertEqual(self.count('assets_records'), 1)
+        self.assertEqual(self.count('assets_records_legacy'), 5)
+    
+    
+    def test_save_asset_by_id(self):
+        """测试按id插入和更新资产"""
+        ensure_asset_tables(self.conn)
+        asset = {'id': 'a1', '账户分类': '现金', '币种': 'CNY', '金额': 50.0, '描述': '钱包',
+                 '时间': '2024-01-01 11:00:00', '对应人民币金额': 50.0, '资产_负债': '资产'}
+        save_asset(self.conn, asset)
+        save_asset(self.conn, dict(asset, 金额=80.0))
+        self.assertEqual(self.count(CURRENT_ASSETS_TABLE), 1)
+        self.assertEqual(get_asset(self.conn, 'a1')[3], 80.0)
+        self.assertIsNone(get_asset(self.conn, 'missing'))
+    
+    def test_query_assets_pages(self):
+        """测试按条件筛选并按 (时间, id) 分页查询"""
+        ensure_asset_tables(self.conn)
+        for i in range(5):
+            save_asset(self.conn, {'id': f'a{i}', '账户分类': '现金', '币种': 'USD' if i % 2 else 'CNY',
+                                   '金额': float(i), '描述': '', '时间': f'2024-01-0{i + 1} 10:00:00',
+                                   '对应人民币金额': float(i), '资产_负债': '资产'})
+        
+        pages, after = [], None
+        while True:
+            rows = query_assets(self.conn, ['id', '时间'], after=after, limit=2).fetchall()
+            if not rows:
+                break
+            pages.append([row[0] for row in rows])
+            after = (rows[-1][1], rows[-1][0])
+        self.assertEqual(pages, [['a0', 'a1'], ['a2', 'a3'], ['a4']])
+        
+        rows = query_assets(self.conn, ['id'], filters={'币种': ['USD']}, until='2024-01-04').fetchall()
+        self.assertEqual([row[0] for row in rows], ['a1', 'a3'])
+    
+    def test_save_assets_batch(self):
+        """测试在一个事务中批量保存资产，并按id批量查询"""
+        ensure_asset_tables(self.conn)
+        assets = [{'id': f'b{i}', '账户分类': '股票', '币种': 'USD', '金额': float(i), '描述': f'持仓{i}',
+                   '时间': '2024-01-01 10:00:00', '对应人民币金额': float(i) * 7, '资产_负债': '资产'}
+                  for i in range(600)]
+        save_assets(self.conn, assets)
+        save_assets(self.conn, [dict(assets[0], 金额=99.0)])
+        self.assertEqual(self.count(CURRENT_ASSETS_TABLE), 600)
+        
+        found = get_assets(self.conn, ['b0', 'b599', 'missing'])
+        self.assertEqual(sorted(found), ['b0', 'b599'])
+        self.assertEqual(found['b0'][3], 99.0)
+        
+        self.assertEqual(delete_assets(self.conn, ['b0', 'b1', 'b0', 'missing']), {'b0', 'b1'})
+        self.assertEqual(self.count(CURRENT_ASSETS_TABLE), 598)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+基准测试数据生成器测试
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alipay.parser import AlipayBillParser
+from bank.parser import BankBillParser
+from wechat.parser import WechatBillParser
+from bench.generators import BillDataGenerator, write_alipay_csv, write_wechat_xlsx, write_cmb_pdf
+from bench.runner import parse_size, compare_with_baseline
+
+
+class TestBillDataGenerator(unittest.TestCase):
+
+    def setUp(self):
+        """测试前准备"""
+        self.generator = BillDataGenerator(200, merchants=20, transfer_ratio=0.1, duplicate_ratio=0.2)
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.output_dir = temp_dir.name
+    
+    def test_records_are_reproducible(self):
+        """测试相同参数生成相同数据"""
+        other = BillDataGenerator(200, merchants=20, transfer_ratio=0.1, duplicate_ratio=0.2)
+        self.assertEqual(self.generator.alipay_records(), other.alipay_records())
+        self.assertEqual(self.generator.bank_records(), other.bank_records())
+        self.assertEqual(len(self.generator.wechat_records()), 200)
+    
+    def test_generated_files_can_be_parsed(self):
+        """测试生成的账单文件可以被解析器读取"""
+        alipay_path = os.path.join(self.output_dir, 'alipay.csv')
+        write_alipay_csv(alipay_path, self.generator.alipay_records())
+        alipay_data = AlipayBillParser().parse_file(alipay_path)
+        self.assertEqual(len(alipay_data), 200)
+        
+        wechat_records = self.generator.wechat_records()
+        wechat_path = os.path.join(self.output_dir, 'wechat.xlsx')
+        write_wechat_xlsx(wechat_path, wechat_records)
+        wechat_data = WechatBillParser().parse_file(wechat_path)
+        self.assertEqual(len(wechat_data), 200)
+        self.assertEqual(wechat_data['交易对方'].tolist(), [r['counterparty'] for r in wechat_records])
+        
+        bank_path = os.path.join(self.output_dir, 'bank.pdf')
+        write_cmb_pdf(bank_path, self.generator.bank_records())
+        bank_data = BankBillParser().parse_file(bank_path, 'cmb')
+        self.assertEqual(len(bank_data), 200)
+    
+    def test_parse_size(self):
+        """测试数据规模解析"""
+        self.assertEqual(parse_size('1k'), 1000)
+        self.assertEqual(parse_size('1m'), 1000000)
+        self.assertEqual(parse_size('250'), 250)
+    
+    def test_compare_with_baseline(self):
+        """测试吞吐量回退检测"""
+        baseline = {'results': [{'size': 1000, 'source': 'alipay', 'stage': 'parse', 'rows_per_sec': 1000.0}]}
+        report = {'results': [{'size': 1000, 'source': 'alipay', 'stage': 'parse', 'rows_per_sec': 700.0}]}
+        self.assertEqual(len(compare_with_baseline(report, baseline, 0.2)), 1)
+        self.assertEqual(compare_with_baseline(report, baseline, 0.5), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+账单查询测试
+"""
+
+import sys
+import os
+import sqlite3
+import unittest
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from metabase import bill_queries
+from metabase.bill_keys import generate_bill_keys
+from metabase.bill_queries import query_bills, bill_summary
+from metabase.billing_schema import BILLING_TABLE, BILL_KEY_COLUMN, ROLLUP_TABLES, upsert_bills
+
+
+class TestBillQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        df = pd.DataFrame([
+            ('2023-01-05 08:00:00', -10.0, '支付宝', '早餐', '早餐店', '餐饮'),
+            ('2023-01-20 12:00:00', -30.0, '支付宝', '午餐', '川菜餐厅', '餐饮'),
+            ('2023-01-20 12:00:00', -5.0, '微信', '饮料', '便利店', '餐饮'),
+            ('2023-02-01 09:00:00', 500.0, '银行', '工资', '公司', '工资'),
+            ('2023-02-03 19:00:00', -20.0, '微信', '晚餐', '西餐厅', '餐饮'),
+        ], columns=['日期', '金额', '源账户', '描述', '代理', '类别'])
+        df[BILL_KEY_COLUMN] = generate_bill_keys(df)
+        upsert_bills(self.conn, df)
+    
+    def tearDown(self):
+        self.conn.close()
+    
+    def test_table_names_match_schema(self):
+        """测试查询使用的表名与账单表结构一致"""
+        self.assertEqual(bill_queries.BILLING_TABLE, BILLING_TABLE)
+        self.assertIn(bill_queries.MONTHLY_CATEGORY_TABLE, ROLLUP_TABLES)
+        self.assertIn(bill_queries.DAILY_ACCOUNT_TABLE, ROLLUP_TABLES)
+    
+    def test_keyset_pages(self):
+        """测试按 (日期, rowid) 分页，日期相同的账单不会重复或遗漏"""
+        descriptions, after = [], None
+        while True:
+            rows = query_bills(self.conn, after=after, limit=2)
+            if not rows:
+                break
+            descriptions += [row[7] for row in rows]
+            after = (rows[-1][2], rows[-1][0])
+        self.assertEqual(descriptions, ['早餐', '午餐', '饮料', '工资', '晚餐'])
+    
+    def test_filters(self):
+        """测试日期范围、类别、账户和交易对方筛选"""
+        rows = query_bills(self.conn, since='2023-01-06', until='2023-02-01', categories=['餐饮'])
+        self.assertEqual([row[7] for row in rows], ['午餐', '饮料'])
+        rows = query_bills(self.conn, accounts=['微信'], counterparty='餐厅')
+        self.assertEqual([row[7] for row in rows], ['晚餐'])
+    
+    def test_summary_from_rollups(self):
+        """测试按月、类别和按月、账户的汇总"""
+        self.assertEqual(bill_summary(self.conn, since_month=202301, until_month=202301),
+                         [(202301, '餐饮', 0.0, 45.0, -45.0, 3)])
+        rows = bill_summary(self.conn, categories=['微信'], by='account')
+        self.assertEqual(rows, [(202301, '微信', 0.0, 5.0, -5.0, 1), (202302, '微信', 0.0, 20.0, -20.0, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+账单数据库写入测试
+"""
+
+import sys
+import os
+import sqlite3
+import unittest
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from metabase.bill_keys import generate_bill_key, generate_bill_keys
+from metabase.billing_schema import (BILLING_TABLE, BILL_KEY_COLUMN, upsert_bills, table_columns,
+                                     prepare_bill_records)
+
+
+def make_bills(rows):
+    """构造导入数据库前的账单数据"""
+    return pd.DataFrame(rows, columns=['日期', '金额', '源账户', '描述', '代理'])
+
+
+class TestBillKeys(unittest.TestCase):
+
+    def test_md5_matches_row_keys(self):
+        """测试批量生成的MD5主键与逐行生成的结果一致"""
+        df = make_bills([
+            ('2023-01-01 10:00:00', -100.0, '支付宝', '购物', '超市'),
+            ('2023-01-02 00:00:00', 0.0, '银行', np.nan, ''),
+            ('', -8.5, '微信', '早餐', None),
+        ])
+        df['交易日期'] = ['', '', '2023-01-03']
+        self.assertEqual(list(generate_bill_keys(df)), list(df.apply(generate_bill_key, axis=1)))
+    
+    def test_hash64_keys(self):
+        """测试64位主键为整数且缺失值视为相同"""
+        df = make_bills([
+            ('2023-01-01 10:00:00', -100.0, '支付宝', np.nan, '超市'),
+            ('2023-01-01 10:00:00', -100.0, '支付宝', '', '超市'),
+            ('2023-01-01 10:00:00', -100.0, '支付宝', '购物', '超市'),
+        ])
+        keys = generate_bill_keys(df, 'hash64')
+        self.assertEqual(keys.dtype, np.int64)
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[1], keys[2])
+
+
+class TestPrepareBillRecords(unittest.TestCase):
+
+    def test_datetime_dates_are_used_directly(self):
+        """测试datetime类型的日期直接使用，文本日期按固定格式解析"""
+        typed = make_bills([(pd.Timestamp('2023-03-05 08:30:00'), -1.0, '支付宝', '', '')])
+        text = make_bills([('2023-03-05 08:30:00', -1.0, '支付宝', '', ''),
+                           ('05/03/2023', -1.0, '支付宝', '', '')])
+        
+        typed = prepare_bill_records(typed)
+        text = prepare_bill_records(text)
+        self.assertEqual(typed['日期'].tolist(), ['2023-03-05 08:30:00'])
+        self.assertEqual(typed['日期_epoch'].tolist(), [1678005000])
+        self.assertEqual(text['日期'].iloc[0], '2023-03-05 08:30:00')
+        self.assertTrue(pd.isna(text['日期'].iloc[1]))
+
+
+class TestUpsertBills(unittest.TestCase):
+
+    def setUp(self):
+        """测试前准备"""
+        self.conn = sqlite3.connect(':memory:')
+    
+    def tearDown(self):
+        self.conn.close()
+    
+    def test_upsert_updates_existing_keys(self):
+        """测试主键已存在时更新记录而不是重复插入"""
+        upsert_bills(self.conn, pd.DataFrame({
+            '账单主键': ['a', 'b'], '金额': [-10.0, -20.0], '描述': ['午餐', '打车']
+        }))
+        upsert_bills(self.conn, pd.DataFrame({
+            '账单主键': ['b', 'c'], '金额': [-25.0, -30.0], '描述': ['打车', '咖啡']
+        }))
+        
+        rows = self.conn.execute(f"SELECT 账单主键, 金额 FROM {BILLING_TABLE} ORDER BY 账单主键").fetchall()
+        self.assertEqual(rows, [('a', -10.0), ('b', -25.0), ('c', -30.0)])
+    
+    def test_legacy_table_is_migrated(self):
+        """测试旧版本创建的表会去除重复主键、补充新列并建立唯一索引"""
+        pd.DataFrame({'账单主键': ['a', 'a', 'b'], '金额': [-1.0, -2.0, -3.0]}).to_sql(
+            BILLING_TABLE, self.conn, index=False)
+        
+        upsert_bills(self.conn, pd.DataFrame({'账单主键': ['c'], '金额': [-4.0], '备注': ['新列']}))
+        
+        self.assertIn('备注', table_columns(self.conn, BILLING_TABLE))
+        rows = self.conn.execute(f"SELECT 账单主键, 金额 FROM {BILLING_TABLE} ORDER BY 账单主键").fetchall()
+        self.assertEqual(rows, [('a', -2.0), ('b', -3.0), ('c', -4.0)])
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.conn.execute(f"INSERT INTO {BILLING_TABLE} (账单主键) VALUES ('a')")
+    
+    
+    def test_migrate_md5_keys_to_hash64(self):
+        """测试切换主键算法时迁移已有数据，迁移后重复导入不产生新记录"""
+        df = make_bills([
+            ('2023-01-01 10:00:00', -100.0, '支付宝', '购物', '超市'),
+            ('2023-01-02 12:00:00', -30.0, '微信', '', '地铁'),
+        ])
+        md5_df = df.copy()
+        md5_df[BILL_KEY_COLUMN] = generate_bill_keys(md5_df, 'md5')
+        upsert_bills(self.conn, md5_df.fillna(''), 'md5')
+        
+        hash_df = df.copy()
+        hash_df[BILL_KEY_COLUMN] = generate_bill_keys(hash_df, 'hash64')
+        upsert_bills(self.conn, hash_df, 'hash64')
+        
+        rows = self.conn.execute(f"SELECT typeof(账单主键) FROM {BILLING_TABLE}").fetchall()
+        self.assertEqual(rows, [('integer',), ('integer',)])
+    
+    
+    def test_typed_columns_and_indexes(self):
+        """测试金额、日期列的类型和派生列，空字符串写入为NULL，并建立分析索引"""
+        df = make_bills([('2023-03-05 08:30:00', -12.34, '支付宝', '', '早餐店')])
+        df[BILL_KEY_COLUMN] = generate_bill_keys(df)
+        upsert_bills(self.conn, df)
+        upsert_bills(self.conn, df)
+        
+        row = self.conn.execute(
+            f"SELECT typeof(金额), 金额_分, 日期, 日期_epoch, 年月, 描述 FROM {BILLING_TABLE}"
+        ).fetchone()
+        self.assertEqual(row, ('real', -1234, '2023-03-05 08:30:00', 1678005000, 202303, None))
+        
+        indexes = {r[1] for r in self.conn.execute(f"PRAGMA index_list({BILLING_TABLE})")}
+        self.assertTrue({'idx_billing_records_date', 'idx_billing_records_category_date',
+                         'idx_billing_records_account_date'} <= indexes)
+    
+    
+    def test_rollups_follow_imports(self):
+        """测试汇总表随导入更新，只涉及导入数据所在的月份"""
+        df = make_bills([
+            ('2023-01-05 08:00:00', -10.0, '支付宝', '早餐', '早餐店'),
+            ('2023-01-20 12:00:00', -30.0, '支付宝', '午餐', '餐厅'),
+            ('2023-02-01 09:00:00', 500.0, '银行', '工资', '公司'),
+        ])
+        df['类别'] = ['餐饮', '餐饮', '工资']
+        df[BILL_KEY_COLUMN] = generate_bill_keys(df)
+        upsert_bills(self.conn, df)
+        
+        new_df = make_bills([('2023-02-03 19:00:00', -20.0, '微信', '晚餐', '餐厅')])
+        new_df['类别'] = ['餐饮']
+        new_df[BILL_KEY_COLUMN] = generate_bill_keys(new_df)
+        upsert_bills(self.conn, new_df)
+        
+        rows = self.conn.execute(
+            "SELECT 年月, 类别, 收入, 支出, 笔数 FROM monthly_category_totals ORDER BY 年月, 类别"
+        ).fetchall()
+        self.assertEqual(rows, [(202301, '餐饮', 0.0, 40.0, 2), (202302, '工资', 500.0, 0.0, 1),
+                                (202302, '餐饮', 0.0, 20.0, 1)])
+        rows = self.conn.execute(
+            "SELECT 日期, 源账户, 净额 FROM daily_account_totals WHERE 年月 = 202302 ORDER BY 日期"
+        ).fetchall()
+        self.assertEqual(rows, [('2023-02-01', '银行', 500.0), ('2023-02-03', '微信', -20.0)])
+    
+    
+    def test_rollups_use_cny_amounts(self):
+        """测试汇总表按人民币金额统计，无法换算的外币账单只计入笔数"""
+        df = make_bills([
+            ('2023-01-05 08:00:00', -10.0, '支付宝', '早餐', '早餐店'),
+            ('2023-01-06 08:00:00', -5.0, '银行', '咖啡', '咖啡店'),
+            ('2023-01-07 08:00:00', -1000.0, '银行', '车票', '铁路'),
+        ])
+        df['类别'] = ['餐饮', '餐饮', '餐饮']
+        df['货币'] = ['CNY', 'USD', 'JPY']
+        df['人民币金额'] = [np.nan, -36.0, np.nan]
+        df[BILL_KEY_COLUMN] = generate_bill_keys(df)
+        upsert_bills(self.conn, df)
+        
+        row = self.conn.execute(
+            "SELECT 支出, 净额, 笔数 FROM monthly_category_totals WHERE 年月 = 202301"
+        ).fetchone()
+        self.assertEqual(row, (46.0, -46.0, 3))
+    
+    
+    def test_invalid_import_leaves_table_untouched(self):
+        """测试暂存数据校验失败时账单表和汇总表保持不变"""
+        df = make_bills([('2023-01-05 08:00:00', -10.0, '支付宝', '早餐', '早餐店')])
+        df[BILL_KEY_COLUMN] = generate_bill_keys(df)
+        upsert_bills(self.conn, df)
+        
+        bad = make_bills([('2023-01-06 08:00:00', -5.0, '支付宝', '早餐', '早餐店')])
+        bad[BILL_KEY_COLUMN] = [None]
+        with self.assertRaises(ValueError):
+            upsert_bills(self.conn, bad)
+        
+        self.assertEqual(self.conn.execute(f"SELECT COUNT(*) FROM {BILLING_TABLE}").fetchone()[0], 1)
+        self.assertEqual(self.conn.execute("SELECT SUM(笔数) FROM monthly_category_totals").fetchone()[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+历史汇率测试
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import fx_provider
+from fx_provider import FXRateProvider, StaticRateSource
+from utils.fx_history import FXHistory, uses_fallback_rates
+from utils.converter import BillConverter
+
+
+def make_history():
+    """构造美元和欧元的历史汇率"""
+    return FXHistory(pd.DataFrame({
+        '日期': ['2024-01-01', '2024-01-10', '2024-01-01'],
+        '货币': ['USD', 'USD', 'eur'],
+        '汇率': [7.1, 7.2, 7.8],
+    }))
+
+
+class TestFXHistory(unittest.TestCase):
+
+    def test_as_of_rates(self):
+        """测试每笔交易使用交易日期当天或之前最近一天的汇率"""
+        history = make_history()
+        result = history.to_cny(
+            pd.Series([10.0, 10.0, 10.0, 10.0, -10.0]),
+            pd.Series(['USD', 'USD', 'USD', 'EUR', None]),
+            pd.Series(['2024-01-05 12:00:00', '2024-01-10 00:00:00', '2023-12-01 00:00:00',
+                       '2024-02-01 00:00:00', '2024-01-05 00:00:00']))
+        self.assertEqual(result.tolist(), [71.0, 72.0, 71.0, 78.0, -10.0])
+    
+    def test_unknown_currency_fallback(self):
+        """测试汇率文件中没有的货币批量获取一次当前汇率"""
+        history = make_history()
+        with patch.object(FXHistory, '_fallback_rates', return_value={'JPY': 0.05}) as fallback:
+            result = history.to_cny(pd.Series([100.0, 200.0, 1.0]), pd.Series(['JPY', 'JPY', 'XYZ']),
+                                    pd.Series(['2024-01-01'] * 3))
+        fallback.assert_called_once()
+        self.assertEqual(result.tolist()[:2], [5.0, 10.0])
+        self.assertTrue(np.isnan(result.iloc[2]))
+    
+    def test_provider_without_rate_leaves_nan(self):
+        """测试汇率提供器没有汇率的货币不按1:1换算，使用当前汇率的结果带有标记"""
+        previous_provider = fx_provider._default_provider
+        fx_provider._default_provider = FXRateProvider(':memory:', source=StaticRateSource({'JPY': 0.05}))
+        try:
+            history = make_history()
+            result = history.to_cny(pd.Series([100.0, 1.0]), pd.Series(['JPY', 'XYZ']),
+                                    pd.Series(['2024-01-01'] * 2))
+            dated = history.to_cny(pd.Series([10.0]), pd.Series(['USD']), pd.Series(['2024-01-01']))
+        finally:
+            fx_provider._default_provider = previous_provider
+        self.assertEqual(result.iloc[0], 5.0)
+        self.assertTrue(np.isnan(result.iloc[1]))
+        self.assertTrue(result.attrs['fx_fallback_rates'])
+        self.assertFalse(dated.attrs['fx_fallback_rates'])
+    
+    def test_bank_conversion_keeps_currency(self):
+        """测试银行账单保留交易货币并填充人民币金额"""
+        converter = BillConverter()
+        converter._fx_history = make_history()
+        data = pd.DataFrame({
+            '交易日期': ['2024-01-05 00:00:00', '2024-01-06 00:00:00'],
+            '货币': ['USD', 'CNY'],
+            '金额': [-10.0, -20.0],
+            '交易类型': ['消费', '消费'],
+            '交易对方': ['AMAZON', '超市'],
+        })
+        result = converter.convert_to_moneypro(data, 'bank')
+        self.assertEqual(result['货币'].tolist(), ['USD', 'CNY'])
+        self.assertEqual(result['人民币金额'].tolist(), [-71.0, -20.0])
+        self.assertFalse(uses_fallback_rates(result))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+汇率提供模块测试
+"""
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fx_provider import FXRateProvider, StaticRateSource, DEFAULT_RATES
+
+
+class OfflineRateSource:
+    """模拟网络不可用的汇率来源：等待一段时间后失败"""
+    
+    name = 'offline'
+    
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+    
+    def fetch_rates(self, currencies):
+        self.calls += 1
+        time.sleep(self.delay)
+        raise ConnectionError('network unreachable')
+
+
+class SlowRateSource(StaticRateSource):
+    """模拟响应较慢的汇率来源"""
+    
+    def fetch_rates(self, currencies):
+        time.sleep(0.2)
+        return super().fetch_rates(currencies)
+
+
+class TestFXRateProvider(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'fx_rates.db')
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def test_batch_lookup_cached(self):
+        """测试批量获取汇率，有效期内不重复请求汇率来源"""
+        source = StaticRateSource({'USD': 7.1, 'EUR': 7.7})
+        provider = FXRateProvider(self.db_path, source=source, ttl=3600)
+        
+        rates = provider.get_rates(['USD', 'eur', 'CNY', 'XYZ'])
+        self.assertEqual(rates, {'CNY': 1.0, 'USD': 7.1, 'EUR': 7.7, 'XYZ': 1.0})
+        self.assertEqual(provider.get_rate('USD'), 7.1)
+        provider.get_rates(['USD', 'EUR', 'XYZ'])
+        self.assertEqual(source.calls, 1)
+    
+    def test_rates_persisted(self):
+        """测试汇率保存到汇率表，新的提供器无需请求即可使用"""
+        FXRateProvider(self.db_path, source=StaticRateSource({'USD': 7.1}), ttl=3600).get_rate('USD')
+        
+        source = StaticRateSource({'USD': 9.9})
+        provider = FXRateProvider(self.db_path, source=source, ttl=3600)
+        self.assertEqual(provider.get_rate('USD'), 7.1)
+        self.assertEqual(source.calls, 0)
+    
+    def test_stale_rate_refreshed_in_background(self):
+        """测试过期的汇率先返回旧值，再在后台刷新"""
+        FXRateProvider(self.db_path, source=StaticRateSource({'USD': 7.1}), ttl=3600).get_rate('USD')
+        
+        provider = FXRateProvider(self.db_path, source=SlowRateSource({'USD': 7.3}), ttl=0)
+        self.assertEqual(provider.get_rate('USD'), 7.1)
+        for thread in threading.enumerate():
+            if thread.name == 'fx-refresh':
+                thread.join()
+        self.assertEqual(provider._rates['USD'][0], 7.3)
+    
+    def test_offline_does_not_block(self):
+        """测试网络不可用时在超时后使用预设汇率，之后的调用不再等待"""
+        source = OfflineRateSource(delay=0.5)
+        provider = FXRateProvider(self.db_path, source=source, fetch_timeout=0.05, retry_interval=60)
+        
+        start = time.perf_counter()
+        self.assertEqual(provider.get_rate('USD'), DEFAULT_RATES['USD'])
+        self.assertLess(time.perf_counter() - start, 0.4)
+        time.sleep(0.6)
+        
+        start = time.perf_counter()
+        self.assertEqual(provider.get_rate('EUR'), DEFAULT_RATES['EUR'])
+        self.assertLess(time.perf_counter() - start, 0.01)
+        self.assertEqual(source.calls, 1)
+        self.assertIsNone(provider.get_rate('GBP'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+账单阶段缓存测试
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+import pandas as pd
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from utils.fx_history import FALLBACK_RATES_ATTR
+from utils.stage_cache import BillStageCache
+
+
+class TestBillStageCache(unittest.TestCase):
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = self.temp_dir.name
+        self.cache_dir = os.path.join(self.work_dir, 'cache')
+        self.bill_path = os.path.join(self.work_dir, 'alipay_record_202301.csv')
+        with open(self.bill_path, 'w', encoding='utf-8') as f:
+            f.write('原始账单内容')
+        self.data = pd.DataFrame({'日期': ['2023-01-01 10:00:00'], '金额': [-25.0]})
+    
+    def tearDown(self):
+        """测试后清理"""
+        self.temp_dir.cleanup()
+    
+    def test_store_and_load(self):
+        """测试写入后可从新的缓存实例读取"""
+        cache = BillStageCache(self.cache_dir)
+        self.assertIsNone(cache.load(self.bill_path, 'alipay'))
+        cache.store(self.bill_path, 'alipay', self.data)
+        cache.save()
+        
+        reloaded = BillStageCache(self.cache_dir)
+        self.assertTrue(reloaded.contains(self.bill_path, 'alipay'))
+        pd.testing.assert_frame_equal(reloaded.load(self.bill_path, 'alipay'), self.data)
+    
+    def test_content_change_invalidates(self):
+        """测试文件内容变化后缓存失效"""
+        cache = BillStageCache(self.cache_dir)
+        cache.store(self.bill_path, 'alipay', self.data)
+        cache.save()
+        
+        with open(self.bill_path, 'a', encoding='utf-8') as f:
+            f.write('新增记录')
+        self.assertFalse(BillStageCache(self.cache_dir).contains(self.bill_path, 'alipay'))
+    
+    def test_parser_version_change_invalidates(self):
+        """测试解析器版本变化后缓存失效并被清除"""
+        cache = BillStageCache(self.cache_dir)
+        cache.store(self.bill_path, 'alipay', self.data)
+        cache.save()
+        
+        with patch.object(Config, 'PARSER_VERSION', 'next'):
+            upgraded = BillStageCache(self.cache_dir)
+            self.assertFalse(upgraded.contains(self.bill_path, 'alipay'))
+            upgraded.prune()
+            self.assertEqual(upgraded.manifest['entries'], {})
+    
+    def test_changed_or_removed_sources_are_pruned(self):
+        """测试来源文件内容变化或已删除的缓存条目被清除，同一缓存实例也能发现内容变化"""
+        other_path = os.path.join(self.work_dir, 'alipay_record_202302.csv')
+        with open(other_path, 'w', encoding='utf-8') as f:
+            f.write('另一份账单')
+        cache = BillStageCache(self.cache_dir)
+        cache.store(self.bill_path, 'alipay', self.data)
+        cache.store(other_path, 'alipay', self.data)
+        cache.save()
+        
+        with open(self.bill_path, 'a', encoding='utf-8') as f:
+            f.write('新增记录')
+        os.remove(other_path)
+        self.assertFalse(cache.contains(self.bill_path, 'alipay'))
+        cache.prune()
+        self.assertEqual(cache.manifest['entries'], {})
+        self.assertEqual([name for name in os.listdir(self.cache_dir) if name.endswith('.pkl')], [])
+    
+    def test_fx_rates_change_invalidates(self):
+        """测试汇率目录下的汇率文件新增或修改后缓存失效"""
+        fx_dir = os.path.join(self.work_dir, 'raw_fx')
+        os.makedirs(fx_dir)
+        with patch.object(Config, 'DEFAULT_FX_DIR', fx_dir):
+            cache = BillStageCache(self.cache_dir)
+            cache.store(self.bill_path, 'alipay', self.data)
+            cache.save()
+            
+            rates_path = os.path.join(fx_dir, 'usd.csv')
+            with open(rates_path, 'w', encoding='utf-8') as f:
+                f.write('日期,货币,汇率\n2023-01-01,USD,6.9\n')
+            self.assertFalse(BillStageCache(self.cache_dir).contains(self.bill_path, 'alipay'))
+            
+            cache = BillStageCache(self.cache_dir)
+            cache.store(self.bill_path, 'alipay', self.data)
+            cache.save()
+            with open(rates_path, 'a', encoding='utf-8') as f:
+                f.write('2023-01-02,USD,7.0\n')
+            self.assertFalse(BillStageCache(self.cache_dir).contains(self.bill_path, 'alipay'))
+    
+    def test_fallback_rates_not_stored(self):
+        """测试使用当前汇率换算的转换结果不写入缓存"""
+        self.data.attrs[FALLBACK_RATES_ATTR] = True
+        cache = BillStageCache(self.cache_dir)
+        cache.store(self.bill_path, 'alipay', self.data)
+        self.assertFalse(cache.contains(self.bill_path, 'alipay'))
+
+
+if __name__ == '__main__':
+    unittest.main()
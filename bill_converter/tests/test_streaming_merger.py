@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+账单流式合并测试
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.deduplicator import BillDeduplicator
+from utils.streaming_merger import StreamingBillMerger
+
+
+def make_bills(source, rows):
+    """构造MoneyPro格式的账单数据"""
+    return pd.DataFrame([
+        {'日期': date, '金额': amount, '代理': agent, '源账户': source, '描述': desc, '货币': 'CNY'}
+        for date, amount, agent, desc in rows
+    ])
+
+
+class TestStreamingBillMerger(unittest.TestCase):
+
+    def setUp(self):
+        """测试前准备"""
+        self.alipay = make_bills('支付宝', [
+            ('2023-01-03 09:00:00', -25.0, '肯德基', '午餐'),
+            ('2023-01-01 10:00:00', -100.0, '超市', '购物'),
+            ('2023-01-02 12:00:00', -30.0, '地铁', '交通'),
+        ])
+        self.bank = make_bills('银行', [
+            ('2023-01-01 00:00:00', -100.0, '支付宝-超市', '快捷支付'),
+            ('2023-01-02 00:00:00', -8.0, '便利店', '消费'),
+            ('2023-01-03 00:00:00', -60.0, '加油站', '消费'),
+        ])
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = self.temp_dir.name
+    
+    def tearDown(self):
+        """测试后清理"""
+        self.temp_dir.cleanup()
+    
+    def test_matches_in_memory_deduplication(self):
+        """测试流式合并结果与内存去重结果一致"""
+        expected = BillDeduplicator().deduplicate_bills([self.alipay.copy(), self.bank.copy()])
+        
+        output_path = os.path.join(self.output_dir, 'merged.csv')
+        with StreamingBillMerger(chunk_rows=1, window_rows=1) as merger:
+            merger.add_source(self.alipay)
+            merger.add_source(self.bank)
+            written = merger.merge_to_csv(output_path)
+        
+        result = pd.read_csv(output_path)
+        self.assertEqual(written, len(expected))
+        self.assertEqual(list(result.columns), list(self.alipay.columns))
+        self.assertEqual(
+            sorted(zip(result['日期'], result['金额'], result['源账户'])),
+            sorted(zip(expected['日期'], expected['金额'], expected['源账户']))
+        )
+    
+    def test_transfer_context_across_windows(self):
+        """测试转账对过滤使用全部数据的交易对方信息：支付宝记录与转账对不在同一窗口时结果与内存去重一致"""
+        alipay = make_bills('支付宝', [
+            ('2023-01-01 10:00:00', -200.0, '张三', '转账'),
+        ])
+        wechat = make_bills('微信', [
+            ('2023-01-02 09:00:00', -50.0, '张三', '转账'),
+        ])
+        bank = make_bills('银行', [
+            ('2023-01-02 00:00:00', 50.0, '张三', '转账'),
+            ('2023-01-03 00:00:00', -8.0, '便利店', '消费'),
+        ])
+        expected = BillDeduplicator().deduplicate_bills([alipay.copy(), wechat.copy(), bank.copy()])
+        
+        with StreamingBillMerger(chunk_rows=1, window_rows=1) as merger:
+            for source in (alipay, wechat, bank):
+                merger.add_source(source)
+            self.assertGreater(len(list(merger.iter_windows())), 1)
+            result = pd.concat(list(merger.iter_deduplicated()), ignore_index=True)
+        
+        self.assertEqual(len(expected), 4)
+        self.assertEqual(
+            sorted(zip(result['日期'], result['金额'], result['源账户'])),
+            sorted(zip(expected['日期'], expected['金额'], expected['源账户']))
+        )
+    
+    def test_windows_split_on_date_boundaries(self):
+        """测试窗口只在日期边界处切分"""
+        with StreamingBillMerger(chunk_rows=2, window_rows=1) as merger:
+            merger.add_source(self.alipay)
+            merger.add_source(self.bank)
+            windows = list(merger.iter_windows())
+        
+        self.assertEqual(len(windows), 3)
+        for window in windows:
+            self.assertEqual(window['日期'].str[:10].nunique(), 1)
+            self.assertNotIn(StreamingBillMerger.MERGE_KEY, window.columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,5 +4,7 @@
 
 from .converter import BillConverter
 from .deduplicator import BillDeduplicator
+from .streaming_merger import StreamingBillMerger
+from .stage_cache import BillStageCache
 
-__all__ = ['BillConverter', 'BillDeduplicator']
\ No newline at end of file
+__all__ = ['BillConverter', 'BillDeduplicator', 'StreamingBillMerger', 'BillStageCache']
\ No newline at end of file
@@ -17,6 +17,8 @@ import re
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import Config
+from utils.profiler import get_profiler
+from utils.fx_history import FXHistory
 
 # 导入jieba分词库
 try:
@@ -41,6 +43,35 @@ class BillConverter:
         self.category_keywords = self._load_category_keywords()
         # 构建关键词索引以提高匹配效率
         self.keyword_index = self._build_keyword_index()
+        # 历史汇率在首次转换外币交易时加载
+        self._fx_history = None
+    
+    @property
+    def fx_history(self):
+        """
+        历史汇率（从汇率目录读取，首次使用时加载）
+        """
+        if self._fx_history is None:
+            self._fx_history = FXHistory.from_directory()
+        return self._fx_history
+    
+    def _add_cny_amounts(self, result):
+        """
+        按交易日期的汇率换算人民币金额，使用了当前汇率时在结果的 attrs 中标记（见 FXHistory.to_cny）
+        
+        Args:
+            result: 转换中的MoneyPro格式数据 (pandas DataFrame)，包含 金额、货币、日期 列
+        """
+        cny_amounts = self.fx_history.to_cny(result['金额'], result['货币'], result['日期'])
+        result['人民币金额'] = cny_amounts
+        result.attrs.update(cny_amounts.attrs)
+    
+    def warm_up(self):
+        """
+        预先加载jieba分词词典，避免首次分类时的延迟
+        """
+        if JIEBA_AVAILABLE:
+            jieba.initialize()
     
     def _load_category_keywords(self):
         """
@@ -253,7 +284,9 @@ class BillConverter:
             counterparty = row_data['交易对方'] if '交易对方' in data.columns else ''
             return self._classify_transaction(description, counterparty)
         
-        result['类别'] = [classify_row(i) for i in range(len(data))]
+        with get_profiler().stage('classify', rows_in=len(data)) as stage:
+            result['类别'] = [classify_row(i) for i in range(len(data))]
+            stage.rows_out = len(result)
             
         # 代理字段映射
         if '交易对方' in data.columns:
@@ -262,8 +295,10 @@ class BillConverter:
         # 源账户字段（默认为支付宝）
         result['源账户'] = '支付宝'
         
-        # 货币字段（默认为人民币）
-        result['货币'] = 'CNY'
+        # 货币字段：使用账单中的货币（没有时默认为人民币），并按交易日期的汇率换算人民币金额
+        result['货币'] = data['货币'].fillna('CNY') if '货币' in data.columns else 'CNY'
+        if '货币' in data.columns and '金额' in result.columns:
+            self._add_cny_amounts(result)
         
         return result
     
@@ -338,7 +373,9 @@ class BillConverter:
             full_description = f"{description} {counterparty} {transaction_type}".strip()
             return self._classify_transaction(full_description, counterparty)
         
-        result['类别'] = [classify_row(i) for i in range(len(data))]
+        with get_profiler().stage('classify', rows_in=len(data)) as stage:
+            result['类别'] = [classify_row(i) for i in range(len(data))]
+            stage.rows_out = len(result)
         
         # 代理字段映射
         if '交易对方' in data.columns:
@@ -347,8 +384,10 @@ class BillConverter:
         # 源账户字段（默认为微信）
         result['源账户'] = '微信'
         
-        # 货币字段（默认为人民币）
-        result['货币'] = 'CNY'
+        # 货币字段：使用账单中的货币（没有时默认为人民币），并按交易日期的汇率换算人民币金额
+        result['货币'] = data['货币'].fillna('CNY') if '货币' in data.columns else 'CNY'
+        if '货币' in data.columns and '金额' in result.columns:
+            self._add_cny_amounts(result)
         
         return result
     
@@ -404,8 +443,10 @@ class BillConverter:
         # 源账户字段（默认为银行）
         result['源账户'] = '银行'
         
-        # 货币字段（默认为人民币）
-        result['货币'] = 'CNY'
+        # 货币字段：使用账单中的货币（没有时默认为人民币），并按交易日期的汇率换算人民币金额
+        result['货币'] = data['货币'].fillna('CNY') if '货币' in data.columns else 'CNY'
+        if '货币' in data.columns and '金额' in result.columns:
+            self._add_cny_amounts(result)
         
         # 应用类别转换逻辑
         def classify_row(row_index):
@@ -415,7 +456,9 @@ class BillConverter:
             counterparty = row_data['交易对方'] if '交易对方' in data.columns else ''
             return self._classify_transaction(description, counterparty)
         
-        result['类别'] = [classify_row(i) for i in range(len(data))]
+        with get_profiler().stage('classify', rows_in=len(data)) as stage:
+            result['类别'] = [classify_row(i) for i in range(len(data))]
+            stage.rows_out = len(result)
         
         return result
     
@@ -9,6 +9,46 @@
 import pandas as pd
 
 
+def _normalize_date_for_comparison(date_str):
+    """
+    标准化日期格式，只保留日期部分（YYYY-MM-DD）用于比较
+    """
+    if not isinstance(date_str, str):
+        return ""
+    return date_str.split(' ')[0]
+
+
+def comparison_dates(df):
+    """
+    计算用于去重比较的日期列
+    如果存在_raw_date列，则使用它进行比较
+    
+    Args:
+        df: 账单数据
+        
+    Returns:
+        日期字符串序列 (pandas Series)
+    """
+    if '_raw_date' in df.columns:
+        return df['_raw_date']
+    return df['日期'].apply(_normalize_date_for_comparison)
+
+
+def alipay_agents(df):
+    """
+    有支付宝记录的交易对方集合
+    
+    Args:
+        df: 账单数据
+        
+    Returns:
+        交易对方集合
+    """
+    if '代理' not in df.columns or '源账户' not in df.columns:
+        return set()
+    return set(df.loc[df['源账户'] == '支付宝', '代理'].unique())
+
+
 class BillDeduplicator:
     """
     账单去重器类
@@ -20,36 +60,59 @@ class BillDeduplicator:
         """
         pass
     
-    def _filter_transfer_pairs(self, df):
+    def transfer_agent_groups(self, agents, alipay_agents):
         """
-        过滤同一交易对象的一对支出和收入转账
-        支持支付宝、微信、银行之间的相互转账过滤
+        按转账对过滤的规则将交易对方分组
         
         Args:
-            df: 原始数据
+            agents: 全部交易对方（按首次出现的顺序）
+            alipay_agents: 有支付宝记录的交易对方集合
             
         Returns:
-            过滤后的数据
+            (交易对方, 相似交易对方列表, 该组是否有支付宝记录) 的列表
         """
-        if '代理' not in df.columns or '金额' not in df.columns:
-            return df
-            
-        # 获取所有唯一的交易对方
-        unique_agents = df['代理'].unique()
         processed_agents = set()
-        rows_to_drop = []
+        groups = []
         
-        for agent in unique_agents:
+        for agent in agents:
             if agent in processed_agents or not isinstance(agent, str):
                 continue
                 
             # 查找与当前agent相似的所有agent（处理a.k.a. 小黄蜂(**咏)和**咏这样的情况）
-            similar_agents = self._find_similar_agents(agent, unique_agents)
+            similar_agents = self._find_similar_agents(agent, agents)
             
             # 标记已处理的agent
             for similar_agent in similar_agents:
                 processed_agents.add(similar_agent)
             
+            groups.append((agent, similar_agents, any(a in alipay_agents for a in similar_agents)))
+        return groups
+    
+    def _filter_transfer_pairs(self, df, agent_groups=None):
+        """
+        过滤同一交易对象的一对支出和收入转账
+        支持支付宝、微信、银行之间的相互转账过滤
+        
+        Args:
+            df: 原始数据
+            agent_groups: 交易对方分组（见 transfer_agent_groups），为None时按df中的交易对方分组；
+                          只处理df的一部分时应传入按全部数据计算的分组
+            
+        Returns:
+            过滤后的数据
+        """
+        if '代理' not in df.columns or '金额' not in df.columns:
+            return df
+            
+        if agent_groups is None:
+            agent_groups = self.transfer_agent_groups(df['代理'].unique(), alipay_agents(df))
+        present_agents = set(df['代理'].unique())
+        rows_to_drop = []
+        
+        for agent, similar_agents, has_alipay in agent_groups:
+            if present_agents.isdisjoint(similar_agents):
+                continue
+            
             # 获取所有相似agent的记录
             agent_mask = df['代理'].isin(similar_agents)
             agent_records = df[agent_mask]
@@ -57,7 +120,7 @@ class BillDeduplicator:
             if len(agent_records) > 1:
                 # 特殊处理：如果包含支付宝的转账记录，则保留这些记录
                 alipay_records = agent_records[agent_records['源账户'] == '支付宝']
-                if not alipay_records.empty:
+                if has_alipay:
                     # 保留支付宝记录，只过滤其他记录中的重复项
                     # 检查非支付宝记录中是否有与支付宝记录匹配的转账对
                     for _, alipay_row in alipay_records.iterrows():
@@ -181,10 +244,24 @@ class BillDeduplicator:
             
         # 合并所有账单数据
         if len(bills_data) == 1:
-            merged_data = bills_data[0]
+            # 复制一份，避免去重过程中添加的辅助列修改调用方的数据
+            merged_data = bills_data[0].copy()
         else:
             merged_data = pd.concat(bills_data, ignore_index=True)
         
+        return self.deduplicate_frame(merged_data)
+    
+    def deduplicate_frame(self, merged_data, agent_groups=None):
+        """
+        对已合并的账单数据进行转账对过滤和去重
+        
+        Args:
+            merged_data: 合并后的账单数据 (pandas DataFrame)
+            agent_groups: 转账对过滤使用的交易对方分组，为None时按merged_data计算
+            
+        Returns:
+            去重后的账单数据
+        """
         if merged_data.empty:
             return merged_data
             
@@ -192,28 +269,28 @@ class BillDeduplicator:
         
         # 先过滤同一交易对象的一对支出和收入转账
         original_count = len(merged_data)
-        merged_data = self._filter_transfer_pairs(merged_data)
+        merged_data = self._filter_transfer_pairs(merged_data, agent_groups)
         after_transfer_filter = len(merged_data)
         if original_count != after_transfer_filter:
             print(f"转账对过滤后剩余 {after_transfer_filter} 条记录，过滤了 {original_count - after_transfer_filter} 条记录")
         
         # 根据付款时间、金额去重，优先保留支付宝或微信的账单
+        return self._deduplicate_by_date_amount(merged_data)
+    
+    def _deduplicate_by_date_amount(self, merged_data):
+        """
+        根据付款时间、金额去重，优先保留支付宝或微信的账单
+        
+        Args:
+            merged_data: 已过滤转账对的合并账单数据
+            
+        Returns:
+            去重后的账单数据
+        """
         # 先按日期和金额分组
         if '日期' in merged_data.columns and '金额' in merged_data.columns:
-            # 创建一个用于去重的辅助列
-            # 标准化日期格式，只保留日期部分用于比较
-            def normalize_date_for_comparison(date_str):
-                if not isinstance(date_str, str):
-                    return ""
-                # 只保留日期部分（YYYY-MM-DD）
-                return date_str.split(' ')[0]
-            
             # 为去重创建标准化的日期金额标识
-            # 如果存在_raw_date列，则使用它进行比较
-            if '_raw_date' in merged_data.columns:
-                merged_data['_comparison_date'] = merged_data['_raw_date']
-            else:
-                merged_data['_comparison_date'] = merged_data['日期'].apply(normalize_date_for_comparison)
+            merged_data['_comparison_date'] = comparison_dates(merged_data)
             merged_data['_comparison_key'] = merged_data['_comparison_date'].astype(str) + '_' + merged_data['金额'].astype(str)
             
             # 按标准化的日期和金额分组
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+历史汇率
+从本地汇率文件读取每日汇率，按交易日期换算外币交易的人民币金额
+"""
+
+import glob
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+# 汇率文件的列：日期、货币、汇率（1单位外币对应的人民币）
+FX_HISTORY_COLUMNS = ['日期', '货币', '汇率']
+
+# 换算结果的 attrs 标记：有交易使用了汇率提供器的当前汇率（而非汇率文件中的历史汇率）
+FALLBACK_RATES_ATTR = 'fx_fallback_rates'
+
+
+def normalize_currencies(currencies):
+    """
+    统一货币代码（去空格、大写，空值视为人民币），只处理不重复的值
+    
+    Returns:
+        货币代码 (numpy object 数组)
+    """
+    # 空值的编码为-1，对应末尾的人民币
+    codes, uniques = pd.factorize(pd.Series(currencies))
+    normalized = np.array([str(value).strip().upper() for value in uniques] + ['CNY'], dtype=object)
+    return normalized[codes]
+
+
+class FXHistory:
+    """
+    历史汇率类
+    
+    汇率文件为 CSV，包含 日期、货币、汇率 三列，一个目录下可以有多个文件（如每种货币一个文件）。
+    换算时每笔交易使用交易日期当天或之前最近一天的汇率；早于第一条汇率的交易使用第一条汇率；
+    汇率文件中没有的货币批量获取一次当前汇率，汇率提供器也没有汇率的货币不换算。
+    """
+    
+    def __init__(self, rates=None):
+        """
+        初始化历史汇率
+        
+        Args:
+            rates: 汇率数据 (pandas DataFrame)，包含 日期、货币、汇率 三列
+        """
+        if rates is None:
+            rates = pd.DataFrame(columns=FX_HISTORY_COLUMNS)
+        rates = rates[FX_HISTORY_COLUMNS].copy()
+        rates['日期'] = pd.to_datetime(rates['日期'], errors='coerce')
+        rates['货币'] = rates['货币'].astype(str).str.strip().str.upper()
+        rates['汇率'] = pd.to_numeric(rates['汇率'], errors='coerce')
+        rates = rates.dropna().drop_duplicates(['货币', '日期'], keep='last')
+        self.rates = rates.sort_values('日期').reset_index(drop=True)
+    
+    @classmethod
+    def from_directory(cls, rates_dir=None):
+        """
+        读取汇率目录下的全部CSV文件
+        
+        Args:
+            rates_dir: 汇率文件目录，默认为配置中的目录，目录不存在时返回空的历史汇率
+        """
+        rates_dir = rates_dir or Config.DEFAULT_FX_DIR
+        frames = []
+        for file_path in sorted(glob.glob(os.path.join(rates_dir, '*.csv'))):
+            try:
+                frames.append(pd.read_csv(file_path, usecols=FX_HISTORY_COLUMNS))
+            except Exception as e:
+                print(f"读取汇率文件 {file_path} 时出错: {e}")
+        if not frames:
+            return cls()
+        return cls(pd.concat(frames, ignore_index=True))
+    
+    def _fallback_rates(self, currencies):
+        """
+        汇率文件中没有的货币，从共享的汇率提供器批量获取一次当前汇率
+        
+        Returns:
+            币种到汇率的字典，只包含汇率提供器有汇率记录（汇率表或预设汇率）的币种
+        """
+        try:
+            sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+            from fx_provider import get_exchange_rates
+            return get_exchange_rates(currencies, known_only=True)
+        except Exception as e:
+            print(f"获取汇率失败: {e}，无历史汇率的外币交易不换算")
+            return {}
+    
+    def to_cny(self, amounts, currencies, dates):
+        """
+        按交易日期把金额换算为人民币
+        
+        Args:
+            amounts: 金额 (pandas Series)
+            currencies: 货币代码 (pandas Series)，空值视为人民币
+            dates: 交易日期 (pandas Series)
+        
+        Returns:
+            人民币金额 (pandas Series，索引与 amounts 相同)，无法确定汇率时为NaN；
+            使用了当前汇率时 attrs[FALLBACK_RATES_ATTR] 为True
+        """
+        frame = pd.DataFrame({
+            '_position': np.arange(len(amounts)),
+            '日期': pd.to_datetime(pd.Series(dates).to_numpy(), errors='coerce'),
+            '货币': normalize_currencies(currencies),
+        })
+        rate = np.where(frame['货币'].isin(['CNY', '']), 1.0, np.nan)
+        
+        foreign = frame[np.isnan(rate) & frame['日期'].notna()].sort_values('日期')
+        history = self.rates[self.rates['货币'].isin(foreign['货币'].unique())]
+        if not foreign.empty and not history.empty:
+            backward = pd.merge_asof(foreign, history, on='日期', by='货币', direction='backward')
+            forward = pd.merge_asof(foreign, history, on='日期', by='货币', direction='forward')
+            rate[backward['_position'].to_numpy()] = backward['汇率'].fillna(forward['汇率']).to_numpy()
+        
+        unresolved = np.isnan(rate)
+        if unresolved.any():
+            fallback = self._fallback_rates(set(frame.loc[unresolved, '货币']))
+            rate[unresolved] = frame.loc[unresolved, '货币'].map(fallback).to_numpy(dtype=float)
+        
+        amounts = pd.to_numeric(pd.Series(amounts), errors='coerce')
+        result = (amounts * rate).round(2)
+        result.attrs[FALLBACK_RATES_ATTR] = bool(unresolved.any())
+        return result
+
+
+def uses_fallback_rates(data):
+    """
+    检查转换后的账单是否有交易使用了当前汇率（结果会随汇率提供器变化，不应缓存）
+    
+    Args:
+        data: 转换后的MoneyPro格式数据 (pandas DataFrame)
+    """
+    return bool(data.attrs.get(FALLBACK_RATES_ATTR, False))
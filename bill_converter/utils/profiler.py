@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+账单流程性能分析工具
+记录每个阶段、每个文件的耗时、CPU时间、输入输出行数和内存峰值
+"""
+
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+
+class StageRecord:
+    """
+    单个阶段的性能记录
+    """
+    
+    def __init__(self, stage, file=None, rows_in=None, depth=0):
+        self.stage = stage
+        self.file = file
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.depth = depth
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_memory = 0
+        self.profile_path = None
+        # 内部使用：阶段开始时已分配的内存和阶段内的内存峰值
+        self._start_memory = 0
+        self._peak_seen = 0
+    
+    def to_dict(self):
+        """
+        转换为可序列化为JSON的字典
+        """
+        return {
+            'stage': self.stage,
+            'file': self.file,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'depth': self.depth,
+            'wall_time': round(self.wall_time, 6),
+            'cpu_time': round(self.cpu_time, 6),
+            'peak_memory': self.peak_memory,
+            'profile_path': self.profile_path
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        从字典恢复记录（用于汇总子进程中的记录）
+        """
+        record = cls(data['stage'], data.get('file'), data.get('rows_in'), data.get('depth', 0))
+        record.rows_out = data.get('rows_out')
+        record.wall_time = data.get('wall_time', 0.0)
+        record.cpu_time = data.get('cpu_time', 0.0)
+        record.peak_memory = data.get('peak_memory', 0)
+        record.profile_path = data.get('profile_path')
+        return record
+
+
+class PipelineProfiler:
+    """
+    流程性能分析器类
+    
+    使用方式：
+        with get_profiler().stage('parse', file=path) as stage:
+            df = parser.parse_file(path)
+            stage.rows_out = len(df)
+    
+    内存峰值通过tracemalloc统计，为阶段内相对于阶段开始时新增的分配峰值
+    （Python 3.8 没有 tracemalloc.reset_peak，峰值从开始统计时累计，阶段的内存峰值可能偏大）；
+    cProfile只对最外层阶段启用，避免嵌套的分析器相互覆盖。
+    
+    每个线程有各自的阶段嵌套关系，不同线程中的阶段可以同时进行（如并行的账单和资产流程），
+    此时各阶段的内存峰值包含同时进行的其他阶段的分配。
+    """
+    
+    def __init__(self, enabled=True, cprofile_dir=None):
+        """
+        初始化分析器
+        
+        Args:
+            enabled: 是否启用，未启用时所有阶段均不做统计
+            cprofile_dir: 每个最外层阶段的cProfile结果输出目录，为None时不输出
+        """
+        self.enabled = enabled
+        self.cprofile_dir = cprofile_dir
+        self.records = []
+        self._local = threading.local()
+        self._started_at = time.perf_counter()
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    @property
+    def _stack(self):
+        """当前线程中正在进行的阶段"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+    
+    @contextmanager
+    def stage(self, name, file=None, rows_in=None):
+        """
+        记录一个阶段
+        
+        Args:
+            name: 阶段名称，如 parse、filter、classify、dedup、export
+            file: 阶段处理的文件
+            rows_in: 输入行数
+        
+        Yields:
+            阶段记录 (StageRecord)，可在阶段内设置rows_out
+        """
+        record = StageRecord(name, file, rows_in, depth=len(self._stack))
+        if not self.enabled:
+            yield record
+            return
+        
+        # 将父阶段到目前为止的峰值保存下来，再为当前阶段重置峰值
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            parent = self._stack[-1]
+            parent._peak_seen = max(parent._peak_seen, peak)
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        record._start_memory = current
+        
+        profile = None
+        if self.cprofile_dir and not self._stack:
+            profile = cProfile.Profile()
+        
+        self._stack.append(record)
+        # 按阶段开始的顺序记录，嵌套阶段排在父阶段之后
+        self.records.append(record)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # 其他线程的阶段正在使用cProfile（Python 3.12起同时只能启用一个）
+                profile = None
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+            record.wall_time = time.perf_counter() - wall_start
+            record.cpu_time = time.process_time() - cpu_start
+            self._stack.pop()
+            
+            _, peak = tracemalloc.get_traced_memory()
+            record._peak_seen = max(record._peak_seen, peak)
+            record.peak_memory = max(record._peak_seen - record._start_memory, 0)
+            if self._stack:
+                parent = self._stack[-1]
+                parent._peak_seen = max(parent._peak_seen, record._peak_seen)
+            
+            if profile is not None:
+                record.profile_path = self._dump_profile(profile, record)
+    
+    def _dump_profile(self, profile, record):
+        """
+        保存阶段的cProfile结果
+        
+        Returns:
+            cProfile结果文件路径
+        """
+        os.makedirs(self.cprofile_dir, exist_ok=True)
+        name = record.stage
+        if record.file:
+            name += '_' + os.path.basename(record.file)
+        name = re.sub(r'[^\w.-]+', '_', name)
+        profile_path = os.path.join(self.cprofile_dir, f"{len(self.records):03d}_{name}.prof")
+        profile.dump_stats(profile_path)
+        return profile_path
+    
+    def extend(self, records):
+        """
+        合并子进程中记录的阶段
+        
+        Args:
+            records: 阶段记录字典列表
+        """
+        depth = len(self._stack)
+        for data in records:
+            record = StageRecord.from_dict(data)
+            record.depth += depth
+            self.records.append(record)
+    
+    def summary(self):
+        """
+        按阶段汇总
+        
+        Returns:
+            {阶段名称: 汇总统计} 字典
+        """
+        summary = {}
+        for record in self.records:
+            item = summary.setdefault(record.stage, {
+                'count': 0, 'wall_time': 0.0, 'cpu_time': 0.0,
+                'rows_in': 0, 'rows_out': 0, 'peak_memory': 0
+            })
+            item['count'] += 1
+            item['wall_time'] += record.wall_time
+            item['cpu_time'] += record.cpu_time
+            item['rows_in'] += record.rows_in or 0
+            item['rows_out'] += record.rows_out or 0
+            item['peak_memory'] = max(item['peak_memory'], record.peak_memory)
+        return summary
+    
+    def to_dict(self):
+        """
+        生成完整的性能报告
+        """
+        return {
+            'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'total_wall_time': round(time.perf_counter() - self._started_at, 6),
+            'stages': [record.to_dict() for record in self.records],
+            'summary': self.summary()
+        }
+    
+    def save_json(self, output_path):
+        """
+        将性能报告保存为JSON文件
+        
+        Args:
+            output_path: 输出文件路径
+        """
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        print(f"性能报告已保存到: {output_path}")
+    
+    def print_report(self):
+        """
+        打印各阶段的性能统计表
+        """
+        print("\n性能统计（按阶段、文件）")
+        header = f"{'阶段':<24}{'文件':<36}{'输入行':>10}{'输出行':>10}{'耗时(s)':>10}{'CPU(s)':>10}{'内存峰值(MB)':>14}"
+        print(header)
+        print("-" * len(header))
+        for record in self.records:
+            stage = '  ' * record.depth + record.stage
+            file = os.path.basename(record.file) if record.file else ''
+            rows_in = '' if record.rows_in is None else record.rows_in
+            rows_out = '' if record.rows_out is None else record.rows_out
+            print(f"{stage:<24}{file[:34]:<36}{rows_in:>10}{rows_out:>10}"
+                  f"{record.wall_time:>10.3f}{record.cpu_time:>10.3f}{record.peak_memory / 1024 / 1024:>14.2f}")
+        
+        print("\n性能统计（按阶段汇总）")
+        for stage, item in sorted(self.summary().items(), key=lambda x: -x[1]['wall_time']):
+            print(f"{stage:<24}次数 {item['count']:<6}耗时 {item['wall_time']:.3f}s  "
+                  f"CPU {item['cpu_time']:.3f}s  内存峰值 {item['peak_memory'] / 1024 / 1024:.2f}MB")
+
+
+# 未启用的分析器，作为默认值，所有阶段均不做统计
+_disabled_profiler = PipelineProfiler(enabled=False)
+_active_profiler = _disabled_profiler
+
+
+def get_profiler():
+    """
+    获取当前启用的分析器，未启用时返回不做统计的分析器
+    """
+    return _active_profiler
+
+
+def set_profiler(profiler):
+    """
+    设置当前启用的分析器
+    
+    Args:
+        profiler: 分析器，为None时停用
+    """
+    global _active_profiler
+    _active_profiler = profiler if profiler is not None else _disabled_profiler
+
+
+def row_count(data):
+    """
+    获取数据的行数，数据为None时返回0
+    """
+    return 0 if data is None else len(data)
+
+
+def start_profiling(cprofile=False):
+    """
+    创建并启用分析器
+    
+    Args:
+        cprofile: 是否为每个最外层阶段保存cProfile结果
+    
+    Returns:
+        已启用的分析器
+    """
+    cprofile_dir = None
+    if cprofile:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        cprofile_dir = os.path.join(Config.DEFAULT_PROFILE_DIR, f"cprofile_{timestamp}")
+    profiler = PipelineProfiler(cprofile_dir=cprofile_dir)
+    set_profiler(profiler)
+    return profiler
+
+
+def finish_profiling(profiler, output_path=None):
+    """
+    停用分析器，打印统计表并保存JSON报告
+    
+    Args:
+        profiler: 分析器
+        output_path: 报告文件路径，默认保存到Config.DEFAULT_PROFILE_DIR
+    """
+    set_profiler(None)
+    if output_path is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = os.path.join(Config.DEFAULT_PROFILE_DIR, f"profile_{timestamp}.json")
+    profiler.print_report()
+    profiler.save_json(output_path)
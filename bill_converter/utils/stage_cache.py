@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+账单阶段缓存
+以文件内容哈希、解析器版本和关键词、历史汇率数据版本为键，缓存单个账单文件的转换结果，
+未变化的账单文件无需重新解析
+"""
+
+import glob
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from utils.fx_history import uses_fallback_rates
+
+
+class BillStageCache:
+    """
+    账单阶段缓存类
+    
+    缓存目录结构：
+        manifest.json   清单，记录每个缓存条目的来源文件和版本信息
+        <键>.pkl        单个账单文件转换后的MoneyPro格式数据
+    """
+    
+    MANIFEST_NAME = 'manifest.json'
+    
+    def __init__(self, cache_dir=None):
+        """
+        初始化缓存
+        
+        Args:
+            cache_dir: 缓存目录，默认为Config.DEFAULT_CACHE_DIR
+        """
+        self.cache_dir = cache_dir or Config.DEFAULT_CACHE_DIR
+        self.manifest_path = os.path.join(self.cache_dir, self.MANIFEST_NAME)
+        self.data_version = self._compute_data_version()
+        self.manifest = self._load_manifest()
+        self._file_hashes = {}
+        self._dirty = False
+    
+    def _compute_data_version(self):
+        """
+        计算关键词/过滤规则和历史汇率数据版本
+        
+        Returns:
+            由解析器版本、分类关键词文件内容和汇率目录下汇率文件的文件名及内容决定的版本字符串
+        """
+        digest = hashlib.sha256(Config.PARSER_VERSION.encode('utf-8'))
+        keywords_file = os.path.join(os.path.dirname(__file__), '..', 'data', 'category_keywords.json')
+        if os.path.exists(keywords_file):
+            with open(keywords_file, 'rb') as f:
+                digest.update(f.read())
+        # 与 FXHistory.from_directory 读取的文件一致
+        for rates_file in sorted(glob.glob(os.path.join(Config.DEFAULT_FX_DIR, '*.csv'))):
+            digest.update(os.path.basename(rates_file).encode('utf-8'))
+            with open(rates_file, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        return digest.hexdigest()[:16]
+    
+    def _load_manifest(self):
+        """
+        加载缓存清单，清单损坏时视为空缓存
+        """
+        if not os.path.exists(self.manifest_path):
+            return {'entries': {}}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            manifest.setdefault('entries', {})
+            return manifest
+        except Exception as e:
+            print(f"读取缓存清单失败，将重建缓存: {e}")
+            return {'entries': {}}
+    
+    def file_hash(self, file_path):
+        """
+        计算文件内容的SHA-256哈希（文件的修改时间和大小不变时只计算一次，
+        监视模式下同一个缓存实例也能发现文件内容的变化）
+        """
+        stat = os.stat(file_path)
+        memo_key = (file_path, stat.st_mtime_ns, stat.st_size)
+        if memo_key not in self._file_hashes:
+            digest = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            self._file_hashes[memo_key] = digest.hexdigest()
+        return self._file_hashes[memo_key]
+    
+    def cache_key(self, file_path, source_type):
+        """
+        生成缓存键
+        
+        Args:
+            file_path: 账单文件路径
+            source_type: 账单类型
+        
+        Returns:
+            缓存键字符串
+        """
+        key_string = f"{source_type}_{self.file_hash(file_path)}_{Config.PARSER_VERSION}_{self.data_version}"
+        return hashlib.sha256(key_string.encode('utf-8')).hexdigest()[:32]
+    
+    def _data_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+    
+    def contains(self, file_path, source_type):
+        """
+        检查账单文件是否有可用的缓存
+        """
+        key = self.cache_key(file_path, source_type)
+        return key in self.manifest['entries'] and os.path.exists(self._data_path(key))
+    
+    def load(self, file_path, source_type):
+        """
+        读取账单文件的缓存结果
+        
+        Returns:
+            缓存的MoneyPro格式数据，未命中时返回None
+        """
+        if not self.contains(file_path, source_type):
+            return None
+        try:
+            return pd.read_pickle(self._data_path(self.cache_key(file_path, source_type)))
+        except Exception as e:
+            print(f"读取缓存失败: {file_path}: {e}")
+            return None
+    
+    def store(self, file_path, source_type, data):
+        """
+        写入账单文件的转换结果，有交易使用了当前汇率的结果不缓存（当前汇率会变化）
+        
+        Args:
+            file_path: 账单文件路径
+            source_type: 账单类型
+            data: 转换后的MoneyPro格式数据 (pandas DataFrame)
+        """
+        if data is None or uses_fallback_rates(data):
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            key = self.cache_key(file_path, source_type)
+            data_path = self._data_path(key)
+            # 先写临时文件再替换，避免中断时留下不完整的缓存
+            temp_path = data_path + '.tmp'
+            data.to_pickle(temp_path)
+            os.replace(temp_path, data_path)
+            self.manifest['entries'][key] = {
+                'source_type': source_type,
+                'source_path': file_path,
+                'file_hash': self.file_hash(file_path),
+                'parser_version': Config.PARSER_VERSION,
+                'data_version': self.data_version,
+                'rows': len(data),
+                'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
+            self._dirty = True
+        except Exception as e:
+            print(f"写入缓存失败: {file_path}: {e}")
+    
+    def _is_stale(self, entry):
+        """
+        判断缓存条目是否过期：版本已变化，或来源文件已删除、内容已变化
+        """
+        if (entry.get('parser_version') != Config.PARSER_VERSION
+                or entry.get('data_version') != self.data_version):
+            return True
+        source_path = entry.get('source_path')
+        if not source_path or not os.path.exists(source_path):
+            return True
+        try:
+            return self.file_hash(source_path) != entry.get('file_hash')
+        except OSError:
+            return True
+    
+    def prune(self):
+        """
+        清除过期的缓存条目：解析器版本或关键词数据版本已变化，或来源文件已删除、内容已变化
+        """
+        stale_keys = [key for key, entry in self.manifest['entries'].items() if self._is_stale(entry)]
+        for key in stale_keys:
+            del self.manifest['entries'][key]
+            data_path = self._data_path(key)
+            if os.path.exists(data_path):
+                os.remove(data_path)
+        if stale_keys:
+            print(f"清除过期缓存 {len(stale_keys)} 条")
+            self._dirty = True
+    
+    def save(self):
+        """
+        保存缓存清单
+        """
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = self.manifest_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.manifest_path)
+            self._dirty = False
+        except Exception as e:
+            print(f"保存缓存清单失败: {e}")
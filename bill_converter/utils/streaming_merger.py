@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+账单流式合并工具
+将各来源账单按日期排序后分块落盘，再通过k路堆归并按日期窗口去重，
+以固定的内存预算输出合并后的账单
+"""
+
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from moneypro.exporter import MoneyProExporter
+from utils.deduplicator import BillDeduplicator, alipay_agents, comparison_dates
+
+
+class StreamingBillMerger:
+    """
+    账单外存归并器类
+    
+    去重规则（转账对过滤、按日期和金额去重）只会匹配同一天的记录，因此按日期边界切分窗口。
+    转账对过滤还取决于交易对方的分组以及组内是否有支付宝记录（有时只删除非支付宝一方），
+    这些信息与日期无关：添加来源时收集全部交易对方，逐窗口去重时使用按全部数据计算的同一分组，
+    因此结果与整体去重包含相同的记录（输出顺序按窗口排列）。
+    内存占用约为 来源数 × chunk_rows + window_rows 行（另加全部交易对方）。
+    """
+    
+    # 归并排序使用的辅助列
+    MERGE_KEY = '_merge_key'
+    
+    def __init__(self, chunk_rows=None, window_rows=None, temp_dir=None):
+        """
+        初始化归并器
+        
+        Args:
+            chunk_rows: 每个落盘分块的行数
+            window_rows: 去重窗口的最小行数（窗口总在日期边界处切分）
+            temp_dir: 临时文件所在目录，默认为系统临时目录
+        """
+        self.chunk_rows = chunk_rows or Config.STREAM_CHUNK_ROWS
+        self.window_rows = window_rows or Config.STREAM_WINDOW_ROWS
+        self.deduplicator = BillDeduplicator()
+        self._temp_dir = tempfile.mkdtemp(prefix='bill_merge_', dir=temp_dir)
+        # 每个来源对应一个已排序的分块文件列表
+        self._runs = []
+        self._columns = []
+        # 全部来源的交易对方（按首次出现的顺序）和有支付宝记录的交易对方，用于转账对过滤
+        self._agents = {}
+        self._alipay_agents = set()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """
+        删除所有临时分块文件
+        """
+        shutil.rmtree(self._temp_dir, ignore_errors=True)
+        self._runs = []
+    
+    def add_source(self, data):
+        """
+        添加一个来源的账单数据：按日期排序后分块写入临时文件
+        
+        Args:
+            data: 转换后的账单数据 (pandas DataFrame)
+        """
+        if data is None or data.empty:
+            return
+        
+        for col in data.columns:
+            if col not in self._columns:
+                self._columns.append(col)
+        if '代理' in data.columns:
+            self._agents.update(dict.fromkeys(data['代理'].unique()))
+            self._alipay_agents |= alipay_agents(data)
+        
+        # 使用稳定排序，保证同一天内保持来源中的原始顺序
+        sorted_data = data.assign(**{self.MERGE_KEY: comparison_dates(data).astype(str)})
+        sorted_data = sorted_data.sort_values(self.MERGE_KEY, kind='mergesort')
+        
+        run_index = len(self._runs)
+        chunk_paths = []
+        for start in range(0, len(sorted_data), self.chunk_rows):
+            chunk_path = os.path.join(self._temp_dir, f"run{run_index:04d}_{len(chunk_paths):06d}.pkl")
+            sorted_data.iloc[start:start + self.chunk_rows].to_pickle(chunk_path)
+            chunk_paths.append(chunk_path)
+        self._runs.append(chunk_paths)
+    
+    def _iter_run_blocks(self, run_index):
+        """
+        逐块读取一个来源，按日期拆分为数据块
+        
+        Yields:
+            (日期, 来源序号, 分块序号, 数据块)
+        """
+        for seq, chunk_path in enumerate(self._runs[run_index]):
+            chunk = pd.read_pickle(chunk_path)
+            # 分块已排序，同一日期的记录是连续的
+            for date_key, block in chunk.groupby(self.MERGE_KEY, sort=False):
+                yield date_key, run_index, seq, block
+    
+    def iter_windows(self):
+        """
+        k路堆归并所有来源，按日期窗口输出合并后的数据
+        
+        Yields:
+            一个日期窗口内的合并账单数据 (pandas DataFrame)
+        """
+        merged_blocks = heapq.merge(
+            *(self._iter_run_blocks(i) for i in range(len(self._runs))),
+            key=lambda item: item[:3]
+        )
+        
+        buffer = []
+        buffered_rows = 0
+        current_date = None
+        for date_key, _, _, block in merged_blocks:
+            # 只在日期变化时切分窗口，避免同一天的记录被拆开
+            if date_key != current_date and buffered_rows >= self.window_rows:
+                yield self._build_window(buffer)
+                buffer = []
+                buffered_rows = 0
+            current_date = date_key
+            buffer.append(block)
+            buffered_rows += len(block)
+        
+        if buffer:
+            yield self._build_window(buffer)
+    
+    def _build_window(self, blocks):
+        """
+        合并窗口内的数据块，并对齐为统一的列
+        """
+        window = pd.concat(blocks, ignore_index=True)
+        return window.reindex(columns=self._columns)
+    
+    def iter_deduplicated(self):
+        """
+        逐窗口去重
+        
+        Yields:
+            去重后的窗口数据 (pandas DataFrame)
+        """
+        output_columns = [col for col in self._columns if col != '_raw_date']
+        agent_groups = self.deduplicator.transfer_agent_groups(list(self._agents), self._alipay_agents)
+        for window in self.iter_windows():
+            result = self.deduplicator.deduplicate_frame(window, agent_groups)
+            yield result.reindex(columns=output_columns)
+    
+    def merge_to_csv(self, output_path):
+        """
+        归并、去重并增量写出合并后的账单
+        
+        Args:
+            output_path: 输出文件路径
+        
+        Returns:
+            写出的记录数，失败时返回None
+        """
+        total_rows = 0
+        
+        def counted(chunks):
+            nonlocal total_rows
+            for chunk in chunks:
+                total_rows += len(chunk)
+                yield chunk
+        
+        exporter = MoneyProExporter()
+        if not exporter.export_chunks_to_csv(counted(self.iter_deduplicated()), output_path):
+            return None
+        
+        print(f"流式合并完成，共写出 {total_rows} 条记录")
+        return total_rows
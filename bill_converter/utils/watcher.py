@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+账单目录监视器
+通过轮询文件的修改时间和大小检测变化，并在目录稳定后再通知处理
+"""
+
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+
+class BillDirectoryWatcher:
+    """
+    账单目录监视器类
+    """
+    
+    def __init__(self, list_files, poll_interval=None, debounce_seconds=None):
+        """
+        初始化监视器
+        
+        Args:
+            list_files: 返回待监视文件路径列表的函数
+            poll_interval: 轮询间隔（秒）
+            debounce_seconds: 目录保持不变多久后才返回变化（秒）
+        """
+        self.list_files = list_files
+        self.poll_interval = poll_interval or Config.WATCH_POLL_INTERVAL
+        self.debounce_seconds = debounce_seconds if debounce_seconds is not None else Config.WATCH_DEBOUNCE_SECONDS
+        self._seen = {}
+    
+    def snapshot(self):
+        """
+        获取当前目录状态
+        
+        Returns:
+            {文件路径: (修改时间, 文件大小)} 字典
+        """
+        state = {}
+        for file_path in self.list_files():
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                # 文件在列出后被删除
+                continue
+            state[file_path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+    
+    def mark_seen(self, state=None):
+        """
+        将目录状态标记为已处理
+        
+        Args:
+            state: 目录状态，默认为当前状态
+        """
+        self._seen = state if state is not None else self.snapshot()
+    
+    def _diff(self, state):
+        """
+        比较目录状态与已处理状态
+        
+        Returns:
+            (新增或修改的文件列表, 已删除的文件列表)
+        """
+        changed = sorted(path for path, signature in state.items() if self._seen.get(path) != signature)
+        removed = sorted(path for path in self._seen if path not in state)
+        return changed, removed
+    
+    def wait_for_changes(self):
+        """
+        阻塞直到检测到变化，且目录在debounce_seconds内不再变化
+        连续复制多个文件或文件正在写入时只触发一次处理
+        
+        Returns:
+            (新增或修改的文件列表, 已删除的文件列表)
+        """
+        while True:
+            state = self.snapshot()
+            if state != self._seen:
+                stable_since = time.monotonic()
+                while time.monotonic() - stable_since < self.debounce_seconds:
+                    time.sleep(min(self.poll_interval, self.debounce_seconds))
+                    latest = self.snapshot()
+                    if latest != state:
+                        state = latest
+                        stable_since = time.monotonic()
+                
+                changed, removed = self._diff(state)
+                self._seen = state
+                if changed or removed:
+                    return changed, removed
+            time.sleep(self.poll_interval)
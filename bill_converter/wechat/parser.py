@@ -6,9 +6,16 @@
 用于解析微信账单文件
 """
 
+import os
+import sys
 import pandas as pd
 import re
 
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.profiler import get_profiler
+
 
 class WechatBillParser:
     """
@@ -79,7 +86,9 @@ class WechatBillParser:
             df = df.drop(df.index[0]).reset_index(drop=True)
             
             # 应用过滤逻辑
-            df = self._apply_filters(df)
+            with get_profiler().stage('filter', file=file_path, rows_in=len(df)) as stage:
+                df = self._apply_filters(df)
+                stage.rows_out = len(df)
             
             # 处理交易时间字段
             if '交易时间' in df.columns:
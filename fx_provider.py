@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+汇率提供模块
+统一获取各币种对人民币的汇率：
+    - 每个币种在有效期（TTL）内最多获取一次，结果保存在内存和本地SQLite汇率表中
+    - 支持批量获取多个币种的汇率，一次请求得到全部结果
+    - 网络不可用时使用汇率表中的旧汇率（或预设汇率），不会阻塞调用方
+    - 汇率来源可以替换，测试时使用本地的固定汇率
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bill_converter.config import Config
+
+# 预设汇率（无法获取实时汇率且汇率表中没有记录时使用）
+DEFAULT_RATES = {
+    'CNY': 1.0,
+    'USD': 7.2,
+    'EUR': 7.8,
+    'JPY': 0.05,
+    'HKD': 0.92,
+}
+
+# 汇率表名
+FX_RATES_TABLE = 'fx_rates'
+
+
+class StaticRateSource:
+    """
+    固定汇率来源，用于测试或离线环境
+    """
+    
+    name = 'static'
+    
+    def __init__(self, rates=None):
+        """
+        Args:
+            rates: 币种到人民币汇率的字典，默认为预设汇率
+        """
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+        self.calls = 0
+    
+    def fetch_rates(self, currencies):
+        """
+        获取一组币种对人民币的汇率
+        
+        Returns:
+            币种到汇率的字典，不支持的币种不包含在结果中
+        """
+        self.calls += 1
+        return {currency: self.rates[currency] for currency in currencies if currency in self.rates}
+
+
+class ForexPythonRateSource:
+    """
+    通过 forex-python 获取实时汇率：一次请求得到以美元为基准的全部汇率，再换算为人民币汇率
+    """
+    
+    name = 'forex-python'
+    
+    def fetch_rates(self, currencies):
+        from forex_python.converter import CurrencyRates
+        
+        usd_rates = CurrencyRates().get_rates('USD')
+        usd_rates['USD'] = 1.0
+        usd_to_cny = usd_rates['CNY']
+        return {
+            currency: round(usd_to_cny / usd_rates[currency], 4)
+            for currency in currencies if usd_rates.get(currency)
+        }
+
+
+def default_rate_source():
+    """
+    返回默认的汇率来源：安装了 forex-python 时获取实时汇率，否则使用预设汇率
+    """
+    try:
+        import forex_python  # noqa: F401
+    except ImportError:
+        print("警告: forex-python包未安装，将使用预设汇率")
+        return StaticRateSource()
+    return ForexPythonRateSource()
+
+
+class FXRateProvider:
+    """
+    带缓存的汇率提供类
+    
+    汇率查找顺序：
+        1. 有效期内的缓存汇率（内存/汇率表）直接返回
+        2. 已过期的汇率先返回旧值，并在后台线程中刷新
+        3. 没有任何记录的币种同步获取一次（最多等待 fetch_timeout 秒）
+        4. 获取失败时使用预设汇率，retry_interval 秒内不再尝试联网
+    """
+    
+    def __init__(self, db_path=None, source=None, ttl=None, fetch_timeout=None, retry_interval=None):
+        """
+        初始化汇率提供器
+        
+        Args:
+            db_path: 汇率表SQLite文件路径，为None时使用配置中的路径，为 ':memory:' 时不保存到磁盘
+            source: 汇率来源（带有 fetch_rates(currencies) 方法的对象），默认为 default_rate_source()
+            ttl: 汇率有效期（秒）
+            fetch_timeout: 同步获取汇率的最长等待时间（秒）
+            retry_interval: 获取失败后再次尝试联网的间隔（秒）
+        """
+        self.db_path = db_path or Config.FX_RATES_DB
+        self.source = source if source is not None else default_rate_source()
+        self.ttl = Config.FX_RATE_TTL if ttl is None else ttl
+        self.fetch_timeout = Config.FX_FETCH_TIMEOUT if fetch_timeout is None else fetch_timeout
+        self.retry_interval = Config.FX_RETRY_INTERVAL if retry_interval is None else retry_interval
+        
+        self._lock = threading.Lock()
+        self._rates = {}
+        self._refreshing = set()
+        self._unsupported = {}
+        self._failed_at = None
+        self._conn = None
+        self._load_rates()
+    
+    def _connect(self):
+        """
+        打开汇率表（连接在各线程间共享，访问时需持有锁）
+        """
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory and self.db_path != ':memory:':
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {FX_RATES_TABLE} ("
+                    f"币种 TEXT PRIMARY KEY, 汇率 REAL NOT NULL, 更新时间 REAL NOT NULL, 来源 TEXT)"
+                )
+        return self._conn
+    
+    def _load_rates(self):
+        """
+        从汇率表加载已保存的汇率
+        """
+        try:
+            with self._lock:
+                rows = self._connect().execute(f"SELECT 币种, 汇率, 更新时间 FROM {FX_RATES_TABLE}").fetchall()
+        except sqlite3.Error as e:
+            print(f"读取汇率表失败: {e}")
+            return
+        self._rates = {currency: (rate, updated_at) for currency, rate, updated_at in rows}
+    
+    def _save_rates(self, rates, updated_at):
+        """
+        更新内存缓存并写入汇率表
+        """
+        with self._lock:
+            for currency, rate in rates.items():
+                self._rates[currency] = (rate, updated_at)
+            try:
+                with self._connect() as conn:
+                    conn.executemany(
+                        f"INSERT INTO {FX_RATES_TABLE} (币种, 汇率, 更新时间, 来源) VALUES (?, ?, ?, ?) "
+                        f"ON CONFLICT(币种) DO UPDATE SET 汇率=excluded.汇率, 更新时间=excluded.更新时间, "
+                        f"来源=excluded.来源",
+                        [(currency, rate, updated_at, getattr(self.source, 'name', None))
+                         for currency, rate in rates.items()]
+                    )
+            except sqlite3.Error as e:
+                print(f"保存汇率表失败: {e}")
+    
+    def _fetch(self, currencies):
+        """
+        从汇率来源获取汇率并保存，失败时记录失败时间
+        
+        Returns:
+            获取到的汇率字典
+        """
+        try:
+            rates = self.source.fetch_rates(sorted(currencies))
+        except Exception as e:
+            print(f"获取实时汇率失败: {e}，使用已保存的汇率或预设汇率")
+            self._failed_at = time.time()
+            return {}
+        self._failed_at = None
+        now = time.time()
+        for currency in set(currencies) - set(rates):
+            self._unsupported[currency] = now
+        if rates:
+            self._save_rates(rates, now)
+        return rates
+    
+    def _fetch_in_background(self, currencies):
+        """
+        在后台线程中获取汇率
+        
+        Returns:
+            后台线程，这些币种都已在刷新中时返回None
+        """
+        with self._lock:
+            currencies = set(currencies) - self._refreshing
+            if not currencies:
+                return None
+            self._refreshing |= currencies
+        
+        def worker():
+            try:
+                self._fetch(currencies)
+            finally:
+                with self._lock:
+                    self._refreshing -= currencies
+        
+        thread = threading.Thread(target=worker, name='fx-refresh', daemon=True)
+        thread.start()
+        return thread
+    
+    def _can_fetch(self):
+        return self._failed_at is None or time.time() - self._failed_at >= self.retry_interval
+    
+    def get_rates(self, currencies, known_only=False):
+        """
+        批量获取汇率
+        
+        Args:
+            currencies: 币种代码的集合
+            known_only: 为True时只返回汇率表或预设汇率中有记录的币种，
+                        否则没有汇率的币种按1:1返回
+        
+        Returns:
+            币种（大写）到人民币汇率的字典
+        """
+        currencies = {str(currency).strip().upper() for currency in currencies if currency}
+        currencies.discard('CNY')
+        now = time.time()
+        
+        # 汇率来源不支持的币种在有效期内不再重复获取
+        missing = {
+            currency for currency in currencies
+            if currency not in self._rates and now - self._unsupported.get(currency, -self.ttl) >= self.ttl
+        }
+        stale = {
+            currency for currency in currencies
+            if currency in self._rates and now - self._rates[currency][1] >= self.ttl
+        }
+        
+        if self._can_fetch():
+            if missing:
+                # 没有任何记录的币种同步获取一次，超时后继续在后台完成
+                thread = self._fetch_in_background(missing | stale)
+                if thread is not None:
+                    thread.join(self.fetch_timeout)
+            elif stale:
+                self._fetch_in_background(stale)
+        
+        result = {'CNY': 1.0}
+        for currency in currencies:
+            if currency in self._rates:
+                result[currency] = self._rates[currency][0]
+            elif currency in DEFAULT_RATES or not known_only:
+                result[currency] = DEFAULT_RATES.get(currency, 1.0)
+        return result
+    
+    def get_rate(self, currency):
+        """
+        获取单个币种对人民币的汇率
+        
+        Returns:
+            汇率，汇率表和预设汇率中都没有该币种时返回None
+        """
+        currency = str(currency).strip().upper() if currency else 'CNY'
+        return self.get_rates([currency], known_only=True).get(currency)
+
+
+_default_provider = None
+_default_provider_lock = threading.Lock()
+
+
+def get_default_provider():
+    """
+    返回进程内共享的汇率提供器
+    """
+    global _default_provider
+    with _default_provider_lock:
+        if _default_provider is None:
+            _default_provider = FXRateProvider()
+        return _default_provider
+
+
+def get_exchange_rate(currency):
+    """
+    获取币种对人民币的汇率（使用共享的汇率提供器），没有汇率时返回None
+    """
+    return get_default_provider().get_rate(currency)
+
+
+def get_exchange_rates(currencies, known_only=False):
+    """
+    批量获取币种对人民币的汇率（使用共享的汇率提供器）
+    """
+    return get_default_provider().get_rates(currencies, known_only)
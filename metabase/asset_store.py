@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+资产快照存储
+每次导入的资产文件保存为一个快照（asset_snapshots + asset_snapshot_items），
+内容与该来源上一次快照相同时跳过；current_assets 只保存每个来源最新一次快照的资产
+以及通过资产管理界面手动添加的资产。
+"""
+
+import hashlib
+import os
+import re
+import uuid
+from datetime import datetime
+
+from metabase.database import quote_identifier, table_exists
+
+# 资产快照表
+SNAPSHOTS_TABLE = 'asset_snapshots'
+
+# 资产快照明细表
+SNAPSHOT_ITEMS_TABLE = 'asset_snapshot_items'
+
+# 当前资产表
+CURRENT_ASSETS_TABLE = 'current_assets'
+
+# 旧版本的资产表，迁移后保留为视图，兼容已有的Metabase查询
+LEGACY_ASSETS_TABLE = 'assets_records'
+
+# 通过资产管理界面手动添加的资产来源
+MANUAL_SOURCE = 'manual'
+
+# 资产列及类型
+ASSET_COLUMNS = [
+    ('账户分类', 'TEXT'),
+    ('币种', 'TEXT'),
+    ('金额', 'REAL'),
+    ('描述', 'TEXT'),
+    ('时间', 'TEXT'),
+    ('对应人民币金额', 'REAL'),
+    ('资产_负债', 'TEXT'),
+]
+
+# 当前资产表的索引：来源用于替换快照，其余用于资产管理API的筛选和按时间分页
+CURRENT_ASSETS_INDEXES = {
+    'source': ['来源'],
+    'time': ['时间', 'id'],
+    'account_type': ['账户分类', '时间', 'id'],
+    'currency': ['币种', '时间', 'id'],
+    'kind': ['资产_负债', '时间', 'id'],
+}
+
+# 计算快照内容哈希时忽略的列（每次转换都会更新的时间戳）
+HASH_IGNORED_COLUMNS = ['时间']
+
+
+def asset_run_prefix(file_name):
+    """
+    返回资产文件名开头的转换时间戳（同一次转换的文件相同），没有时间戳时返回空字符串
+    """
+    match = re.match(r'^(\d{8}_\d{6})_', os.path.basename(file_name))
+    return match.group(1) if match else ''
+
+
+def asset_source_name(file_name):
+    """
+    根据资产文件名得到来源名称：去掉扩展名和开头的时间戳
+    例如 20240101_120000_asset.csv -> asset
+    """
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    return re.sub(r'^\d{8}_\d{6}_', '', stem) or stem
+
+
+def _asset_column_names():
+    return [column for column, _ in ASSET_COLUMNS]
+
+
+def ensure_asset_tables(conn):
+    """
+    创建资产快照表、当前资产表和兼容视图（已存在时跳过），并迁移旧版本的 assets_records 表
+    """
+    column_definitions = _column_definitions()
+    with conn:
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {SNAPSHOTS_TABLE} ("
+            f"id INTEGER PRIMARY KEY AUTOINCREMENT, 来源 TEXT NOT NULL, 快照时间 TEXT NOT NULL, "
+            f"内容哈希 TEXT NOT NULL, 记录数 INTEGER NOT NULL, 导入时间 TEXT NOT NULL, "
+            f"UNIQUE (来源, 快照时间))"
+        )
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {SNAPSHOT_ITEMS_TABLE} ("
+            f"snapshot_id INTEGER NOT NULL REFERENCES {SNAPSHOTS_TABLE}(id), {column_definitions})"
+        )
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{SNAPSHOT_ITEMS_TABLE}_snapshot ON {SNAPSHOT_ITEMS_TABLE} (snapshot_id)"
+        )
+    
+    with conn:
+        _create_current_assets(conn)
+    
+    if table_exists(conn, LEGACY_ASSETS_TABLE):
+        _migrate_legacy_assets(conn)
+    
+    with conn:
+        view_columns = ', '.join(quote_identifier(column) for column in _asset_column_names())
+        conn.execute(
+            f"CREATE VIEW IF NOT EXISTS {LEGACY_ASSETS_TABLE} AS "
+            f"SELECT id, {view_columns} FROM {CURRENT_ASSETS_TABLE}"
+        )
+
+
+def _column_definitions():
+    return ', '.join(f"{quote_identifier(column)} {column_type}" for column, column_type in ASSET_COLUMNS)
+
+
+def _create_current_assets(conn):
+    """
+    创建当前资产表，id为主键，修改和删除单条资产时按主键查找
+    """
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {CURRENT_ASSETS_TABLE} ("
+        f"id TEXT PRIMARY KEY NOT NULL, {_column_definitions()}, 来源 TEXT NOT NULL, snapshot_id INTEGER)"
+    )
+    for name, columns in CURRENT_ASSETS_INDEXES.items():
+        column_list = ', '.join(quote_identifier(column) for column in columns)
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{CURRENT_ASSETS_TABLE}_{name} ON {CURRENT_ASSETS_TABLE} ({column_list})"
+        )
+
+
+def _migrate_legacy_assets(conn):
+    """
+    迁移旧版本的 assets_records 表
+    
+    旧表每次导入都会追加完整的资产列表：没有id的记录按时间分组为快照（连续相同的快照只保留一份），
+    有id的记录是通过资产管理界面添加的，直接作为手动资产保留。旧表重命名为 assets_records_legacy。
+    """
+    import pandas as pd
+    
+    print("正在迁移旧版本资产表...")
+    df = pd.read_sql_query(f"SELECT * FROM {LEGACY_ASSETS_TABLE}", conn)
+    for column in _asset_column_names() + ['id']:
+        if column not in df.columns:
+            df[column] = None
+    
+    has_id = df['id'].notna() & (df['id'].astype(str) != '')
+    manual = df[has_id].drop_duplicates('id', keep='last')
+    source = asset_source_name('asset.csv')
+    with conn:
+        conn.execute("BEGIN")
+        conn.execute(f"ALTER TABLE {LEGACY_ASSETS_TABLE} RENAME TO {LEGACY_ASSETS_TABLE}_legacy")
+        imported = df[~has_id]
+        for snapshot_time, snapshot in imported.groupby(imported['时间'].fillna(''), sort=True):
+            _store_snapshot(conn, snapshot, source, snapshot_time)
+        _insert_current_assets(conn, manual, MANUAL_SOURCE, None, keep_ids=True)
+    print(f"资产表迁移完成，旧表已重命名为 {LEGACY_ASSETS_TABLE}_legacy")
+
+
+def normalize_assets(df):
+    """
+    统一资产数据的列和类型：金额列转为数值，空字符串和缺失值统一为None
+    """
+    import pandas as pd
+    
+    df = df.reindex(columns=_asset_column_names())
+    for column, column_type in ASSET_COLUMNS:
+        if column_type == 'REAL':
+            df[column] = pd.to_numeric(df[column], errors='coerce').round(6)
+    df = df.astype(object)
+    return df.where(pd.notna(df) & (df != ''), None)
+
+
+def snapshot_hash(df):
+    """
+    计算资产快照的内容哈希，与记录顺序和时间戳无关
+    """
+    columns = [column for column in _asset_column_names() if column not in HASH_IGNORED_COLUMNS]
+    content = normalize_assets(df)[columns].fillna('').astype(str)
+    content = content.sort_values(columns).to_csv(index=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _rows(df):
+    """
+    生成可直接传给 executemany 的行元组，缺失值写入为NULL
+    """
+    return list(normalize_assets(df).itertuples(index=False, name=None))
+
+
+def _insert_current_assets(conn, df, source, snapshot_id, keep_ids=False):
+    """
+    写入当前资产
+    """
+    columns = _asset_column_names()
+    rows = _rows(df)
+    ids = df['id'].astype(str).tolist() if keep_ids else [str(uuid.uuid4()) for _ in rows]
+    column_list = ', '.join(quote_identifier(column) for column in columns)
+    placeholders = ', '.join('?' for _ in columns)
+    conn.executemany(
+        f"INSERT INTO {CURRENT_ASSETS_TABLE} (id, {column_list}, 来源, snapshot_id) "
+        f"VALUES (?, {placeholders}, ?, ?)",
+        [(asset_id,) + row + (source, snapshot_id) for asset_id, row in zip(ids, rows)]
+    )
+
+
+def _store_snapshot(conn, df, source, snapshot_time):
+    """
+    在当前事务中保存一个快照，并用它替换该来源的当前资产
+    
+    Returns:
+        快照id，内容与该来源上一次快照相同或同一时间的快照已存在时返回None
+    """
+    content_hash = snapshot_hash(df)
+    latest = conn.execute(
+        f"SELECT 内容哈希 FROM {SNAPSHOTS_TABLE} WHERE 来源=? ORDER BY id DESC LIMIT 1", (source,)
+    ).fetchone()
+    if latest and latest[0] == content_hash:
+        return None
+    if conn.execute(
+        f"SELECT 1 FROM {SNAPSHOTS_TABLE} WHERE 来源=? AND 快照时间=?", (source, snapshot_time)
+    ).fetchone():
+        return None
+    
+    cursor = conn.execute(
+        f"INSERT INTO {SNAPSHOTS_TABLE} (来源, 快照时间, 内容哈希, 记录数, 导入时间) VALUES (?, ?, ?, ?, ?)",
+        (source, snapshot_time, content_hash, len(df), datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    )
+    snapshot_id = cursor.lastrowid
+    
+    columns = _asset_column_names()
+    column_list = ', '.join(quote_identifier(column) for column in columns)
+    placeholders = ', '.join('?' for _ in columns)
+    conn.executemany(
+        f"INSERT INTO {SNAPSHOT_ITEMS_TABLE} (snapshot_id, {column_list}) VALUES (?, {placeholders})",
+        [(snapshot_id,) + row for row in _rows(df)]
+    )
+    
+    conn.execute(f"DELETE FROM {CURRENT_ASSETS_TABLE} WHERE 来源=?", (source,))
+    _insert_current_assets(conn, df, source, snapshot_id)
+    return snapshot_id
+
+
+def store_asset_snapshot(conn, df, source, snapshot_time=None):
+    """
+    保存资产快照并更新当前资产，在一个事务中完成
+    
+    Args:
+        conn: SQLite连接
+        df: 资产数据 (pandas DataFrame)，列名中的 / 已替换为 _
+        source: 来源名称，同一来源的新快照替换其当前资产
+        snapshot_time: 快照时间，默认取资产数据的时间列
+    
+    Returns:
+        快照id，内容未变化而跳过时返回None
+    """
+    ensure_asset_tables(conn)
+    if snapshot_time is None:
+        times = df['时间'].dropna() if '时间' in df.columns else []
+        snapshot_time = str(times.iloc[0]) if len(times) else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        return _store_snapshot(conn, df, source, snapshot_time)
+
+
+def _asset_row(asset):
+    """
+    将单条资产字典转换为行元组，与 normalize_assets 的处理一致（不需要pandas）
+    """
+    row = []
+    for column, column_type in ASSET_COLUMNS:
+        value = asset.get(column)
+        if value == '':
+            value = None
+        if value is not None and column_type == 'REAL':
+            value = round(float(value), 6)
+        row.append(value)
+    return tuple(row)
+
+
+def retire_asset_sources(conn, active_sources):
+    """
+    删除不在本次转换中的来源的当前资产（原始资产文件已被删除或改名），手动添加的资产保留
+    
+    Returns:
+        删除的记录数
+    """
+    active_sources = list(active_sources) + [MANUAL_SOURCE]
+    placeholders = ', '.join('?' for _ in active_sources)
+    with conn:
+        return conn.execute(
+            f"DELETE FROM {CURRENT_ASSETS_TABLE} WHERE 来源 NOT IN ({placeholders})", active_sources
+        ).rowcount
+
+
+def save_asset(conn, asset):
+    """
+    保存一条资产（资产管理界面的添加和修改）：id已存在时更新，否则作为手动资产添加
+    资产表需已通过 ensure_asset_tables 创建
+    
+    Args:
+        conn: SQLite连接
+        asset: 资产字典，包含id和资产列
+    """
+    save_assets(conn, [asset])
+
+
+def save_assets(conn, assets):
+    """
+    在一个事务中批量保存资产，每条资产的处理与 save_asset 相同
+    
+    Args:
+        conn: SQLite连接
+        assets: 资产字典的列表
+    """
+    columns = _asset_column_names()
+    column_list = ', '.join(quote_identifier(column) for column in columns)
+    placeholders = ', '.join('?' for _ in columns)
+    assignments = ', '.join(f"{quote_identifier(column)}=excluded.{quote_identifier(column)}" for column in columns)
+    # 单条语句按主键插入或更新，并发修改同一资产时不会重复插入
+    with conn:
+        conn.executemany(
+            f"INSERT INTO {CURRENT_ASSETS_TABLE} (id, {column_list}, 来源, snapshot_id) "
+            f"VALUES (?, {placeholders}, ?, NULL) "
+            f"ON CONFLICT(id) DO UPDATE SET {assignments}",
+            [(asset['id'],) + _asset_row(asset) + (MANUAL_SOURCE,) for asset in assets]
+        )
+
+
+def get_asset(conn, asset_id):
+    """
+    按id查询一条当前资产
+    
+    Returns:
+        资产行，不存在时返回None
+    """
+    return conn.execute(
+        f"SELECT id, {', '.join(quote_identifier(column) for column in _asset_column_names())} "
+        f"FROM {CURRENT_ASSETS_TABLE} WHERE id=?", (asset_id,)
+    ).fetchone()
+
+
+def get_assets(conn, asset_ids, chunk_size=500):
+    """
+    按id批量查询当前资产
+    
+    Returns:
+        id到资产行的字典，不存在的id不包含在结果中
+    """
+    asset_ids = list(dict.fromkeys(asset_ids))
+    columns = ', '.join(quote_identifier(column) for column in _asset_column_names())
+    result = {}
+    # 分批查询，避免超过SQLite的参数数量限制
+    for start in range(0, len(asset_ids), chunk_size):
+        chunk = asset_ids[start:start + chunk_size]
+        rows = conn.execute(
+            f"SELECT id, {columns} FROM {CURRENT_ASSETS_TABLE} "
+            f"WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+        )
+        result.update((row[0], row) for row in rows)
+    return result
+
+
+def delete_asset(conn, asset_id):
+    """
+    删除一条当前资产，资产表需已通过 ensure_asset_tables 创建
+    
+    Returns:
+        删除的记录数
+    """
+    with conn:
+        return conn.execute(f"DELETE FROM {CURRENT_ASSETS_TABLE} WHERE id=?", (asset_id,)).rowcount
+
+
+def delete_assets(conn, asset_ids):
+    """
+    在一个事务中批量删除当前资产，资产表需已通过 ensure_asset_tables 创建
+    
+    Returns:
+        实际删除的资产id集合
+    """
+    deleted = set()
+    with conn:
+        for asset_id in dict.fromkeys(asset_ids):
+            if conn.execute(f"DELETE FROM {CURRENT_ASSETS_TABLE} WHERE id=?", (asset_id,)).rowcount:
+                deleted.add(asset_id)
+    return deleted
+
+
+def query_assets(conn, columns, filters=None, since=None, until=None, after=None, limit=None):
+    """
+    按条件查询当前资产，结果按 (时间, id) 排序，筛选和分页都在SQL中完成（使用当前资产表的索引）
+    
+    Args:
+        conn: SQLite连接
+        columns: 返回的列名列表
+        filters: 列名到取值列表的字典，同一列的多个取值为“或”关系
+        since: 时间下限（包含）
+        until: 时间上限（包含），只有日期时包含当天全部时间
+        after: 上一页最后一行的 (时间, id)，从其后一行开始返回
+        limit: 最多返回的行数，为None时不限制
+    
+    Returns:
+        查询结果的游标
+    """
+    conditions = []
+    params = []
+    for column, values in (filters or {}).items():
+        conditions.append(f"{quote_identifier(column)} IN ({', '.join('?' for _ in values)})")
+        params.extend(values)
+    if since:
+        conditions.append("时间 >= ?")
+        params.append(since)
+    if until:
+        conditions.append("时间 <= ?")
+        params.append(until + ' 23:59:59' if len(until) == 10 else until)
+    if after is not None:
+        last_time, last_id = after
+        if last_time is None:
+            # 时间为空的行排在最前面
+            conditions.append("((时间 IS NULL AND id > ?) OR 时间 IS NOT NULL)")
+            params.append(last_id)
+        else:
+            conditions.append("(时间, id) > (?, ?)")
+            params.extend([last_time, last_id])
+    
+    sql = (f"SELECT {', '.join(quote_identifier(column) for column in columns)} "
+           f"FROM {CURRENT_ASSETS_TABLE}")
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY 时间, id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params)
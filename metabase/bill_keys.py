@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+账单主键生成
+主键由金额、日期、源账户、描述、代理决定，支持两种算法：
+    md5     32位十六进制字符串（TEXT），与历史数据兼容
+    hash64  64位非加密哈希（INTEGER），索引更小、比较更快
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# 支持的主键算法
+BILL_KEY_ALGORITHMS = ('md5', 'hash64')
+
+# 参与主键计算的列（日期列可能已被重命名为交易日期）
+BILL_KEY_COLUMNS = ['金额', '日期', '源账户', '描述', '代理']
+
+
+def generate_bill_key(row):
+    """
+    生成账单的主键
+    主键由金额、日期、源账户、描述、代理决定，并使用MD5哈希避免过长字符串
+    """
+    # 处理可能的 NaN 值
+    amount = str(row.get('金额', '') or '')
+    # 检查日期列是否存在，可能已被重命名为交易日期
+    date = str(row.get('日期', '') or row.get('交易日期', '') or '')
+    source_account = str(row.get('源账户', '') or '')
+    description = str(row.get('描述', '') or '')
+    agent = str(row.get('代理', '') or '')
+    
+    # 组合主键字段
+    key_string = f"{amount}_{date}_{source_account}_{description}_{agent}"
+    
+    # 使用MD5生成固定长度的哈希值
+    return hashlib.md5(key_string.encode('utf-8')).hexdigest()
+
+
+def _key_parts(df, column, keep_nan):
+    """
+    将一列转换为主键字符串片段
+    
+    与 generate_bill_key 一致：假值（空字符串、0、None）视为空字符串，其余值取 str()。
+    keep_nan 为True时 NaN 按 str() 得到 'nan'（md5 的历史行为），否则视为空字符串。
+    """
+    if column not in df.columns:
+        return np.full(len(df), '', dtype=object)
+    values = df[column].to_numpy(dtype=object)
+    if keep_nan:
+        return np.array([str(v) if v is not pd.NA and v else '' for v in values], dtype=object)
+    return np.array([str(v) if v is not pd.NA and v == v and v else '' for v in values], dtype=object)
+
+
+def bill_key_strings(df, keep_nan=True):
+    """
+    批量生成主键原始字符串 "金额_日期_源账户_描述_代理"
+    
+    Args:
+        df: 账单数据 (pandas DataFrame)
+        keep_nan: NaN 是否保留为 'nan'
+    
+    Returns:
+        主键字符串数组 (numpy object array)
+    """
+    parts = {column: _key_parts(df, column, keep_nan) for column in BILL_KEY_COLUMNS}
+    
+    # 日期为空时使用交易日期
+    if '交易日期' in df.columns:
+        dates = parts['日期']
+        fallback = _key_parts(df, '交易日期', keep_nan)
+        parts['日期'] = np.where(dates == '', fallback, dates)
+    
+    keys = parts[BILL_KEY_COLUMNS[0]]
+    for column in BILL_KEY_COLUMNS[1:]:
+        keys = keys + '_' + parts[column]
+    return keys
+
+
+def generate_bill_keys(df, algorithm='md5'):
+    """
+    批量生成账单主键
+    
+    Args:
+        df: 账单数据 (pandas DataFrame)
+        algorithm: 主键算法，md5 与 generate_bill_key 结果相同；
+                   hash64 为64位有符号整数，缺失值（NaN、NULL、空字符串）视为相同
+    
+    Returns:
+        主键数组，md5 为 object 数组，hash64 为 int64 数组
+    """
+    if algorithm == 'md5':
+        keys = bill_key_strings(df, keep_nan=True)
+        md5 = hashlib.md5
+        return np.array([md5(key.encode('utf-8')).hexdigest() for key in keys], dtype=object)
+    if algorithm == 'hash64':
+        keys = bill_key_strings(df, keep_nan=False)
+        # pandas 的 hash_array 使用固定密钥的 SipHash，结果在不同进程间稳定
+        return pd.util.hash_array(keys, categorize=False).view(np.int64)
+    raise ValueError(f"不支持的账单主键算法: {algorithm}，可选: {', '.join(BILL_KEY_ALGORITHMS)}")
+
+
+def bill_key_sql_type(algorithm):
+    """
+    返回主键算法对应的SQLite列类型
+    """
+    return 'INTEGER' if algorithm == 'hash64' else 'TEXT'
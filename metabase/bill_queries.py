@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+账单查询
+供资产管理服务的账单接口使用：按条件分页查询 billing_records，从汇总表读取月度汇总
+只依赖标准库（表名与 billing_schema 中的定义一致，不导入以避免加载pandas）
+"""
+
+from metabase.database import quote_identifier, table_exists
+
+# 账单表名（billing_schema.BILLING_TABLE）
+BILLING_TABLE = 'billing_records'
+
+# 按月、类别汇总表和按日、源账户汇总表（billing_schema.ROLLUP_TABLES）
+MONTHLY_CATEGORY_TABLE = 'monthly_category_totals'
+DAILY_ACCOUNT_TABLE = 'daily_account_totals'
+
+# 账单列表返回的列
+BILL_COLUMNS = ['账单主键', '日期', '类别', '金额', '源账户', '目标账户', '描述', '代理', '货币']
+
+# 汇总表的统计列
+SUMMARY_MEASURES = ['收入', '支出', '净额', '笔数']
+
+
+def _date_upper_bound(until):
+    """
+    日期上限（包含），只有日期时包含当天全部时间
+    """
+    return until + ' 23:59:59' if len(until) == 10 else until
+
+
+def query_bills(conn, since=None, until=None, categories=None, accounts=None, counterparty=None,
+                after=None, limit=None):
+    """
+    按条件查询账单，结果按 (日期, rowid) 排序，筛选和分页都在SQL中完成
+    
+    Args:
+        conn: SQLite连接
+        since: 日期下限（包含）
+        until: 日期上限（包含），只有日期时包含当天全部时间
+        categories: 类别列表
+        accounts: 源账户列表
+        counterparty: 交易对方（代理）中包含的文字
+        after: 上一页最后一行的 (日期, rowid)，从其后一行开始返回
+        limit: 最多返回的行数，为None时不限制
+    
+    Returns:
+        账单行的列表（rowid 和 BILL_COLUMNS），账单表不存在时返回空列表
+    """
+    if not table_exists(conn, BILLING_TABLE):
+        return []
+    
+    conditions = ["日期 IS NOT NULL"]
+    params = []
+    if since:
+        conditions.append("日期 >= ?")
+        params.append(since)
+    if until:
+        conditions.append("日期 <= ?")
+        params.append(_date_upper_bound(until))
+    for column, values in (('类别', categories), ('源账户', accounts)):
+        if values:
+            conditions.append(f"{quote_identifier(column)} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+    if counterparty:
+        conditions.append("instr(代理, ?) > 0")
+        params.append(counterparty)
+    if after is not None:
+        conditions.append("(日期, rowid) > (?, ?)")
+        params.extend(after)
+    
+    sql = (f"SELECT rowid, {', '.join(quote_identifier(column) for column in BILL_COLUMNS)} "
+           f"FROM {quote_identifier(BILLING_TABLE)} WHERE {' AND '.join(conditions)} ORDER BY 日期, rowid")
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def bill_summary(conn, since_month=None, until_month=None, categories=None, by='category'):
+    """
+    从汇总表读取按月的收支汇总
+    
+    Args:
+        conn: SQLite连接
+        since_month: 起始月份 (yyyymm，包含)
+        until_month: 结束月份 (yyyymm，包含)
+        categories: 类别（by='category'）或源账户（by='account'）列表
+        by: 'category' 按月、类别汇总，'account' 按月、源账户汇总
+    
+    Returns:
+        (年月, 类别或源账户, 收入, 支出, 净额, 笔数) 的列表，汇总表不存在时返回空列表
+    """
+    if by == 'account':
+        table, column = DAILY_ACCOUNT_TABLE, '源账户'
+    else:
+        table, column = MONTHLY_CATEGORY_TABLE, '类别'
+    if not table_exists(conn, table):
+        return []
+    
+    conditions = []
+    params = []
+    if since_month is not None:
+        conditions.append("年月 >= ?")
+        params.append(since_month)
+    if until_month is not None:
+        conditions.append("年月 <= ?")
+        params.append(until_month)
+    if categories:
+        conditions.append(f"{quote_identifier(column)} IN ({', '.join('?' for _ in categories)})")
+        params.extend(categories)
+    
+    # 按日汇总表再按月合计，按月汇总表直接读取（主键即为 年月, 类别）
+    measures = ', '.join(f"SUM({quote_identifier(measure)})" for measure in SUMMARY_MEASURES)
+    sql = f"SELECT 年月, {quote_identifier(column)}, {measures} FROM {quote_identifier(table)}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" GROUP BY 年月, {quote_identifier(column)} ORDER BY 年月, {quote_identifier(column)}"
+    return conn.execute(sql, params).fetchall()
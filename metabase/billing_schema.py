@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+账单数据库表结构
+负责 billing_records 表的建表语句、索引、结构迁移、汇总表维护，以及按账单主键批量写入（UPSERT）
+"""
+
+import numpy as np
+import pandas as pd
+
+from metabase.bill_keys import generate_bill_keys, bill_key_sql_type
+from metabase.database import connect_database, quote_identifier, table_exists, table_columns
+
+# 账单表名
+BILLING_TABLE = 'billing_records'
+
+# 账单主键列
+BILL_KEY_COLUMN = '账单主键'
+
+# 账单主键唯一索引名
+BILL_KEY_INDEX = 'idx_billing_records_bill_key'
+
+# 账单表日期列的文本格式
+BILL_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# 账单库元数据表，记录主键算法、表结构版本等信息
+META_TABLE = 'billing_meta'
+
+# 表结构版本：修改 BILLING_COLUMNS 的类型或派生列后需递增，下次导入时重建账单表
+#   2  新增人民币金额列，汇总表按人民币金额统计
+SCHEMA_VERSION = 2
+
+# 账单表的列及类型（主键列类型由主键算法决定）
+#   金额_分   金额换算为分的整数，便于精确汇总
+#   日期      ISO格式文本 YYYY-MM-DD HH:MM:SS
+#   日期_epoch 日期对应的秒数（日期不带时区，按UTC换算）
+#   年月      yyyymm 格式的整数，便于按月分组
+#   人民币金额 按交易日期汇率换算的人民币金额，人民币账单与金额相同，无法换算的外币账单为NULL
+BILLING_COLUMNS = [
+    ('类别', 'TEXT'),
+    ('金额', 'REAL'),
+    ('金额_分', 'INTEGER'),
+    ('已收金额', 'REAL'),
+    ('日期', 'TEXT'),
+    ('日期_epoch', 'INTEGER'),
+    ('年月', 'INTEGER'),
+    ('源账户', 'TEXT'),
+    ('目标账户', 'TEXT'),
+    ('描述', 'TEXT'),
+    ('代理', 'TEXT'),
+    ('货币', 'TEXT'),
+    ('人民币金额', 'REAL'),
+    ('检查编号', 'TEXT'),
+    ('时间', 'TEXT'),
+]
+
+# 分析查询使用的索引，包含金额列以便按类别、账户汇总时只读索引
+BILLING_INDEXES = {
+    'idx_billing_records_date': ['日期'],
+    'idx_billing_records_month': ['年月'],
+    'idx_billing_records_category_date': ['类别', '日期', '金额'],
+    'idx_billing_records_account_date': ['源账户', '日期', '金额'],
+}
+
+# 汇总表：供Metabase看板直接查询，每次导入只重新计算涉及的月份（主键以年月开头，按月删除时走索引）
+#   monthly_category_totals  按月、类别汇总
+#   daily_account_totals     按日、源账户汇总
+ROLLUP_TABLES = {
+    'monthly_category_totals': {
+        'columns': [('年月', 'INTEGER NOT NULL'), ('类别', 'TEXT NOT NULL')],
+        'select': ["年月", "COALESCE(类别, '未分类')"],
+    },
+    'daily_account_totals': {
+        'columns': [('年月', 'INTEGER NOT NULL'), ('日期', 'TEXT NOT NULL'), ('源账户', 'TEXT NOT NULL')],
+        'select': ["年月", "substr(日期, 1, 10)", "COALESCE(源账户, '未知账户')"],
+    },
+}
+
+# 汇总表的统计列：金额按人民币金额统计，不同货币的账单可以直接相加（无法换算的外币账单只计入笔数）
+ROLLUP_MEASURES = [
+    ('收入', 'REAL', "SUM(CASE WHEN 人民币金额 > 0 THEN 人民币金额 ELSE 0 END)"),
+    ('支出', 'REAL', "SUM(CASE WHEN 人民币金额 < 0 THEN -人民币金额 ELSE 0 END)"),
+    ('净额', 'REAL', "TOTAL(人民币金额)"),
+    ('笔数', 'INTEGER', "COUNT(*)"),
+]
+
+# 每批写入的记录数
+UPSERT_BATCH_SIZE = 5000
+
+# 导入时使用的临时暂存表
+STAGING_TABLE = 'billing_staging'
+
+
+def sqlite_type(dtype):
+    """
+    根据pandas列类型返回SQLite列类型
+    """
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+
+def get_meta(conn, name, default=None):
+    """
+    读取账单库元数据
+    """
+    if not table_exists(conn, META_TABLE):
+        return default
+    row = conn.execute(f"SELECT value FROM {META_TABLE} WHERE name=?", (name,)).fetchone()
+    return row[0] if row else default
+
+
+def set_meta(conn, name, value):
+    """
+    写入账单库元数据
+    """
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (name TEXT PRIMARY KEY, value TEXT)")
+    conn.execute(
+        f"INSERT INTO {META_TABLE} (name, value) VALUES (?, ?) "
+        f"ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+        (name, str(value))
+    )
+
+
+def prepare_bill_records(df):
+    """
+    将账单数据转换为账单表的列类型
+    
+    空字符串转为NULL，金额转为数值，日期统一为ISO格式并生成派生列 金额_分、日期_epoch、年月，
+    人民币账单补充人民币金额。
+    
+    Args:
+        df: 账单数据 (pandas DataFrame)
+    
+    Returns:
+        转换后的账单数据副本
+    """
+    df = df.copy()
+    for column in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = df[column].replace('', np.nan)
+    
+    for column in ('金额', '已收金额', '人民币金额'):
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+    if '金额' in df.columns:
+        df['金额_分'] = (df['金额'] * 100).round().astype('Int64')
+    
+    # 只有外币账单带有人民币金额，人民币账单（货币为空或CNY）的人民币金额即为金额
+    if '金额' in df.columns:
+        if '人民币金额' not in df.columns:
+            df['人民币金额'] = np.nan
+        if '货币' in df.columns:
+            df['人民币金额'] = df['人民币金额'].fillna(df['金额'].where(df['货币'].isna() | (df['货币'] == 'CNY')))
+        else:
+            df['人民币金额'] = df['人民币金额'].fillna(df['金额'])
+    
+    date_column = '日期' if '日期' in df.columns else '交易日期' if '交易日期' in df.columns else None
+    if date_column is not None:
+        # datetime 列直接使用；文本列是导入程序统一格式化后的日期，按固定格式解析，不逐行识别格式
+        if pd.api.types.is_datetime64_any_dtype(df[date_column]):
+            dates = df[date_column]
+        else:
+            dates = pd.to_datetime(df[date_column], format=BILL_DATE_FORMAT, errors='coerce')
+        df[date_column] = dates.dt.strftime(BILL_DATE_FORMAT)
+        df['日期_epoch'] = ((dates - pd.Timestamp('1970-01-01')) // pd.Timedelta(seconds=1)).astype('Int64')
+        df['年月'] = (dates.dt.year * 100 + dates.dt.month).astype('Int64')
+    return df
+
+
+def _create_billing_table(conn, table_name, key_algorithm, extra_columns=None):
+    """
+    按 BILLING_COLUMNS 创建账单表
+    
+    Args:
+        conn: SQLite连接
+        table_name: 表名
+        key_algorithm: 账单主键算法
+        extra_columns: 额外列 {列名: 类型}
+    """
+    definitions = [f"{quote_identifier(BILL_KEY_COLUMN)} {bill_key_sql_type(key_algorithm)} NOT NULL"]
+    definitions += [f"{quote_identifier(column)} {column_type}" for column, column_type in BILLING_COLUMNS]
+    definitions += [
+        f"{quote_identifier(column)} {column_type}".strip()
+        for column, column_type in (extra_columns or {}).items()
+    ]
+    conn.execute(f"CREATE TABLE {quote_identifier(table_name)} ({', '.join(definitions)})")
+
+
+def _create_indexes(conn):
+    """
+    创建账单主键唯一索引和分析索引（已存在时跳过）
+    """
+    table = quote_identifier(BILLING_TABLE)
+    conn.execute(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {quote_identifier(BILL_KEY_INDEX)} "
+        f"ON {table} ({quote_identifier(BILL_KEY_COLUMN)})"
+    )
+    for index_name, columns in BILLING_INDEXES.items():
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote_identifier(index_name)} "
+            f"ON {table} ({', '.join(quote_identifier(column) for column in columns)})"
+        )
+
+
+def ensure_rollup_tables(conn):
+    """
+    创建汇总表（已存在时跳过），新建的汇总表按全部账单计算一次
+    """
+    for table_name, rollup in ROLLUP_TABLES.items():
+        if table_exists(conn, table_name):
+            continue
+        definitions = [f"{quote_identifier(column)} {column_type}" for column, column_type in rollup['columns']]
+        definitions += [f"{quote_identifier(column)} {column_type}" for column, column_type, _ in ROLLUP_MEASURES]
+        key = ', '.join(quote_identifier(column) for column, _ in rollup['columns'])
+        conn.execute(
+            f"CREATE TABLE {quote_identifier(table_name)} ({', '.join(definitions)}, PRIMARY KEY ({key}))"
+        )
+        _refresh_rollup(conn, table_name, None)
+
+
+def _refresh_rollup(conn, table_name, months):
+    """
+    重新计算一张汇总表中指定月份的数据
+    
+    Args:
+        conn: SQLite连接
+        table_name: 汇总表名
+        months: 月份 (yyyymm) 列表，为None时重新计算全部月份
+    """
+    rollup = ROLLUP_TABLES[table_name]
+    table = quote_identifier(table_name)
+    columns = [column for column, _ in rollup['columns']] + [column for column, _, _ in ROLLUP_MEASURES]
+    column_list = ', '.join(quote_identifier(column) for column in columns)
+    select_list = ', '.join(rollup['select'] + [expression for _, _, expression in ROLLUP_MEASURES])
+    group_by = ', '.join(str(i + 1) for i in range(len(rollup['select'])))
+    
+    if months is None:
+        conn.execute(f"DELETE FROM {table}")
+        where, params = "年月 IS NOT NULL", []
+    else:
+        placeholders = ', '.join('?' for _ in months)
+        conn.execute(f"DELETE FROM {table} WHERE 年月 IN ({placeholders})", months)
+        where, params = f"年月 IN ({placeholders})", months
+    conn.execute(
+        f"INSERT INTO {table} ({column_list}) SELECT {select_list} "
+        f"FROM {quote_identifier(BILLING_TABLE)} WHERE {where} GROUP BY {group_by}",
+        params
+    )
+
+
+def refresh_rollups(conn, months=None):
+    """
+    重新计算汇总表，需在写入账单的同一事务中调用
+    
+    Args:
+        conn: SQLite连接
+        months: 涉及的月份 (yyyymm) 列表，为None时重新计算全部月份
+    """
+    if months is not None:
+        months = sorted({int(month) for month in months if pd.notna(month)})
+        if not months:
+            return
+    for table_name in ROLLUP_TABLES:
+        _refresh_rollup(conn, table_name, months)
+
+
+def rebuild_billing_table(conn, key_algorithm, recompute_keys=False):
+    """
+    按当前表结构重建账单表
+    
+    用于迁移旧版本导入程序创建的表（全部为TEXT列、空字符串、没有索引）或切换主键算法：
+    读取全部记录、转换列类型、按需重新计算主键并去除重复主键（保留最后写入的一条），
+    写入新表并校验后，在一个事务中替换旧表。只在表结构版本或主键算法变化时执行一次。
+    
+    Args:
+        conn: SQLite连接
+        key_algorithm: 账单主键算法
+        recompute_keys: 是否重新计算主键
+    """
+    table = quote_identifier(BILLING_TABLE)
+    new_table_name = BILLING_TABLE + '_migrating'
+    new_table = quote_identifier(new_table_name)
+    print("正在迁移账单表结构...")
+    
+    df = pd.read_sql_query(f"SELECT * FROM {table} ORDER BY rowid", conn)
+    known_columns = {BILL_KEY_COLUMN} | {column for column, _ in BILLING_COLUMNS}
+    extra_columns = {
+        row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] not in known_columns
+    }
+    df = prepare_bill_records(df)
+    if recompute_keys:
+        print(f"正在将账单主键迁移到 {key_algorithm}...")
+        df[BILL_KEY_COLUMN] = generate_bill_keys(df, key_algorithm)
+    df = df.drop_duplicates(subset=[BILL_KEY_COLUMN], keep='last')
+    
+    columns = [column for column in df.columns if column in known_columns or column in extra_columns]
+    column_list = ', '.join(quote_identifier(column) for column in columns)
+    placeholders = ', '.join('?' for _ in columns)
+    
+    # 先完整写入新表并校验，读者在此期间仍读取旧表
+    with conn:
+        conn.execute(f"DROP TABLE IF EXISTS {new_table}")
+        _create_billing_table(conn, new_table_name, key_algorithm, extra_columns)
+        for rows in _iter_batches(df[columns], UPSERT_BATCH_SIZE):
+            conn.executemany(f"INSERT INTO {new_table} ({column_list}) VALUES ({placeholders})", rows)
+    validate_loaded_table(conn, new_table_name, len(df))
+    
+    # 在一个事务中替换旧表
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+        _create_indexes(conn)
+        ensure_rollup_tables(conn)
+        refresh_rollups(conn)
+        set_meta(conn, 'bill_key_algorithm', key_algorithm)
+        set_meta(conn, 'schema_version', SCHEMA_VERSION)
+    print(f"账单表迁移完成，记录数: {len(df)}")
+
+
+def ensure_billing_table(conn, df, key_algorithm='md5'):
+    """
+    确保账单表为当前表结构且包含数据中的全部列，并建立索引
+    可重复调用，表结构已是最新时只补充缺少的列和索引
+    
+    Args:
+        conn: SQLite连接
+        df: 待导入的账单数据 (pandas DataFrame)，必须包含账单主键列
+        key_algorithm: 账单主键算法
+    """
+    table = quote_identifier(BILLING_TABLE)
+    if table_exists(conn, BILLING_TABLE):
+        stored_algorithm = get_meta(conn, 'bill_key_algorithm', 'md5')
+        schema_version = int(get_meta(conn, 'schema_version', 0))
+        if stored_algorithm != key_algorithm or schema_version < SCHEMA_VERSION:
+            rebuild_billing_table(conn, key_algorithm, recompute_keys=stored_algorithm != key_algorithm)
+    
+    with conn:
+        if not table_exists(conn, BILLING_TABLE):
+            _create_billing_table(conn, BILLING_TABLE, key_algorithm)
+            set_meta(conn, 'bill_key_algorithm', key_algorithm)
+            set_meta(conn, 'schema_version', SCHEMA_VERSION)
+        
+        # 数据中出现新的列时补充到表中
+        existing_columns = set(table_columns(conn, BILLING_TABLE))
+        for column in df.columns:
+            if column not in existing_columns:
+                print(f"账单表新增列: {column}")
+                conn.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {quote_identifier(column)} {sqlite_type(df[column].dtype)}"
+                )
+        
+        _create_indexes(conn)
+        ensure_rollup_tables(conn)
+
+
+def validate_loaded_table(conn, table_name, expected_rows):
+    """
+    校验暂存表：行数与预期一致，账单主键非空且不重复
+    
+    Args:
+        conn: SQLite连接
+        table_name: 暂存表名（可带 temp. 前缀）
+        expected_rows: 预期行数
+    
+    Raises:
+        ValueError: 校验失败
+    """
+    key = quote_identifier(BILL_KEY_COLUMN)
+    total, distinct_keys, null_keys = conn.execute(
+        f"SELECT COUNT(*), COUNT(DISTINCT {key}), SUM({key} IS NULL) FROM {table_name}"
+    ).fetchone()
+    if total != expected_rows:
+        raise ValueError(f"暂存表行数 {total} 与预期 {expected_rows} 不一致")
+    if null_keys:
+        raise ValueError(f"暂存表中有 {null_keys} 条记录缺少账单主键")
+    if distinct_keys != total:
+        raise ValueError(f"暂存表中有 {total - distinct_keys} 条记录的账单主键重复")
+
+
+def _iter_batches(df, batch_size):
+    """
+    按批生成可直接传给 executemany 的行元组
+    """
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start:start + batch_size].astype(object)
+        batch = batch.where(pd.notna(batch), None)
+        yield list(batch.itertuples(index=False, name=None))
+
+
+def upsert_bills(conn, df, key_algorithm='md5', batch_size=UPSERT_BATCH_SIZE):
+    """
+    按账单主键批量写入账单，主键已存在时更新该记录
+    
+    数据先分批写入连接私有的临时暂存表并校验行数和主键，再在一个短事务中
+    用 INSERT ... SELECT ... ON CONFLICT 发布到账单表，并更新涉及月份的汇总表。
+    读者只会看到发布前或发布后的完整数据；校验失败时账单表不受影响。
+    
+    Args:
+        conn: SQLite连接
+        df: 待导入的账单数据 (pandas DataFrame)
+        key_algorithm: 账单主键算法，需与生成 df 中主键的算法一致
+        batch_size: 每批写入暂存表的记录数
+    
+    Returns:
+        写入（新增或更新）的记录数
+    """
+    df = prepare_bill_records(df)
+    df = df.drop_duplicates(subset=[BILL_KEY_COLUMN], keep='last')
+    ensure_billing_table(conn, df, key_algorithm)
+    
+    table = f"main.{quote_identifier(BILLING_TABLE)}"
+    staging = f"temp.{quote_identifier(STAGING_TABLE)}"
+    columns = list(df.columns)
+    column_list = ', '.join(quote_identifier(column) for column in columns)
+    placeholders = ', '.join('?' for _ in columns)
+    updates = ', '.join(
+        f"{quote_identifier(column)} = excluded.{quote_identifier(column)}"
+        for column in columns if column != BILL_KEY_COLUMN
+    )
+    
+    # 写入暂存表：临时表只对当前连接可见，不占用账单库的写锁
+    with conn:
+        conn.execute(f"DROP TABLE IF EXISTS {staging}")
+        conn.execute(f"CREATE TEMP TABLE {quote_identifier(STAGING_TABLE)} AS "
+                     f"SELECT {column_list} FROM {table} WHERE 0")
+        for rows in _iter_batches(df, batch_size):
+            conn.executemany(f"INSERT INTO {staging} ({column_list}) VALUES ({placeholders})", rows)
+    
+    try:
+        validate_loaded_table(conn, staging, len(df))
+        
+        # 发布：单条集合语句写入账单表并更新汇总表
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} WHERE true "
+                f"ON CONFLICT({quote_identifier(BILL_KEY_COLUMN)}) DO UPDATE SET {updates}"
+            )
+            if '年月' in df.columns:
+                refresh_rollups(conn, df['年月'].dropna().unique())
+    finally:
+        conn.execute(f"DROP TABLE IF EXISTS {staging}")
+    
+    return len(df)
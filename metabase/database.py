@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据库连接和通用工具
+只依赖标准库，资产管理服务可以在不加载pandas的情况下使用
+"""
+
+import sqlite3
+
+
+def connect_database(db_path, timeout=30.0):
+    """
+    打开账单数据库连接
+    
+    使用WAL日志模式：读者（Metabase、asset_api.py）读取最近一次提交的快照，
+    不会被写入阻塞，也不会看到写了一半的数据。
+    
+    Args:
+        db_path: 数据库文件路径
+        timeout: 等待其他写入者释放锁的秒数
+    
+    Returns:
+        SQLite连接
+    """
+    conn = sqlite3.connect(db_path, timeout=timeout)
+    try:
+        # 首次切换到WAL需要独占数据库，有其他连接时保持原模式，下次再切换
+        conn.execute("PRAGMA busy_timeout=0")
+        conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.OperationalError as e:
+        print(f"切换到WAL模式失败，本次使用原日志模式: {e}")
+    conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def quote_identifier(name):
+    """
+    为SQLite标识符（表名、列名）加引号
+    """
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def table_exists(conn, table_name):
+    """
+    检查表是否存在
+    """
+    cursor = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,)
+    )
+    return cursor.fetchone() is not None
+
+
+def table_columns(conn, table_name):
+    """
+    获取表的列名列表
+    """
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({quote_identifier(table_name)})")]
@@ -8,10 +8,9 @@ Metabase 数据导入脚本
 
 import os
 import sys
+import numpy as np
 import pandas as pd
-import sqlite3
 from datetime import datetime
-import hashlib
 
 # 获取当前脚本所在目录
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -21,39 +20,17 @@ project_root = os.path.dirname(current_dir)
 sys.path.insert(0, project_root)
 
 from bill_converter.config import Config
-
-
-def generate_bill_key(row):
-    """
-    生成账单的主键
-    主键由金额、日期、源账户、描述、代理决定，并使用MD5哈希避免过长字符串
-    """
-    # 处理可能的 NaN 值
-    amount = str(row.get('金额', '') or '')
-    # 检查日期列是否存在，可能已被重命名为交易日期
-    date = str(row.get('日期', '') or row.get('交易日期', '') or '')
-    source_account = str(row.get('源账户', '') or '')
-    description = str(row.get('描述', '') or '')
-    agent = str(row.get('代理', '') or '')
-    
-    # 组合主键字段
-    key_string = f"{amount}_{date}_{source_account}_{description}_{agent}"
-    
-    # 使用MD5生成固定长度的哈希值
-    return hashlib.md5(key_string.encode('utf-8')).hexdigest()
+from metabase.bill_keys import generate_bill_keys
+from metabase.billing_schema import (BILLING_TABLE, BILL_DATE_FORMAT, connect_database, table_exists,
+                                     upsert_bills, ensure_rollup_tables, refresh_rollups)
+from metabase.asset_store import (CURRENT_ASSETS_TABLE, SNAPSHOTS_TABLE, asset_run_prefix,
+                                  asset_source_name, retire_asset_sources, store_asset_snapshot)
 
 
 def import_csv_to_sqlite():
     """
     将 CSV 文件导入到 SQLite 数据库，支持增量追加去重写入
     """
-    # 确保 metabase/data 目录存在
-    data_dir = os.path.join(current_dir, 'data')
-    os.makedirs(data_dir, exist_ok=True)
-    
-    # SQLite 数据库文件路径
-    db_path = os.path.join(data_dir, 'billing.db')
-    
     # CSV 文件路径（相对于项目根目录）
     csv_path = os.path.join(project_root, Config.DEFAULT_OUTPUT_DIR, 'final_merged_bills.csv')
     
@@ -68,20 +45,58 @@ def import_csv_to_sqlite():
         # 读取 CSV 文件
         print(f"正在读取 CSV 文件: {csv_path}")
         df = pd.read_csv(csv_path)
+    except Exception as e:
+        print(f"导入账单数据时出错: {e}")
+        return False
+    
+    return import_bills_dataframe(df)
+
+
+def import_bills_dataframe(data):
+    """
+    将内存中的账单数据直接导入到 SQLite 数据库，支持增量追加去重写入
+    
+    账单流程可直接传入合并后的数据，省去写出再读取 CSV 的开销。
+    日期列已是 datetime 类型时直接格式化，不再重新识别日期格式。
+    
+    Args:
+        data: 账单数据，pandas DataFrame 或 pyarrow Table
+    
+    Returns:
+        是否导入成功
+    """
+    # 确保 metabase/data 目录存在
+    data_dir = os.path.join(current_dir, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    
+    # SQLite 数据库文件路径
+    db_path = os.path.join(data_dir, 'billing.db')
+    
+    try:
+        # Arrow 表转换为 DataFrame，DataFrame 复制一份，避免修改调用方的数据
+        df = data.to_pandas() if hasattr(data, 'to_pandas') else data.copy()
+        
+        # 与从 CSV 读取的数据保持一致：空字符串视为缺失值，保证生成的账单主键相同
+        for column in df.columns:
+            if pd.api.types.is_string_dtype(df[column]) or df[column].dtype == object:
+                df[column] = df[column].replace('', np.nan)
         
         # 处理可能的日期列重命名（保持原始列名）
         date_cols = [col for col in df.columns if col in ['日期', '交易日期']]
         for date_col in date_cols:
             try:
-                # 尝试自动识别日期格式并统一转换，保留完整的时间信息
-                df[date_col] = pd.to_datetime(df[date_col], errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S')
+                if pd.api.types.is_datetime64_any_dtype(df[date_col]):
+                    df[date_col] = df[date_col].dt.strftime(BILL_DATE_FORMAT)
+                else:
+                    # 尝试自动识别日期格式并统一转换，保留完整的时间信息
+                    df[date_col] = pd.to_datetime(df[date_col], errors='coerce').dt.strftime(BILL_DATE_FORMAT)
             except Exception as e:
                 print(f"日期格式转换时出错: {e}")
                 # 如果转换失败，保留原始值但记录错误
                 df['日期格式错误'] = str(e)
         
-        # 添加主键列
-        df['账单主键'] = df.apply(generate_bill_key, axis=1)
+        # 添加主键列（批量计算）
+        df['账单主键'] = generate_bill_keys(df, Config.BILL_KEY_ALGORITHM)
         
         # 更新时间列，使用当前数据生成时间
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -91,49 +106,20 @@ def import_csv_to_sqlite():
         # 将列名中的特殊字符替换为下划线
         df.columns = [col.replace(' ', '_').replace('-', '_').replace('/', '_') for col in df.columns]
         
-        # 处理空值
-        df = df.fillna('')
+        # 空值保留为NULL，列类型由 upsert_bills 按账单表结构统一转换
         
         # 连接到 SQLite 数据库
         print(f"正在连接到数据库: {db_path}")
-        conn = sqlite3.connect(db_path)
-        
-        # 检查表是否存在
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='billing_records'
-        """)
-        table_exists = cursor.fetchone() is not None
-        
-        if table_exists:
-            # 表已存在，执行增量更新
+        conn = connect_database(db_path)
+        
+        # 按账单主键批量写入，已存在的记录原地更新，只处理本次导入的数据
+        if table_exists(conn, BILLING_TABLE):
             print("检测到现有账单数据，执行增量更新...")
-            
-            # 读取现有数据
-            existing_df = pd.read_sql_query("SELECT * FROM billing_records", conn)
-            
-            if not existing_df.empty:
-                # 合并新旧数据，去重
-                merged_df = pd.concat([existing_df, df])
-                # 基于账单主键去重，保留最新的记录
-                merged_df = merged_df.drop_duplicates(subset=['账单主键'], keep='last')
-                print(f"去重前记录数: {len(merged_df)}")
-            else:
-                merged_df = df
-            
-            # 更新数据表
-            print(f"正在更新数据到表: billing_records")
-            merged_df.to_sql('billing_records', conn, if_exists='replace', index=False)
-            print(f"更新后记录数: {len(merged_df)}")
         else:
-            # 表不存在，直接写入
-            print(f"创建新表并导入数据到表: billing_records")
-            df.to_sql('billing_records', conn, if_exists='replace', index=False)
-            print(f"导入记录数: {len(df)}")
+            print(f"创建新表并导入数据到表: {BILLING_TABLE}")
+        written = upsert_bills(conn, df, Config.BILL_KEY_ALGORITHM)
+        print(f"写入记录数: {written}")
         
-        # 提交事务并关闭连接
-        conn.commit()
         conn.close()
         
         print("账单数据导入完成!")
@@ -147,9 +133,13 @@ def import_csv_to_sqlite():
         return False
 
 
-def import_assets_to_sqlite():
+def import_assets_to_sqlite(asset_frames=None):
     """
-    将资产 CSV 文件导入到 SQLite 数据库
+    将最新一次转换生成的资产 CSV 文件作为快照导入到 SQLite 数据库（每个文件一个来源）
+    
+    Args:
+        asset_frames: 快照文件名到转换后资产数据的字典（asset_converter.convert_asset_frames 的结果），
+                      提供时直接导入这些数据，不再读取资产目录中的CSV文件
     """
     # 确保 metabase/data 目录存在
     data_dir = os.path.join(current_dir, 'data')
@@ -162,51 +152,66 @@ def import_assets_to_sqlite():
     assets_dir = os.path.join(Config.DEFAULT_OUTPUT_DIR, 'assets')
     
     # 检查资产目录是否存在
-    if not os.path.exists(assets_dir):
+    if asset_frames is not None:
+        if not asset_frames:
+            print("警告: 没有转换成功的资产数据")
+            return True
+    elif not os.path.exists(assets_dir):
         print(f"警告: 资产目录不存在: {assets_dir}")
         return True  # 不是错误，只是没有资产数据
     
     # 查找最新的资产CSV文件
-    asset_files = [f for f in os.listdir(assets_dir) if f.endswith('.csv')]
+    if asset_frames is not None:
+        asset_files = list(asset_frames)
+    else:
+        asset_files = [f for f in os.listdir(assets_dir) if f.endswith('.csv')]
     
     if not asset_files:
         print(f"警告: 在 {assets_dir} 目录中未找到资产CSV文件")
         return True  # 不是错误，只是没有资产数据
     
-    # 按文件名排序，获取最新的文件
-    asset_files.sort(reverse=True)
-    latest_asset_file = asset_files[0]
-    asset_file_path = os.path.join(assets_dir, latest_asset_file)
+    # 最新一次转换生成的所有资产文件（文件名以相同的时间戳开头）
+    latest_run = max(asset_run_prefix(f) for f in asset_files)
+    latest_asset_files = sorted(f for f in asset_files if asset_run_prefix(f) == latest_run)
     
     try:
-        # 读取资产 CSV 文件
-        print(f"正在读取资产文件: {asset_file_path}")
-        df = pd.read_csv(asset_file_path)
-        
-        # 处理列名，确保符合 SQLite 要求
-        # 将列名中的特殊字符替换为下划线
-        df.columns = [col.replace(' ', '_').replace('-', '_').replace('/', '_') for col in df.columns]
-        
-        # 处理空值
-        df = df.fillna('')
-        
         # 连接到 SQLite 数据库
         print(f"正在连接到数据库: {db_path}")
-        conn = sqlite3.connect(db_path)
+        conn = connect_database(db_path)
         
-        # 将资产数据导入到 SQLite 数据库，使用append模式实现增量写入
-        table_name = 'assets_records'
-        print(f"正在导入资产数据到表: {table_name}")
-        df.to_sql(table_name, conn, if_exists='append', index=False)
+        sources = []
+        for asset_file in latest_asset_files:
+            # 读取资产 CSV 文件（同一进程中刚转换的数据直接使用）
+            if asset_frames is not None:
+                df = asset_frames[asset_file].copy()
+            else:
+                asset_file_path = os.path.join(assets_dir, asset_file)
+                print(f"正在读取资产文件: {asset_file_path}")
+                df = pd.read_csv(asset_file_path)
+            
+            # 处理列名，确保符合 SQLite 要求
+            # 将列名中的特殊字符替换为下划线
+            df.columns = [col.replace(' ', '_').replace('-', '_').replace('/', '_') for col in df.columns]
+            
+            # 保存为资产快照，内容与上次导入相同时跳过，并替换该来源的当前资产
+            source = asset_source_name(asset_file)
+            sources.append(source)
+            print(f"正在导入资产快照到表: {SNAPSHOTS_TABLE}（来源: {source}）")
+            snapshot_id = store_asset_snapshot(conn, df, source)
+            if snapshot_id is None:
+                print(f"资产数据与上次导入的快照相同，已跳过（记录数: {len(df)}）")
+            else:
+                print(f"资产快照导入完成，快照ID: {snapshot_id}（记录数: {len(df)}）")
         
-        # 提交事务并关闭连接
-        conn.commit()
+        # 原始资产文件已删除的来源不再出现在当前资产中
+        retired = retire_asset_sources(conn, sources)
+        if retired:
+            print(f"已移除 {retired} 条不在本次转换中的资产")
         conn.close()
         
         print("资产数据导入完成!")
         print(f"数据库路径: {db_path}")
-        print(f"表名: {table_name}")
-        print(f"记录数: {len(df)}")
+        print(f"当前资产表: {CURRENT_ASSETS_TABLE}")
         
         return True
         
@@ -215,6 +220,32 @@ def import_assets_to_sqlite():
         return False
 
 
+def rebuild_rollups():
+    """
+    按全部账单重新计算汇总表（手动修改 billing_records 后使用）
+    """
+    db_path = os.path.join(current_dir, 'data', 'billing.db')
+    if not os.path.exists(db_path):
+        print(f"错误: 数据库不存在: {db_path}")
+        return False
+    
+    try:
+        conn = connect_database(db_path)
+        if not table_exists(conn, BILLING_TABLE):
+            print(f"错误: 数据库中没有账单表: {BILLING_TABLE}")
+            conn.close()
+            return False
+        with conn:
+            ensure_rollup_tables(conn)
+            refresh_rollups(conn)
+        conn.close()
+        print("汇总表已重新计算")
+        return True
+    except Exception as e:
+        print(f"重新计算汇总表时出错: {e}")
+        return False
+
+
 def main():
     """
     主函数
@@ -222,6 +253,11 @@ def main():
     print("Metabase 数据导入工具")
     print("=" * 30)
     
+    if '--rebuild-rollups' in sys.argv[1:]:
+        if not rebuild_rollups():
+            sys.exit(1)
+        return
+    
     # 导入账单数据
     bill_success = import_csv_to_sqlite()
     
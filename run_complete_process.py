@@ -10,14 +10,19 @@ import sys
 import os
 import subprocess
 import argparse
-import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from bill_converter.main import auto_process_bills
-from metabase.import_data import import_csv_to_sqlite, import_assets_to_sqlite
+from bill_converter.main import auto_process_bills, wait_for_background_exports
+from metabase.import_data import import_csv_to_sqlite, import_bills_dataframe, import_assets_to_sqlite
+from asset_converter import convert_asset_frames
+# bill_converter.main 已将 bill_converter 目录加入Python路径，需与其使用同一个分析器模块
+from utils.profiler import get_profiler, start_profiling, finish_profiling
+
+# 与账单处理并行执行时，资产转换输出行的前缀
+ASSET_PREFIX = '[资产] '
 
 def run_docker_compose_command(command):
     """
@@ -67,86 +72,146 @@ def start_asset_api_service():
         print(f"启动资产管理API服务时出错: {e}")
         return None
 
-def complete_process(auto_mode=True, start_services=True):
+def convert_bills(auto_mode=True):
     """
-    完整的账单处理流程
-    1. 处理原始账单文件
-    2. 处理原始资产文件
-    3. 导入数据到Metabase
-    4. 启动Metabase服务
-    5. 启动资产管理API服务
+    账单转换：处理原始账单文件
     
-    Args:
-        auto_mode (bool): 是否使用自动模式处理账单
-        start_services (bool): 是否启动服务
-    """
-    print("=" * 50)
-    print("开始执行完整账单处理流程")
-    print("=" * 50)
-    
-    # 步骤1: 处理原始账单文件
-    print("\n步骤1: 处理原始账单文件")
-    print("-" * 30)
+    自动模式下合并后的账单直接在内存中交给导入步骤，CSV在后台导出
     
+    Returns:
+        (是否成功, 合并后的账单数据)，手动模式下账单数据为None（导入时读取CSV）；
+        自动模式下没有成功处理的账单时返回失败，不会导入上次运行留下的CSV
+    """
     try:
         if auto_mode:
             print("使用自动模式处理raw_bills目录下的所有文件")
-            auto_process_bills()
-        else:
-            print("请手动运行账单转换器:")
-            print("cd bill_converter && python main.py")
-            input("按回车键继续...")
+            with get_profiler().stage('bills'):
+                merged_bills = auto_process_bills(background_export=True)
+            if merged_bills is None:
+                print("账单处理失败")
+                return False, None
+            return True, merged_bills
+        print("请手动运行账单转换器:")
+        print("cd bill_converter && python main.py")
+        input("按回车键继续...")
+        return True, None
     except Exception as e:
         print(f"处理账单文件时出错: {e}")
-        return False
+        return False, None
+
+
+def import_bills(merged_bills):
+    """
+    导入账单数据
     
-    # 步骤2: 处理原始资产文件
-    print("\n步骤2: 处理原始资产文件")
-    print("-" * 30)
+    Args:
+        merged_bills: 合并后的账单数据，为None时读取合并后的CSV文件
     
+    Returns:
+        bool: 是否成功
+    """
     try:
-        print("运行资产转换脚本...")
-        # 切换到项目根目录并运行资产转换脚本
-        project_root = os.path.dirname(os.path.abspath(__file__))
-        result = subprocess.run(
-            ['python', 'asset_converter.py'], 
-            cwd=project_root, 
-            capture_output=True, 
-            text=True
-        )
-        
-        if result.returncode != 0:
-            print(f"资产转换脚本执行失败: {result.stderr}")
+        print("正在导入账单数据...")
+        with get_profiler().stage('import_bills'):
+            if merged_bills is not None:
+                bill_success = import_bills_dataframe(merged_bills)
+            else:
+                bill_success = import_csv_to_sqlite()
+        if not bill_success:
+            print("账单数据导入失败")
             return False
-            
-        print(result.stdout)
-        print("资产信息处理成功")
+        print("账单数据导入成功")
+        return True
     except Exception as e:
-        print(f"处理资产文件时出错: {e}")
+        print(f"导入账单数据时出错: {e}")
         return False
+    finally:
+        # 确保最终账单CSV已写完
+        with get_profiler().stage('wait_export'):
+            wait_for_background_exports()
+
+
+def convert_assets(log=print):
+    """
+    资产转换：在当前进程中转换原始资产文件，转换结果直接在内存中交给导入步骤
     
-    # 步骤3: 导入数据到Metabase
-    print("\n步骤3: 导入数据到Metabase")
-    print("-" * 30)
+    Args:
+        log: 输出提示信息的函数
     
+    Returns:
+        (是否成功, 快照文件名到转换后资产数据的字典)
+    """
+    try:
+        log("正在转换资产文件...")
+        with get_profiler().stage('assets'):
+            success, asset_frames = convert_asset_frames(log=log)
+        if not success:
+            log("资产文件转换失败")
+            return False, {}
+        log("资产信息处理成功")
+        return True, asset_frames
+    except Exception as e:
+        log(f"处理资产文件时出错: {e}")
+        return False, {}
+
+
+def import_assets(asset_frames):
+    """
+    导入资产数据
+    
+    Returns:
+        bool: 是否成功
+    """
     try:
-        # 导入账单数据
-        print("正在导入账单数据...")
-        bill_success = import_csv_to_sqlite()
-        if not bill_success:
-            print("账单数据导入失败")
-            return False
-        print("账单数据导入成功")
-        
-        # 导入资产数据
         print("正在导入资产数据...")
-        asset_success = import_assets_to_sqlite()
+        with get_profiler().stage('import_assets'):
+            asset_success = import_assets_to_sqlite(asset_frames)
         if not asset_success:
             print("资产数据导入失败")
             return False
         print("资产数据导入成功")
+        return True
     except Exception as e:
-        print(f"导入数据时出错: {e}")
+        print(f"导入资产数据时出错: {e}")
+        return False
+
+
+def complete_process(auto_mode=True, start_services=True):
+    """
+    完整的账单处理流程
+    1. 处理原始账单文件，同时转换原始资产文件（两者互不依赖，并行执行）
+    2. 依次导入账单和资产（两者写同一个数据库，不同时写入，避免等待数据库锁超时）；
+       账单处理失败时资产仍会导入，但整个流程返回失败
+    3. 启动Metabase服务和资产管理API服务
+    
+    Args:
+        auto_mode (bool): 是否使用自动模式处理账单
+        start_services (bool): 是否启动服务
+    """
+    print("=" * 50)
+    print("开始执行完整账单处理流程")
+    print("=" * 50)
+    
+    # 步骤1-2: 资产转换在后台线程中执行，账单处理在主线程中执行（手动模式需要等待输入）
+    print("\n步骤1-2: 处理账单和资产文件（并行处理）")
+    print("-" * 30)
+    
+    # 资产转换的输出先收集起来，账单处理完成后再加上前缀输出，不与账单处理的输出交错
+    asset_messages = []
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        asset_future = executor.submit(convert_assets, asset_messages.append)
+        bill_converted, merged_bills = convert_bills(auto_mode)
+        asset_converted, asset_frames = asset_future.result()
+    for message in asset_messages:
+        print(f"{ASSET_PREFIX}{message}")
+    
+    # 步骤3: 依次导入账单和资产
+    print("\n步骤3: 导入账单和资产数据到Metabase")
+    print("-" * 30)
+    bill_success = bill_converted and import_bills(merged_bills)
+    asset_success = asset_converted and import_assets(asset_frames)
+    
+    if not (bill_success and asset_success):
         return False
     
     # 步骤4: 启动服务
@@ -193,15 +258,25 @@ def main():
                         help='不启动服务')
     parser.add_argument('--manual-bills', action='store_true',
                         help='手动处理账单（非自动模式）')
+    parser.add_argument('--profile', action='store_true',
+                        help='记录各阶段、各文件的耗时、CPU时间、行数和内存峰值')
+    parser.add_argument('--profile-output', help='性能报告JSON文件路径（默认保存到out/profile目录）')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='启用性能分析时，同时为每个阶段保存cProfile结果')
     
     args = parser.parse_args()
     
+    profiler = start_profiling(cprofile=args.cprofile) if args.profile else None
+    
     # 执行完整流程
     success = complete_process(
         auto_mode=not args.manual_bills,
         start_services=not args.no_services
     )
     
+    if profiler is not None:
+        finish_profiling(profiler, args.profile_output)
+    
     if success:
         print("\n✅ 所有步骤执行成功!")
         if not args.no_services:
@@ -28,6 +28,45 @@ class AssetService {
     }
   }
 
+  /**
+   * 分页获取资产数据
+   * @param params 查询参数（limit、cursor、accountType、currency、assetOrLiability、since、until、fields）
+   * @returns 当前页的资产和下一页的游标（没有下一页时为null）
+   */
+  async loadAssetPage(params: Record<string, string>): Promise<{ assets: Asset[]; nextCursor: string | null }> {
+    try {
+      const query = new URLSearchParams(params).toString()
+      const response = await fetch(`${API_BASE_URL}?${query}`)
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+      const assets = await response.json()
+      return { assets, nextCursor: response.headers.get('X-Next-Cursor') }
+    } catch (error) {
+      console.error('读取资产数据失败:', error)
+      throw new Error('读取资产数据失败')
+    }
+  }
+
+  /**
+   * 按ID获取单个资产
+   * @param id 资产ID
+   * @returns 资产对象
+   */
+  async getAsset(id: string): Promise<Asset> {
+    try {
+      const response = await fetch(`${API_BASE_URL}/${id}`)
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+      const asset = await response.json()
+      return asset
+    } catch (error) {
+      console.error('读取资产数据失败:', error)
+      throw new Error('读取资产数据失败')
+    }
+  }
+
   /**
    * 添加新资产
    * @param asset 新资产对象（不包含id、timestamp、cnyAmount和assetOrLiability字段）
@@ -55,6 +94,62 @@ class AssetService {
     }
   }
 
+  /**
+   * 批量添加资产（一次请求，一个数据库事务）
+   * @param assets 新资产对象数组
+   * @returns 每项的处理结果（status为201时包含添加的资产，否则包含错误信息）
+   */
+  async addAssets(
+    assets: Omit<Asset, 'id' | 'timestamp' | 'cnyAmount' | 'assetOrLiability'>[]
+  ): Promise<{ index: number; status: number; asset?: Asset; error?: string }[]> {
+    return this.sendBatch('POST', assets)
+  }
+
+  /**
+   * 批量修改资产，每项只需包含id和要修改的字段
+   * @param assets 要修改的资产数组
+   * @returns 每项的处理结果（status为200时包含修改后的资产，否则包含错误信息）
+   */
+  async updateAssets(
+    assets: (Pick<Asset, 'id'> & Partial<Pick<Asset, 'accountType' | 'currency' | 'amount' | 'description'>>)[]
+  ): Promise<{ index: number; status: number; asset?: Asset; error?: string }[]> {
+    return this.sendBatch('PATCH', assets)
+  }
+
+  /**
+   * 批量删除资产（一次请求，一个数据库事务）
+   * @param ids 要删除的资产ID数组
+   * @returns 每项的处理结果（status为200时删除成功，404表示资产不存在）
+   */
+  async deleteAssets(ids: string[]): Promise<{ index: number; status: number; id?: string; error?: string }[]> {
+    return this.sendBatch('DELETE', ids)
+  }
+
+  private async sendBatch(
+    method: 'POST' | 'PATCH' | 'DELETE',
+    items: object[] | string[]
+  ): Promise<{ index: number; status: number; asset?: Asset; id?: string; error?: string }[]> {
+    try {
+      const response = await fetch(`${API_BASE_URL}/batch`, {
+        method,
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(items),
+      })
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+
+      const { results } = await response.json()
+      return results
+    } catch (error) {
+      console.error('批量处理资产失败:', error)
+      throw new Error('批量处理资产失败')
+    }
+  }
+
   /**
    * 更新资产
    * @param id 要更新的资产ID